@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+"""
+Rebuild effective privileges
+
+This recomputes the materialized privilege of users over resources
+(UserResourceEffectivePrivilege) from the user, group and membership privilege tables.
+
+* By default, rebuilds the whole table.
+* Optional resource ids limit the rebuild to those resources.
+"""
+
+from django.core.management.base import BaseCommand
+from hs_core.models import BaseResource
+from hs_access_control.models import UserResourceEffectivePrivilege
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized effective privileges of users over resources."
+
+    def add_arguments(self, parser):
+
+        # a list of resource id's, or none to rebuild all resources
+        parser.add_argument('resource_ids', nargs='*', type=str)
+
+    def handle(self, *args, **options):
+        if len(options['resource_ids']) > 0:  # an array of resource short_id to rebuild.
+            resources = BaseResource.objects.filter(short_id__in=options['resource_ids'])\
+                                            .values_list('id', flat=True)
+            UserResourceEffectivePrivilege.refresh(resources=resources)
+        else:
+            UserResourceEffectivePrivilege.refresh()
+        print("{} effective privileges recorded"
+              .format(UserResourceEffectivePrivilege.objects.count()))
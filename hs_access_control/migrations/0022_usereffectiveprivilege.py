@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.conf import settings
+
+
+def populate_effective_privileges(apps, schema_editor):
+    """
+    Materialize the privilege of each user over each resource
+
+    This is the same computation as UserResourceEffectivePrivilege.compute, written against
+    the historical models: the best of user privilege and privilege via active groups.
+    """
+    UserResourcePrivilege = apps.get_model("hs_access_control", "UserResourcePrivilege")
+    UserGroupPrivilege = apps.get_model("hs_access_control", "UserGroupPrivilege")
+    GroupResourcePrivilege = apps.get_model("hs_access_control", "GroupResourcePrivilege")
+    UserResourceEffectivePrivilege = apps.get_model("hs_access_control",
+                                                    "UserResourceEffectivePrivilege")
+
+    privileges = {}
+    for user_id, resource_id, privilege in \
+            UserResourcePrivilege.objects.values_list('user_id', 'resource_id', 'privilege'):
+        privileges[(user_id, resource_id)] = privilege
+
+    group_resources = {}
+    for group_id, resource_id, privilege in \
+            GroupResourcePrivilege.objects.filter(group__gaccess__active=True)\
+                                          .values_list('group_id', 'resource_id', 'privilege'):
+        group_resources.setdefault(group_id, []).append((resource_id, privilege))
+
+    for user_id, group_id in \
+            UserGroupPrivilege.objects.filter(group__gaccess__active=True)\
+                                      .values_list('user_id', 'group_id'):
+        for resource_id, privilege in group_resources.get(group_id, ()):
+            key = (user_id, resource_id)
+            privileges[key] = min(privileges.get(key, 4), privilege)
+
+    UserResourceEffectivePrivilege.objects.bulk_create(
+        [UserResourceEffectivePrivilege(user_id=user_id, resource_id=resource_id,
+                                        privilege=privilege)
+         for (user_id, resource_id), privilege in privileges.items()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('hs_core', '0029_auto_20161123_1858'),
+        ('hs_access_control', '0021_auto_20170613_1925'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserResourceEffectivePrivilege',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('privilege', models.IntegerField(default=3, editable=False, choices=[(1, b'Owner'), (2, b'Change'), (3, b'View')])),
+                ('resource', models.ForeignKey(related_name='r2uep', editable=False, to='hs_core.BaseResource', help_text=b'resource to which privilege applies')),
+                ('user', models.ForeignKey(related_name='u2uep', editable=False, to=settings.AUTH_USER_MODEL, help_text=b'user holding privilege')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='userresourceeffectiveprivilege',
+            unique_together=set([('user', 'resource')]),
+        ),
+        migrations.RunPython(populate_effective_privileges, migrations.RunPython.noop),
+    ]
@@ -257,6 +257,24 @@ class UserGroupPrivilege(PrivilegeBase):
                           str(self.group.name), str(self.group.id),
                           str(self.grantor.username), str(self.grantor.id))
 
+    @classmethod
+    def update(cls, **kwargs):
+        """
+        Update a privilege record without maintaining provenance, along with the
+        effective privileges that depend upon it.
+
+        Usage:
+            UserGroupPrivilege.update(user={X}, group={Y}, privilege={Z}, grantor={W})
+
+        **This is a system routine**; see PrivilegeBase.update.
+        """
+        with transaction.atomic():
+            super(UserGroupPrivilege, cls).update(**kwargs)
+            UserResourceEffectivePrivilege.refresh(
+                users=[kwargs['user'].pk],
+                resources=GroupResourcePrivilege.objects.filter(group=kwargs['group'])
+                                                        .values_list('resource_id', flat=True))
+
     @classmethod
     def share(cls, **kwargs):
         """
@@ -428,6 +446,22 @@ class UserResourcePrivilege(PrivilegeBase):
                           str(self.resource.short_id).encode('ascii'),
                           str(self.grantor.username), str(self.grantor.id))
 
+    @classmethod
+    def update(cls, **kwargs):
+        """
+        Update a privilege record without maintaining provenance, along with the
+        effective privileges that depend upon it.
+
+        Usage:
+            UserResourcePrivilege.update(user={X}, resource={Y}, privilege={Z}, grantor={W})
+
+        **This is a system routine**; see PrivilegeBase.update.
+        """
+        with transaction.atomic():
+            super(UserResourcePrivilege, cls).update(**kwargs)
+            UserResourceEffectivePrivilege.refresh(users=[kwargs['user'].pk],
+                                                   resources=[kwargs['resource'].pk])
+
     @classmethod
     def share(cls, **kwargs):
         """
@@ -586,6 +620,24 @@ class GroupResourcePrivilege(PrivilegeBase):
                           str(self.resource.short_id).encode('ascii'),
                           str(self.grantor.username), str(self.grantor.id))
 
+    @classmethod
+    def update(cls, **kwargs):
+        """
+        Update a privilege record without maintaining provenance, along with the
+        effective privileges that depend upon it.
+
+        Usage:
+            GroupResourcePrivilege.update(group={X}, resource={Y}, privilege={Z}, grantor={W})
+
+        **This is a system routine**; see PrivilegeBase.update.
+        """
+        with transaction.atomic():
+            super(GroupResourcePrivilege, cls).update(**kwargs)
+            UserResourceEffectivePrivilege.refresh(
+                users=UserGroupPrivilege.objects.filter(group=kwargs['group'])
+                                                .values_list('user_id', flat=True),
+                resources=[kwargs['resource'].pk])
+
     @classmethod
     def share(cls, **kwargs):
         """
@@ -679,6 +731,154 @@ class GroupResourcePrivilege(PrivilegeBase):
         return GroupResourceProvenance.get_undo_groups(**kwargs)
 
 
+class UserResourceEffectivePrivilege(models.Model):
+    """
+    Materialized privilege of a user over a resource, from all sources
+
+    Each record holds the best (numerically lowest) privilege a user holds over a resource,
+    either directly via UserResourcePrivilege or as a member of an active group holding
+    GroupResourcePrivilege over the resource. This makes ResourceAccess.get_effective_privilege
+    a single indexed lookup rather than an aggregate over groups and memberships.
+
+    Records are maintained by the update routines of UserResourcePrivilege,
+    GroupResourcePrivilege and UserGroupPrivilege, by GroupAccess.save (for the active flag)
+    and by UserAccess.delete_group. Resource flags (immutable, public) and user flags
+    (is_active, is_superuser) are not materialized; they are applied when the privilege is
+    read, so that changing a flag never invalidates this table.
+
+    **This is a system table** and is not to be written by application code. It can be
+    rebuilt from the privilege tables with the rebuild_effective_privileges command.
+    """
+
+    privilege = models.IntegerField(choices=PrivilegeCodes.CHOICES,
+                                    editable=False,
+                                    default=PrivilegeCodes.VIEW)
+
+    user = models.ForeignKey(User,
+                             null=False,
+                             editable=False,
+                             related_name='u2uep',
+                             help_text='user holding privilege')
+
+    resource = models.ForeignKey(BaseResource,
+                                 null=False,
+                                 editable=False,
+                                 related_name='r2uep',
+                                 help_text='resource to which privilege applies')
+
+    class Meta:
+        unique_together = ('user', 'resource')
+
+    def __str__(self):
+        """ Return printed depiction for debugging """
+        return str.format("<user '{}' (id={}) effectively holds {} ({})" +
+                          " over resource '{}' (id={})>",
+                          str(self.user.username), str(self.user.id),
+                          PrivilegeCodes.NAMES[self.privilege],
+                          str(self.privilege),
+                          str(self.resource.title).encode('ascii'),
+                          str(self.resource.short_id).encode('ascii'))
+
+    @classmethod
+    def get_privilege(cls, **kwargs):
+        """
+        Get the materialized privilege of a user over a resource
+
+        Usage:
+            UserResourceEffectivePrivilege.get_privilege(user={X}, resource={Y})
+
+        This does not account for resource or user flags.
+        """
+        try:
+            return cls.objects.get(**kwargs).privilege
+        except cls.DoesNotExist:
+            return PrivilegeCodes.NONE
+
+    @classmethod
+    def compute(cls, users=None, resources=None):
+        """
+        Compute privileges of users over resources from the privilege tables
+
+        :param users: ids of users to compute, or None for all users
+        :param resources: ids of resources to compute, or None for all resources
+        :return: dict mapping (user id, resource id) to privilege 1-3
+
+        Pairs with no privilege are omitted. Group memberships and group privileges are read
+        separately and joined here, so that this costs three queries regardless of the
+        number of groups involved.
+        """
+        user_privs = UserResourcePrivilege.objects.all()
+        memberships = UserGroupPrivilege.objects.filter(group__gaccess__active=True)
+        group_privs = GroupResourcePrivilege.objects.filter(group__gaccess__active=True)
+        if users is not None:
+            user_privs = user_privs.filter(user__in=users)
+            memberships = memberships.filter(user__in=users)
+            group_privs = group_privs.filter(group__g2ugp__user__in=users)
+        if resources is not None:
+            user_privs = user_privs.filter(resource__in=resources)
+            group_privs = group_privs.filter(resource__in=resources)
+
+        privileges = {}
+        for user_id, resource_id, privilege in \
+                user_privs.values_list('user_id', 'resource_id', 'privilege'):
+            privileges[(user_id, resource_id)] = privilege
+
+        group_resources = {}
+        for group_id, resource_id, privilege in \
+                group_privs.distinct().values_list('group_id', 'resource_id', 'privilege'):
+            group_resources.setdefault(group_id, []).append((resource_id, privilege))
+
+        for user_id, group_id in memberships.values_list('user_id', 'group_id'):
+            for resource_id, privilege in group_resources.get(group_id, ()):
+                key = (user_id, resource_id)
+                privileges[key] = min(privileges.get(key, PrivilegeCodes.NONE), privilege)
+
+        return privileges
+
+    @classmethod
+    def refresh(cls, users=None, resources=None):
+        """
+        Recompute materialized privileges for a set of users and resources
+
+        :param users: ids (or an id QuerySet) of users to refresh, or None for all users
+        :param resources: ids (or an id QuerySet) of resources to refresh, or None for all
+
+        All pairs of the given users and resources are recomputed; calling this with neither
+        argument rebuilds the whole table.
+
+        **This is a system routine** called whenever privileges change.
+        """
+        if users is not None:
+            users = list(users)
+            if not users:
+                return
+        if resources is not None:
+            resources = list(resources)
+            if not resources:
+                return
+
+        with transaction.atomic():
+            stale = cls.objects.all()
+            if users is not None:
+                stale = stale.filter(user__in=users)
+            if resources is not None:
+                stale = stale.filter(resource__in=resources)
+            stale.delete()
+            cls.objects.bulk_create(
+                [cls(user_id=user_id, resource_id=resource_id, privilege=privilege)
+                 for (user_id, resource_id), privilege
+                 in cls.compute(users=users, resources=resources).items()],
+                batch_size=1000)
+
+    @classmethod
+    def refresh_group(cls, group):
+        """ Recompute materialized privileges for all members of a group over its resources """
+        members = UserGroupPrivilege.objects.filter(group=group)
+        shares = GroupResourcePrivilege.objects.filter(group=group)
+        cls.refresh(users=members.values_list('user_id', flat=True),
+                    resources=shares.values_list('resource_id', flat=True))
+
+
 class ProvenanceBase(models.Model):
     """Methods reused by all provenance classes
 
@@ -1472,7 +1672,14 @@ class UserAccess(models.Model):
             # GroupResourcePrivilege.objects.filter(group=this_group).delete()
             # access_group.delete()
 
-            this_group.delete()
+            # members lose privileges granted through the group
+            members = list(UserGroupPrivilege.objects.filter(group=this_group)
+                                                     .values_list('user_id', flat=True))
+            resources = list(GroupResourcePrivilege.objects.filter(group=this_group)
+                                                           .values_list('resource_id', flat=True))
+            with transaction.atomic():
+                this_group.delete()
+                UserResourceEffectivePrivilege.refresh(users=members, resources=resources)
         else:
             raise PermissionDenied("User must own group")
 
@@ -3531,6 +3738,12 @@ class GroupAccess(models.Model):
     date_created = models.DateTimeField(editable=False, auto_now_add=True)
     picture = models.ImageField(upload_to='group', null=True, blank=True)
 
+    def save(self, *args, **kwargs):
+        """ Save group flags; the active flag determines whether group privileges apply """
+        with transaction.atomic():
+            super(GroupAccess, self).save(*args, **kwargs)
+            UserResourceEffectivePrivilege.refresh_group(self.group)
+
     ####################################
     # group membership: owners, edit_users, view_users are parallel to those in resources
     ####################################
@@ -3992,9 +4205,16 @@ class ResourceAccess(models.Model):
         if not this_user.is_active:
             raise PermissionDenied("Grantee user is not active")
 
-        user_priv = self.get_effective_user_privilege(this_user)
-        group_priv = self.get_effective_group_privilege(this_user)
-        return min(user_priv, group_priv)
+        if this_user.is_superuser:
+            return PrivilegeCodes.OWNER
+
+        # user and group privileges are materialized together; flags are applied here.
+        privilege = UserResourceEffectivePrivilege.get_privilege(user=this_user,
+                                                                 resource=self.resource)
+        if self.immutable and privilege == PrivilegeCodes.CHANGE:
+            return PrivilegeCodes.VIEW
+        else:
+            return privilege
 
     @property
     def sharing_status(self):
@@ -0,0 +1,120 @@
+from django.test import TestCase
+from django.contrib.auth.models import Group
+
+from hs_access_control.models import PrivilegeCodes, UserResourceEffectivePrivilege
+
+from hs_core import hydroshare
+from hs_core.testing import MockIRODSTestCaseMixin
+
+from hs_access_control.tests.utilities import global_reset
+
+
+class T17EffectivePrivilege(MockIRODSTestCaseMixin, TestCase):
+    "Test that materialized effective privileges track sharing"
+
+    def setUp(self):
+        super(T17EffectivePrivilege, self).setUp()
+        global_reset()
+        self.group, _ = Group.objects.get_or_create(name='Resource Author')
+
+        self.dog = hydroshare.create_account(
+            'dog@gmail.com',
+            username='dog',
+            first_name='a little arfer',
+            last_name='last_name_dog',
+            superuser=False,
+            groups=[]
+        )
+
+        self.cat = hydroshare.create_account(
+            'cat@gmail.com',
+            username='cat',
+            first_name='not a dog',
+            last_name='last_name_cat',
+            superuser=False,
+            groups=[]
+        )
+
+        self.scratching = hydroshare.create_resource(
+            resource_type='GenericResource',
+            owner=self.dog,
+            title='all about sofas as scratching posts',
+            metadata=[],
+        )
+
+        self.felines = self.dog.uaccess.create_group(
+            title='felines', description="We are the felines")
+
+    def assertMaterialized(self, user, privilege):
+        self.assertEqual(
+            UserResourceEffectivePrivilege.get_privilege(user=user, resource=self.scratching),
+            privilege)
+
+    def assertRebuildMatches(self):
+        before = set(UserResourceEffectivePrivilege.objects
+                     .values_list('user_id', 'resource_id', 'privilege'))
+        UserResourceEffectivePrivilege.refresh()
+        after = set(UserResourceEffectivePrivilege.objects
+                    .values_list('user_id', 'resource_id', 'privilege'))
+        self.assertEqual(before, after)
+
+    def test_01_user_sharing(self):
+        """Sharing with a user is materialized"""
+        self.assertMaterialized(self.dog, PrivilegeCodes.OWNER)
+        self.assertMaterialized(self.cat, PrivilegeCodes.NONE)
+
+        self.dog.uaccess.share_resource_with_user(self.scratching, self.cat,
+                                                  PrivilegeCodes.CHANGE)
+        self.assertMaterialized(self.cat, PrivilegeCodes.CHANGE)
+        self.assertRebuildMatches()
+
+        self.dog.uaccess.undo_share_resource_with_user(self.scratching, self.cat)
+        self.assertMaterialized(self.cat, PrivilegeCodes.NONE)
+        self.assertRebuildMatches()
+
+    def test_02_group_sharing(self):
+        """Sharing via a group is materialized for each member"""
+        self.dog.uaccess.share_group_with_user(self.felines, self.cat, PrivilegeCodes.VIEW)
+        self.dog.uaccess.share_resource_with_group(self.scratching, self.felines,
+                                                   PrivilegeCodes.CHANGE)
+        self.assertMaterialized(self.cat, PrivilegeCodes.CHANGE)
+        # user privilege does not lower privilege via group
+        self.dog.uaccess.share_resource_with_user(self.scratching, self.cat,
+                                                  PrivilegeCodes.VIEW)
+        self.assertMaterialized(self.cat, PrivilegeCodes.CHANGE)
+        self.assertRebuildMatches()
+
+        self.dog.uaccess.unshare_group_with_user(self.felines, self.cat)
+        self.assertMaterialized(self.cat, PrivilegeCodes.VIEW)
+        self.assertRebuildMatches()
+
+    def test_03_group_flags(self):
+        """Inactive and deleted groups confer no privilege"""
+        self.dog.uaccess.share_group_with_user(self.felines, self.cat, PrivilegeCodes.VIEW)
+        self.dog.uaccess.share_resource_with_group(self.scratching, self.felines,
+                                                   PrivilegeCodes.CHANGE)
+
+        self.felines.gaccess.active = False
+        self.felines.gaccess.save()
+        self.assertMaterialized(self.cat, PrivilegeCodes.NONE)
+        self.assertRebuildMatches()
+
+        self.felines.gaccess.active = True
+        self.felines.gaccess.save()
+        self.assertMaterialized(self.cat, PrivilegeCodes.CHANGE)
+
+        self.dog.uaccess.delete_group(self.felines)
+        self.assertMaterialized(self.cat, PrivilegeCodes.NONE)
+        self.assertRebuildMatches()
+
+    def test_04_resource_flags(self):
+        """Resource flags are applied when privilege is read"""
+        self.dog.uaccess.share_resource_with_user(self.scratching, self.cat,
+                                                  PrivilegeCodes.CHANGE)
+        self.scratching.raccess.immutable = True
+        self.scratching.raccess.save()
+        self.assertMaterialized(self.cat, PrivilegeCodes.CHANGE)
+        self.assertEqual(self.scratching.raccess.get_effective_privilege(self.cat),
+                         PrivilegeCodes.VIEW)
+        self.assertEqual(self.scratching.raccess.get_effective_privilege(self.dog),
+                         PrivilegeCodes.OWNER)
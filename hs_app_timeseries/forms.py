@@ -738,6 +738,8 @@ UpdateSQLiteLayout = Layout(HTML("""
             <input id="can-update-sqlite-file" type="hidden"
             value="{{ cm.can_update_sqlite_file }}">
             <input id="metadata-dirty" type="hidden" value="{{ cm.metadata.is_dirty }}">
+            <input id="sqlite-update-task-id" type="hidden"
+            value="{{ sqlite_update_task_id|default:'' }}">
             <form action="/timeseries/sqlite/update/{{ cm.short_id }}/" method="post"
             enctype="multipart/form-data">
                 {% csrf_token %}
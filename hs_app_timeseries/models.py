@@ -1,9 +1,12 @@
 import os
 import sqlite3
 import csv
+import itertools
+import time
 import shutil
 import logging
 from uuid import uuid4
+from datetime import datetime
 from dateutil import parser
 import json
 
@@ -12,7 +15,7 @@ from django.contrib.contenttypes.fields import GenericRelation
 from django.contrib.postgres.fields import ArrayField
 from django.core.files.uploadedfile import UploadedFile
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.utils.timezone import now
 
 from mezzanine.pages.page_processors import processor_for
@@ -22,6 +25,15 @@ from hs_core.models import BaseResource, ResourceManager, resource_processor, Co
 from hs_core.hydroshare import utils
 from hs_core.hydroshare import add_resource_files
 
+# number of csv rows read and written to the sqlite file at a time
+CSV_VALUES_BATCH_SIZE = 5000
+
+# formats tried, in order, on the first rows of the date time column of a csv file; the whole
+# column is then parsed with the first format that fits
+CSV_DATETIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M',
+                        '%Y-%m-%dT%H:%M', '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M', '%Y-%m-%d',
+                        '%m/%d/%Y')
+
 
 class TimeSeriesAbstractMetaDataElement(AbstractMetaDataElement):
     # for associating an metadata element with one or more time series
@@ -973,65 +985,94 @@ class TimeSeriesMetaData(CoreMetaData):
         copy_cv_terms(CVMedium, src_md.cv_mediums.all())
         copy_cv_terms(CVAggregationStatistic, src_md.cv_aggregation_statistics.all())
 
-    def update_sqlite_file(self, user):
+    def update_sqlite_file(self, user, progress=None):
+        """
+        writes metadata changes to the sqlite file of the resource and pushes it to iRODS.
+        Only tables of changed metadata elements are updated, and the file is pushed to iRODS
+        only if any table was changed. The file is retrieved from iRODS only if the local copy
+        kept from the last update doesn't match the checksum of the file in iRODS.
+        :param user: current user (must have edit permission on resource) who is updating the
+        sqlite file to sync metadata changes in django database.
+        :param progress: optional function called with (step, number of steps, description)
+        as the update proceeds.
+        :return:
+        """
         if not self.is_dirty:
             return
 
+        def report_progress(step, description):
+            if progress is not None:
+                progress(step, 3, description)
+
         if not self.resource.has_sqlite_file and self.resource.can_add_blank_sqlite_file:
             self.resource.add_blank_sqlite_file(user)
 
         log = logging.getLogger()
 
+        report_progress(1, "Retrieving SQLite file")
         sqlite_file_to_update = utils.get_resource_files_by_extension(self.resource, ".sqlite")[0]
-        # retrieve the sqlite file from iRODS and save it to temp directory
+        # retrieve the sqlite file from iRODS to a temp directory
         temp_sqlite_file = utils.get_file_from_irods(sqlite_file_to_update)
 
         if self.resource.has_csv_file and self.resource.metadata.series_names:
+            report_progress(2, "Writing metadata to SQLite file")
             self.populate_blank_sqlite_file(temp_sqlite_file, user)
+            report_progress(3, "SQLite file was updated")
         else:
             try:
-                con = sqlite3.connect(temp_sqlite_file)
-                with con:
-                    # get the records in python dictionary format
-                    con.row_factory = sqlite3.Row
-                    cur = con.cursor()
-                    self._update_datasets_table(con, cur)
-
-                    # update people related tables (People, Affiliations, Organizations, ActionBy)
-                    # using updated creators/contributors in django db
-
-                    # insert record to People table
-                    people_data = self._update_people_table_insert(con, cur)
-
-                    # insert record to Organizations table
-                    self._update_organizations_table_insert(con, cur)
-
-                    # insert record to Affiliations table
-                    self._update_affiliations_table_insert(con, cur, people_data)
-
-                    # insert record to ActionBy table
-                    self._update_actionby_table_insert(con, cur, people_data)
-
-                    # since we are allowing user to set the UTC offset in case of CSV file
-                    # upload we have to update the actions table
-                    self._update_utcoffset_related_tables(con, cur)
-
-                    # update resource specific metadata
-                    self._update_variables_table(con, cur)
-                    self._update_methods_table(con, cur)
-                    self._update_processinglevels_table(con, cur)
-                    self._update_sites_related_tables(con, cur)
-                    self._update_results_related_tables(con, cur)
-
-                    # update CV terms related tables
-                    self._update_CV_tables(con, cur)
-
-                    # push the updated sqlite file to iRODS
-                    utils.replace_resource_file_on_irods(temp_sqlite_file, sqlite_file_to_update,
-                                                         user)
+                # metadata elements are marked clean as their tables are updated; if the update
+                # fails they are restored to dirty, so that the update can be run again
+                with transaction.atomic():
+                    report_progress(2, "Writing metadata changes to SQLite file")
+                    con = sqlite3.connect(temp_sqlite_file)
+                    with con:
+                        # get the records in python dictionary format
+                        con.row_factory = sqlite3.Row
+                        cur = con.cursor()
+                        self._update_datasets_table(con, cur)
+
+                        # update people related tables (People, Affiliations, Organizations,
+                        # ActionBy) using updated creators/contributors in django db
+                        if self._people_tables_need_update(cur):
+                            # insert record to People table
+                            people_data = self._update_people_table_insert(con, cur)
+
+                            # insert record to Organizations table
+                            self._update_organizations_table_insert(con, cur)
+
+                            # insert record to Affiliations table
+                            self._update_affiliations_table_insert(con, cur, people_data)
+
+                            # insert record to ActionBy table
+                            self._update_actionby_table_insert(con, cur, people_data)
+
+                        # since we are allowing user to set the UTC offset in case of CSV file
+                        # upload we have to update the actions table
+                        self._update_utcoffset_related_tables(con, cur)
+
+                        # update resource specific metadata
+                        self._update_variables_table(con, cur)
+                        self._update_methods_table(con, cur)
+                        self._update_processinglevels_table(con, cur)
+                        self._update_sites_related_tables(con, cur)
+                        self._update_results_related_tables(con, cur)
+
+                        # update CV terms related tables
+                        self._update_CV_tables(con, cur)
+                        file_changed = con.total_changes > 0
+                    con.close()
+
+                    report_progress(3, "Saving SQLite file")
+                    if file_changed:
+                        # push the updated sqlite file to iRODS
+                        utils.replace_resource_file_on_irods(temp_sqlite_file,
+                                                             sqlite_file_to_update, user)
                     self.is_dirty = False
                     self.save()
+                if file_changed:
                     log.info("SQLite file update was successful.")
+                else:
+                    log.info("SQLite file was already in sync with metadata.")
             except sqlite3.Error as ex:
                 sqlite_err_msg = str(ex.args[0])
                 log.error("Failed to update SQLite file. Error:{}".format(sqlite_err_msg))
@@ -1040,7 +1081,7 @@ class TimeSeriesMetaData(CoreMetaData):
                 log.exception("Failed to update SQLite file. Error:{}".format(ex.message))
                 raise ex
             finally:
-                if os.path.exists(temp_sqlite_file):
+                if os.path.exists(os.path.dirname(temp_sqlite_file)):
                     shutil.rmtree(os.path.dirname(temp_sqlite_file))
 
     def populate_blank_sqlite_file(self, temp_sqlite_file, user):
@@ -1149,11 +1190,6 @@ class TimeSeriesMetaData(CoreMetaData):
             if os.path.exists(temp_csv_file):
                 shutil.rmtree(os.path.dirname(temp_csv_file))
 
-    def _read_csv_specified_column(self, csv_reader, data_column_index):
-        # generator function to read (one row) the datetime column and the specified data column
-        for row in csv_reader:
-            yield row[0], row[data_column_index]
-
     def _update_metadata_element_series_ids_with_guids(self):
         # replace sequential series ids (0, 1, 2 ...) with GUID
         # only needs to be done in case of csv file upload before
@@ -1231,15 +1267,7 @@ class TimeSeriesMetaData(CoreMetaData):
         for index, person in enumerate(list(self.creators.all()) +
                                        list(self.contributors.all())):
             person_id = index + 1
-            name_parts = person.name.split()
-            first_name = name_parts[0]
-            mid_name = ''
-            last_name = ''
-            if len(name_parts) > 2:
-                mid_name = name_parts[1]
-                last_name = name_parts[2]
-            elif len(name_parts) == 2:
-                last_name = name_parts[1]
+            first_name, mid_name, last_name = _split_person_name(person.name)
             cur.execute(insert_sql, (person_id, first_name, mid_name, last_name), )
             is_creator = isinstance(person, Creator)
             people_data.append({'person_id': person_id,
@@ -1251,6 +1279,26 @@ class TimeSeriesMetaData(CoreMetaData):
                                 'object_id': person.id})
         return people_data
 
+    def _people_tables_need_update(self, cur):
+        # checks whether the People, Organizations and Affiliations tables differ from the
+        # creators/contributors in django db
+        # used for updating the sqlite file that is not blank
+        cur.execute("SELECT People.PersonFirstName, People.PersonMiddleName, "
+                    "People.PersonLastName, Affiliations.PrimaryPhone, "
+                    "Affiliations.PrimaryEmail, Affiliations.PrimaryAddress, "
+                    "Organizations.OrganizationName FROM People "
+                    "LEFT JOIN Affiliations ON Affiliations.PersonID = People.PersonID "
+                    "LEFT JOIN Organizations "
+                    "ON Organizations.OrganizationID = Affiliations.OrganizationID "
+                    "ORDER BY People.PersonID")
+        people_in_file = [tuple(row) for row in cur.fetchall()]
+        people = []
+        for person in (list(self.creators.all()) + list(self.contributors.all())):
+            people.append(_split_person_name(person.name) +
+                          (person.phone, person.email if person.email else '', person.address,
+                           person.organization if person.organization else 'Unknown'))
+        return people != people_in_file
+
     def _update_organizations_table_insert(self, con, cur):
         # insert record to Organizations table - first delete any existing records
         # used for updating a sqlite file that is blank (case of CSV upload)
@@ -1449,51 +1497,60 @@ class TimeSeriesMetaData(CoreMetaData):
     def _update_timeseriesresultvalues_table_insert(self, con, cur, temp_csv_file, results_data):
         # insert record to TimeSeriesResultValues table - first delete any existing records
         # used for updating a sqlite file that is blank (case of CSV upload)
-
+        log = logging.getLogger()
         cur.execute("DELETE FROM TimeSeriesResultValues")
         con.commit()
+        # the sqlite file is a temporary copy that is pushed to iRODS once written, so there is
+        # no need to guard it against crashes while loading the data values
+        cur.execute("PRAGMA synchronous = OFF")
+        cur.execute("PRAGMA journal_mode = MEMORY")
+        cur.execute("PRAGMA temp_store = MEMORY")
         insert_sql = "INSERT INTO TimeSeriesResultValues (ValueID, ResultID, DataValue, " \
                      "ValueDateTime, ValueDateTimeUTCOffset, CensorCodeCV, " \
                      "QualityCodeCV, TimeAggregationInterval, " \
                      "TimeAggregationIntervalUnitsID) VALUES(?,?,?,?,?,?,?,?,?)"
 
-        # read the csv file to determine time interval (in minutes) between each reading
-        # we will use the first 2 rows of data to determine this value
         utc_offset = self.utc_offset.value
+        start_time = time.time()
+        value_count = 0
         with open(temp_csv_file, 'r') as fl_obj:
             csv_reader = csv.reader(fl_obj, delimiter=',')
             # read the first row (header)
             header = csv_reader.next()
-            first_row_data = csv_reader.next()
-            second_row_data = csv_reader.next()
-            time_interval = (parser.parse(second_row_data[0]) -
-                             parser.parse(first_row_data[0])).seconds / 60
-
-        with open(temp_csv_file, 'r') as fl_obj:
-            csv_reader = csv.reader(fl_obj, delimiter=',')
-            # read the first row (header) and skip
-            csv_reader.next()
-            value_id = 1
-            data_header = header[1:]
-            for col, value in enumerate(data_header):
+            result_ids = []
+            for value in header[1:]:
                 # get the ts_result object with matching series_label
                 ts_result = [ts_item for ts_item in self.time_series_results if
                              ts_item.series_label == value][0]
                 # get the result id associated with ts_result object
                 result_data_item = [dict_item for dict_item in results_data if
                                     dict_item['object_id'] == ts_result.id][0]
-                result_id = result_data_item['result_id']
-                data_col_index = col + 1
-                # start at the beginning of data row
-                fl_obj.seek(0)
-                csv_reader.next()
-                for date_time, data_value in self._read_csv_specified_column(
-                        csv_reader, data_col_index):
-                    date_time = parser.parse(date_time)
-                    cur.execute(insert_sql, (value_id, result_id, data_value,
-                                             date_time, utc_offset, 'Unknown', 'Unknown',
-                                             time_interval, 102), )
-                    value_id += 1
+                result_ids.append(result_data_item['result_id'])
+
+            # the csv file is read only once, in batches of rows; the first rows of data
+            # determine the format of the date time column and the time interval (in minutes)
+            # between each reading
+            rows = list(itertools.islice(csv_reader, CSV_VALUES_BATCH_SIZE))
+            datetime_format = _detect_datetime_format([row[0] for row in rows[:10]])
+            date_times = _parse_datetimes([row[0] for row in rows[:2]], datetime_format)
+            time_interval = (date_times[1] - date_times[0]).seconds / 60
+
+            value_id = 1
+            while rows:
+                date_times = _parse_datetimes([row[0] for row in rows], datetime_format)
+                values = []
+                for date_time, row in zip(date_times, rows):
+                    for result_id, data_value in zip(result_ids, row[1:]):
+                        values.append((value_id, result_id, data_value, date_time, utc_offset,
+                                       'Unknown', 'Unknown', time_interval, 102))
+                        value_id += 1
+                cur.executemany(insert_sql, values)
+                value_count += len(values)
+                rows = list(itertools.islice(csv_reader, CSV_VALUES_BATCH_SIZE))
+
+        elapsed_time = max(time.time() - start_time, 0.001)
+        log.info("Inserted {} time series values in {:.1f} seconds ({:.0f} values/sec)".format(
+            value_count, elapsed_time, value_count / elapsed_time))
 
     def _update_CV_tables(self, con, cur):
         # here 'is_dirty' true means a new term has been added
@@ -1523,11 +1580,13 @@ class TimeSeriesMetaData(CoreMetaData):
     def _update_datasets_table(self, con, cur):
         # updates the Datasets table
         # used for updating the sqlite file that is not blank
+        # only a changed title or abstract is written, so that the file is left unchanged
+        # otherwise
         update_sql = "UPDATE Datasets SET DatasetTitle=?, DatasetAbstract=? " \
-                     "WHERE DatasetID=1"
+                     "WHERE DatasetID=1 AND (DatasetTitle IS NOT ? OR DatasetAbstract IS NOT ?)"
         ds_title = self.title.value
         ds_abstract = self.description.abstract
-        cur.execute(update_sql, (ds_title, ds_abstract), )
+        cur.execute(update_sql, (ds_title, ds_abstract, ds_title, ds_abstract), )
         con.commit()
 
     def _update_datasets_table_insert(self, con, cur):
@@ -2004,3 +2063,46 @@ def _get_series_ids(element_class, metadata_obj):
     for element in elements:
         series_ids += element.series_ids
     return series_ids
+
+
+def _detect_datetime_format(date_time_strings):
+    """
+    Return the first of CSV_DATETIME_FORMATS that parses all the given date time strings, or
+    None if no format fits.
+    """
+    for datetime_format in CSV_DATETIME_FORMATS:
+        try:
+            for date_time_str in date_time_strings:
+                datetime.strptime(date_time_str.strip(), datetime_format)
+        except ValueError:
+            continue
+        return datetime_format
+    return None
+
+
+def _parse_datetimes(date_time_strings, datetime_format):
+    """
+    Parse date time strings with the given format, falling back to guessing the format of any
+    string that does not fit (or of all strings if datetime_format is None).
+    """
+    date_times = []
+    for date_time_str in date_time_strings:
+        try:
+            date_times.append(datetime.strptime(date_time_str.strip(), datetime_format))
+        except (TypeError, ValueError):
+            date_times.append(parser.parse(date_time_str))
+    return date_times
+
+
+def _split_person_name(name):
+    # returns the first, middle and last name written to the People table for a person name
+    name_parts = name.split()
+    first_name = name_parts[0]
+    mid_name = ''
+    last_name = ''
+    if len(name_parts) > 2:
+        mid_name = name_parts[1]
+        last_name = name_parts[2]
+    elif len(name_parts) == 2:
+        last_name = name_parts[1]
+    return first_name, mid_name, last_name
@@ -22,7 +22,10 @@ def landing_page(request, page):
     """
     content_model = page.get_content_model()
     edit_resource = page_processors.check_resource_mode(request)
-    if content_model.metadata.is_dirty and content_model.can_update_sqlite_file:
+    # id of the task updating the sqlite file, started by the last request of the user
+    sqlite_update_task_id = request.session.pop('sqlite_update_task_id', None)
+    if content_model.metadata.is_dirty and content_model.can_update_sqlite_file and \
+            sqlite_update_task_id is None:
         messages.info(request, "SQLite file is out of sync with metadata changes.")
 
     extended_metadata_exists = False
@@ -86,6 +89,7 @@ def landing_page(request, page):
                                              extended_metadata_exists)
 
     context['is_resource_specific_tab_active'] = is_resource_specific_tab_active
+    context['sqlite_update_task_id'] = sqlite_update_task_id
 
     # TODO: can we refactor to make it impossible to skip adding the generic context
     hs_core_context = add_generic_context(request, page)
@@ -0,0 +1,46 @@
+from __future__ import absolute_import
+
+import logging
+
+from celery import shared_task
+
+from django.contrib.auth.models import User
+
+from hs_core.hydroshare import utils
+
+
+# Pass 'django' into getLogger instead of __name__
+# for celery tasks (see hs_core.tasks)
+logger = logging.getLogger('django')
+
+
+@shared_task(bind=True)
+def update_sqlite_file(self, resource_id, user_id):
+    """
+    Sync the sqlite file of a time series resource with metadata changes. This runs as a
+    celery task so that the web request does not wait for the sqlite file to be retrieved from
+    and pushed to iRODS, which takes minutes for large files.
+
+    Progress is reported in the task state 'PROGRESS' with meta data 'step', 'steps' and
+    'description', which can be polled through the task status api. If the update fails,
+    changed metadata elements are left marked as such, so that the task can be run again.
+    :param
+    resource_id: the short id of the time series resource
+    user_id: id of the user (with edit permission on the resource) who requested the update
+    :return: the short id of the resource
+    """
+    resource = utils.get_resource_by_shortkey(resource_id, or_404=False)
+    user = User.objects.get(pk=user_id)
+
+    def progress(step, steps, description):
+        if not self.request.called_directly:
+            self.update_state(state='PROGRESS',
+                              meta={'step': step, 'steps': steps, 'description': description})
+
+    try:
+        resource.metadata.update_sqlite_file(user, progress=progress)
+    except Exception as ex:
+        logger.exception("Failed to update SQLite file of resource {}. Error:{}".format(
+            resource_id, ex.message))
+        raise
+    return resource_id
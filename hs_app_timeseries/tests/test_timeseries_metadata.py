@@ -2,6 +2,9 @@ import os
 import sqlite3
 import tempfile
 import shutil
+from datetime import datetime
+
+import mock
 
 from xml.etree import ElementTree as ET
 
@@ -18,7 +21,7 @@ from hs_core.testing import MockIRODSTestCaseMixin, TestCaseCommonUtilities
 from hs_app_timeseries.models import TimeSeriesResource, Site, Variable, Method, ProcessingLevel, \
     TimeSeriesResult, CVVariableType, CVVariableName, CVSpeciation, CVElevationDatum, CVSiteType, \
     CVMethodType, CVUnitsType, CVStatus, CVMedium, CVAggregationStatistic, TimeSeriesMetaData, \
-    UTCOffSet
+    UTCOffSet, CSV_DATETIME_FORMATS, _detect_datetime_format, _parse_datetimes
 
 
 class TestTimeSeriesMetaData(MockIRODSTestCaseMixin, TestCaseCommonUtilities, TransactionTestCase):
@@ -2131,6 +2134,69 @@ class TestTimeSeriesMetaData(MockIRODSTestCaseMixin, TestCaseCommonUtilities, Tr
             self.resTimeSeries.metadata.update_element('processinglevel', pro_level.id,
                                                        processing_level_code=101)
 
+    def test_csv_datetime_formats(self):
+        # each supported format of the date time column of a csv file is detected
+        date_time = datetime(2008, 1, 2, 13, 30)
+        for datetime_format in CSV_DATETIME_FORMATS:
+            date_time_strings = [date_time.strftime(datetime_format)] * 2
+            self.assertEqual(_detect_datetime_format(date_time_strings), datetime_format)
+            parsed = _parse_datetimes(date_time_strings, datetime_format)
+            self.assertEqual(parsed[0], datetime.strptime(date_time_strings[0],
+                                                          datetime_format))
+
+        # a column mixing formats has no format, and each value is parsed on its own
+        mixed = ['2008-01-02 13:30:00', '01/02/2008 14:00']
+        self.assertEqual(_detect_datetime_format(mixed), None)
+        self.assertEqual(_parse_datetimes(mixed, None),
+                         [datetime(2008, 1, 2, 13, 30), datetime(2008, 1, 2, 14, 0)])
+
+        # values not fitting the format detected on the first rows are parsed on their own
+        self.assertEqual(_parse_datetimes(mixed, '%Y-%m-%d %H:%M:%S'),
+                         [datetime(2008, 1, 2, 13, 30), datetime(2008, 1, 2, 14, 0)])
+
+        # unparseable values have no format and fail to parse
+        self.assertEqual(_detect_datetime_format(['not a date']), None)
+        with self.assertRaises(ValueError):
+            _parse_datetimes(['not a date'], None)
+
+    def test_csv_values_batches(self):
+        # the values of a csv file longer than a batch are all loaded to the sqlite file
+        self._upload_valid_csv_file()
+        metadata = self.resTimeSeries.metadata
+        results_data = []
+        for series_id, series_label in enumerate(['Temp_DegC_Mendon', 'Temp_DegC_Paradise']):
+            ts_result = metadata.create_element('timeseriesresult', series_ids=[str(series_id)],
+                                                units_type='Temperature',
+                                                units_name='Degree F',
+                                                units_abbreviation='degF',
+                                                status='Complete',
+                                                sample_medium='Air',
+                                                value_count=20,
+                                                aggregation_statistics='Average',
+                                                series_label=series_label)
+            results_data.append({'result_id': series_id + 1, 'object_id': ts_result.id})
+        metadata.create_element('UTCOffset', value=-7.5)
+
+        con = sqlite3.connect(':memory:')
+        cur = con.cursor()
+        cur.execute("CREATE TABLE TimeSeriesResultValues (ValueID INTEGER, ResultID INTEGER, "
+                    "DataValue FLOAT, ValueDateTime DATETIME, ValueDateTimeUTCOffset INTEGER, "
+                    "CensorCodeCV VARCHAR, QualityCodeCV VARCHAR, "
+                    "TimeAggregationInterval FLOAT, TimeAggregationIntervalUnitsID INTEGER)")
+        csv_file = os.path.join(self.temp_dir, self.odm2_csv_file_name)
+        with mock.patch('hs_app_timeseries.models.CSV_VALUES_BATCH_SIZE', 3):
+            metadata._update_timeseriesresultvalues_table_insert(con, cur, csv_file,
+                                                                 results_data)
+
+        cur.execute("SELECT ValueID, ResultID, DataValue, ValueDateTime, "
+                    "TimeAggregationInterval FROM TimeSeriesResultValues ORDER BY ValueID")
+        rows = cur.fetchall()
+        con.close()
+        # 20 rows of 2 data columns each
+        self.assertEqual([row[0] for row in rows], range(1, 41))
+        self.assertEqual(rows[0][1:], (1, 0.1766667, '2008-01-01 00:00:00', 30))
+        self.assertEqual(rows[-1][1:], (2, -9999, '2008-01-01 09:30:00', 30))
+
     def _upload_valid_csv_file(self):
         # first add a valid csv file to the resource
         files = [UploadedFile(file=self.odm2_csv_file_obj, name=self.odm2_csv_file_name)]
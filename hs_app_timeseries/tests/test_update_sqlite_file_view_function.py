@@ -1,4 +1,5 @@
 import os
+import json
 import tempfile
 import shutil
 
@@ -69,6 +70,20 @@ class TestUpdateSQLiteFile(MockIRODSTestCaseMixin, TestCase):
         request.user = self.john
         response = update_sqlite_file(request, resource_id=self.resTimeSeries.short_id)
         self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        # the landing page polls the task updating the sqlite file
+        self.assertIn('sqlite_update_task_id', request.session)
+
+    def test_update_sqlite_file_ajax(self):
+        url = reverse('update_sqlite_file', kwargs={'resource_id': self.resTimeSeries.short_id})
+        request = self.factory.post(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self._set_request_message_attributes(request)
+        request.user = self.john
+        response = update_sqlite_file(request, resource_id=self.resTimeSeries.short_id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response_data = json.loads(response.content)
+        self.assertIn('task_id', response_data)
+        self.assertEqual(response_data['status_url'],
+                         reverse('get_task_status', kwargs={'task_id': response_data['task_id']}))
 
     def test_update_sqlite_file_exception(self):
         # trying to update sqlite file for non timeseries resource should raise exception
@@ -83,6 +98,6 @@ class TestUpdateSQLiteFile(MockIRODSTestCaseMixin, TestCase):
     def _set_request_message_attributes(self, request):
         # the following 3 lines are for preventing error in unit test due to the view being
         # tested uses messaging middleware
-        setattr(request, 'session', 'session')
+        setattr(request, 'session', {})
         messages = FallbackStorage(request)
         setattr(request, '_messages', messages)
@@ -1,10 +1,12 @@
 import logging
 
 from django.contrib import messages
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, JsonResponse
 from django.core.exceptions import ValidationError
+from django.core.urlresolvers import reverse
 
 from hs_core.views.utils import authorize, ACTION_TO_AUTHORIZE
+from hs_app_timeseries import tasks
 
 
 def update_sqlite_file(request, resource_id, *args, **kwargs):
@@ -17,13 +19,17 @@ def update_sqlite_file(request, resource_id, *args, **kwargs):
         raise ValidationError("The resource is not of type TimeSeries. SQLite file update is "
                               "allowed only for timeseries resources.")
     else:
-        try:
-            res.metadata.update_sqlite_file(user)
-            messages.success(request, "SQLite file update was successful.")
-            log.info("SQLite file update was successful for resource ID:{}.".format(res.short_id))
-        except Exception as ex:
-            messages.error(request, "Failed to update SQLite file. Error:{}".format(ex.message))
-            log.exception("Failed to update SQLite file. Error:{}".format(ex.message))
+        # the sqlite file is updated by a celery task, which can take minutes for large files
+        task = tasks.update_sqlite_file.apply_async((res.short_id, user.pk))
+        log.info("SQLite file update task {} started for resource ID:{}.".format(
+            task.task_id, res.short_id))
+        if request.is_ajax():
+            return JsonResponse({'task_id': task.task_id,
+                                 'status_url': reverse('get_task_status',
+                                                       kwargs={'task_id': task.task_id})})
+        # the resource landing page polls the task until the update is complete
+        request.session['sqlite_update_task_id'] = task.task_id
+        messages.info(request, "SQLite file update has started.")
 
     if 'resource-mode' in request.POST:
         request.session['resource-mode'] = 'edit'
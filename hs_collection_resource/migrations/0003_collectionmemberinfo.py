@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hs_core', '0038_resourcefile_system_metadata'),
+        ('hs_collection_resource', '0002_collectiondeletedresource_resource_owners'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectionMemberInfo',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('csv_row', models.TextField()),
+                ('lon_min', models.FloatField(null=True)),
+                ('lon_max', models.FloatField(null=True)),
+                ('lat_min', models.FloatField(null=True)),
+                ('lat_max', models.FloatField(null=True)),
+                ('date_min', models.DateField(null=True)),
+                ('date_max', models.DateField(null=True)),
+                ('resource', models.OneToOneField(related_name='collection_member_info', to='hs_core.BaseResource')),
+            ],
+        ),
+    ]
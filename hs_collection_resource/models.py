@@ -68,3 +68,22 @@ class CollectionDeletedResource(models.Model):
     resource_id = models.CharField(max_length=32)
     resource_type = models.CharField(max_length=50)
     resource_owners = models.ManyToManyField(User, related_name='collectionDeleted')
+
+
+class CollectionMemberInfo(models.Model):
+    """
+    The row of the collection list csv file and the coverage extent of a resource contained in
+    collections, cached so that collections need not query every member when they change.
+
+    The info of a resource is deleted whenever its title, coverages, owners or sharing status
+    change (see receivers.py) and is recreated by utils.get_member_infos when next needed.
+    """
+    resource = models.OneToOneField(BaseResource, related_name='collection_member_info')
+    # csv row as a json list
+    csv_row = models.TextField()
+    lon_min = models.FloatField(null=True)
+    lon_max = models.FloatField(null=True)
+    lat_min = models.FloatField(null=True)
+    lat_max = models.FloatField(null=True)
+    date_min = models.DateField(null=True)
+    date_max = models.DateField(null=True)
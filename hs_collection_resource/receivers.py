@@ -1,10 +1,14 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
+from hs_core.models import Title, Coverage
 from hs_core.signals import pre_add_files_to_resource, pre_check_bag_flag, pre_download_file
 from hs_core.hydroshare.utils import set_dirty_bag_flag
+from hs_access_control.models import ResourceAccess, UserResourcePrivilege, PrivilegeCodes
 
-from hs_collection_resource.models import CollectionResource
-from hs_collection_resource.utils import update_collection_list_csv
+from hs_collection_resource.models import CollectionResource, CollectionMemberInfo
+from hs_collection_resource.utils import update_collection_list_csv, CSV_CHECKSUM_KEY
 
 
 @receiver(pre_add_files_to_resource, sender=CollectionResource)
@@ -19,9 +23,13 @@ def pre_check_bag_flag_handler(sender, **kwargs):
 
     collection_res_obj = kwargs['resource']
     if collection_res_obj.update_text_file.lower() == 'true':
+        old_checksum = collection_res_obj.extra_data.get(CSV_CHECKSUM_KEY, None)
         update_collection_list_csv(collection_res_obj)
-        set_dirty_bag_flag(collection_res_obj)
-        collection_res_obj.extra_data = {'update_text_file': 'False'}
+        # the bag only needs to be regenerated if the csv file has changed
+        if collection_res_obj.extra_data.get(CSV_CHECKSUM_KEY, None) != old_checksum:
+            set_dirty_bag_flag(collection_res_obj)
+        collection_res_obj.extra_data = dict(collection_res_obj.extra_data,
+                                             update_text_file='False')
         collection_res_obj.save()
 
 
@@ -29,5 +37,32 @@ def pre_check_bag_flag_handler(sender, **kwargs):
 def pre_download_file_handler(sender, **kwargs):
 
     collection_res_obj = kwargs['resource']
-    collection_res_obj.extra_data = {'update_text_file': 'True'}
+    collection_res_obj.extra_data = dict(collection_res_obj.extra_data, update_text_file='True')
     collection_res_obj.save()
+
+
+# The cached csv row and coverage extent of a resource contained in collections are deleted
+# when anything they are made from changes, and recreated by utils.get_member_infos.
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+@receiver(post_save, sender=Coverage)
+@receiver(post_delete, sender=Coverage)
+def metadata_element_changed_handler(sender, instance, **kwargs):
+    CollectionMemberInfo.objects.filter(resource__object_id=instance.object_id).delete()
+
+
+@receiver(post_save, sender=ResourceAccess)
+@receiver(post_save, sender=UserResourcePrivilege)
+@receiver(post_delete, sender=UserResourcePrivilege)
+def resource_access_changed_handler(sender, instance, **kwargs):
+    CollectionMemberInfo.objects.filter(resource_id=instance.resource_id).delete()
+
+
+@receiver(post_save, sender=User)
+def owner_changed_handler(sender, instance, update_fields=None, **kwargs):
+    # names of owners are listed; logging in only updates last_login
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    CollectionMemberInfo.objects.filter(resource__r2urp__user=instance,
+                                        resource__r2urp__privilege=PrivilegeCodes.OWNER).delete()
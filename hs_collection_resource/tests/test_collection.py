@@ -11,9 +11,11 @@ from hs_core.testing import MockIRODSTestCaseMixin
 from hs_access_control.models import PrivilegeCodes
 from hs_core.hydroshare.resource import ResourceFile
 
-from hs_collection_resource.models import CollectionResource, CollectionDeletedResource
+from hs_collection_resource.models import CollectionResource, CollectionDeletedResource, \
+    CollectionMemberInfo
 from hs_collection_resource.views import _update_collection_coverages
-from hs_collection_resource.utils import RES_LANDING_PAGE_URL_TEMPLATE, update_collection_list_csv
+from hs_collection_resource.utils import RES_LANDING_PAGE_URL_TEMPLATE, \
+    update_collection_list_csv, CSV_CHECKSUM_KEY
 
 
 class TestCollection(MockIRODSTestCaseMixin, TransactionTestCase):
@@ -946,3 +948,43 @@ class TestCollection(MockIRODSTestCaseMixin, TransactionTestCase):
         self.assertIn(self.resGen1.short_id, res_id_list)
         self.assertIn(self.resGen2.short_id, res_id_list)
         self.assertIn(self.resGen3.short_id, res_id_list)
+
+    def test_member_info_cache(self):
+        self.resCollection.resources.add(self.resGen1)
+        self.resCollection.resources.add(self.resGen2)
+        csv_list = update_collection_list_csv(self.resCollection)
+        self.assertEqual(CollectionMemberInfo.objects.filter(
+            resource__collections=self.resCollection).count(), 2)
+        csv_file = ResourceFile.objects.get(object_id=self.resCollection.id)
+
+        # nothing changed, so the csv file is kept
+        self.assertEqual(update_collection_list_csv(self.resCollection), csv_list)
+        self.assertEqual(ResourceFile.objects.get(object_id=self.resCollection.id).id,
+                         csv_file.id)
+
+        # changing the title of a member invalidates its info and replaces the csv file
+        self.resGen1.metadata.update_element('title', self.resGen1.metadata.title.id,
+                                             value='Gen 1 renamed')
+        self.assertFalse(CollectionMemberInfo.objects.filter(resource=self.resGen1).exists())
+        self.assertTrue(CollectionMemberInfo.objects.filter(resource=self.resGen2).exists())
+        csv_list = update_collection_list_csv(self.resCollection)
+        self.assertIn('Gen 1 renamed', [row[0] for row in csv_list])
+        self.assertNotEqual(ResourceFile.objects.get(object_id=self.resCollection.id).id,
+                            csv_file.id)
+
+        # changing sharing status invalidates the info of the member
+        self.resGen2.raccess.shareable = False
+        self.resGen2.raccess.save()
+        self.assertFalse(CollectionMemberInfo.objects.filter(resource=self.resGen2).exists())
+        csv_list = update_collection_list_csv(self.resCollection)
+        self.assertIn('Private', [row[5] for row in csv_list])
+
+    def test_member_with_non_ascii_title(self):
+        self.resGen1.metadata.update_element('title', self.resGen1.metadata.title.id,
+                                             value=u'D\xe9bit de la rivi\xe8re')
+        self.resCollection.resources.add(self.resGen1)
+        csv_list = update_collection_list_csv(self.resCollection)
+        self.assertIn(u'D\xe9bit de la rivi\xe8re', [row[0] for row in csv_list])
+        # the csv file was written
+        self.assertEqual(ResourceFile.objects.filter(object_id=self.resCollection.id).count(), 1)
+        self.assertIn(CSV_CHECKSUM_KEY, self.resCollection.extra_data)
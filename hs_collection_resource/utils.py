@@ -1,18 +1,29 @@
 import os
 import tempfile
 import csv
+import json
 import shutil
+import hashlib
 import logging
+from StringIO import StringIO
+from dateutil import parser
 
 from django.core.files.uploadedfile import UploadedFile
+from django.db.models import Max, Min
 
+from hs_core.models import BaseResource
 from hs_core.hydroshare.utils import resource_modified, current_site_url
 from hs_core.hydroshare.resource import delete_resource_file_only, add_resource_files
 
+from hs_collection_resource.models import CollectionMemberInfo
+
 logger = logging.getLogger(__name__)
 RES_LANDING_PAGE_URL_TEMPLATE = current_site_url() + "/resource/{0}/"
 CSV_FULL_NAME_TEMPLATE = "collection_list_{0}.csv"
 DELETED_RES_STRING = "Resource Deleted"
+CSV_HEADER_ROW = ['Title', 'Type', 'ID', 'URL', 'Owners', 'Sharing Status']
+# key in extra_data of a collection of the md5 checksum of its csv file
+CSV_CHECKSUM_KEY = "collection_list_csv_md5"
 
 
 def add_or_remove_relation_metadata(add=True, target_res_obj=None, relation_type="",
@@ -43,9 +54,128 @@ def add_or_remove_relation_metadata(add=True, target_res_obj=None, relation_type
         resource_modified(target_res_obj, last_change_user, overwrite_bag=False)
 
 
+def get_member_infos(collection_obj):
+    """
+    Get the cached csv row and coverage extent of every resource contained in a collection.
+    Infos of members that have none yet (new members, or members changed since their info
+    was cached) are created here.
+    :param collection_obj: collection resource object
+    :return: a list of CollectionMemberInfo objects in the order of collection_obj.resources
+    """
+    res_ids = list(collection_obj.resources.values_list('id', flat=True))
+    infos = {info.resource_id: info
+             for info in CollectionMemberInfo.objects.filter(resource_id__in=res_ids)}
+    missing_ids = [res_id for res_id in res_ids if res_id not in infos]
+    if missing_ids:
+        for res in BaseResource.objects.filter(id__in=missing_ids).select_related('raccess'):
+            infos[res.id] = _create_member_info(res)
+    return [infos[res_id] for res_id in res_ids]
+
+
+def _create_member_info(res):
+    """
+    Create the CollectionMemberInfo of a resource from its metadata and access control.
+    :param res: a resource contained in a collection
+    :return: the new CollectionMemberInfo object
+    """
+    csv_data_row = [res.metadata.title.value,
+                    res.resource_type,
+                    res.short_id,
+                    RES_LANDING_PAGE_URL_TEMPLATE.format(res.short_id),
+                    _get_owners_string(list(res.raccess.owners.all())),
+                    _get_sharing_status_string(res)
+                    ]
+
+    lon_list = []
+    lat_list = []
+    date_list = []
+    for cvg in res.metadata.coverages.all():
+        if cvg.type.lower() == "box":
+            lon_list.append(float(cvg.value["eastlimit"]))
+            lon_list.append(float(cvg.value["westlimit"]))
+            lat_list.append(float(cvg.value["northlimit"]))
+            lat_list.append(float(cvg.value["southlimit"]))
+        elif cvg.type.lower() == "point":
+            lon_list.append(float(cvg.value["east"]))
+            lat_list.append(float(cvg.value["north"]))
+        elif cvg.type.lower() == "period":
+            try:
+                if cvg.value.get("start", None) is not None:
+                    date_list.append(parser.parse(cvg.value["start"]).date())
+                if cvg.value.get("end", None) is not None:
+                    date_list.append(parser.parse(cvg.value["end"]).date())
+            except ValueError as ex:
+                # skip the coverage if it has invalid datetime string
+                logger.warning("_create_member_info: "
+                               "Ignore unknown datetime string. "
+                               "Contained res ID: {0} "
+                               "Msg: {1} ".format(res.short_id, ex.message))
+
+    info, _ = CollectionMemberInfo.objects.update_or_create(
+        resource=res,
+        defaults={'csv_row': json.dumps(csv_data_row),
+                  'lon_min': min(lon_list) if lon_list else None,
+                  'lon_max': max(lon_list) if lon_list else None,
+                  'lat_min': min(lat_list) if lat_list else None,
+                  'lat_max': max(lat_list) if lat_list else None,
+                  'date_min': min(date_list) if date_list else None,
+                  'date_max': max(date_list) if date_list else None})
+    return info
+
+
+def get_collection_extent(collection_obj):
+    """
+    Get the overall coverage extent of the resources contained in a collection.
+    :param collection_obj: collection resource object
+    :return: a dict with keys lon_min, lon_max, lat_min, lat_max, date_min and date_max,
+             whose values are None where no member has such coverage
+    """
+    # make sure every member has an up to date info
+    get_member_infos(collection_obj)
+    extent = CollectionMemberInfo.objects \
+        .filter(resource__collections=collection_obj) \
+        .aggregate(lon_min=Min('lon_min'), lon_max=Max('lon_max'),
+                   lat_min=Min('lat_min'), lat_max=Max('lat_max'),
+                   date_min=Min('date_min'), date_max=Max('date_max'))
+    return extent
+
+
+def get_collection_list_csv(collection_obj):
+    """
+    Get the rows of the csv file that lists info of all contained resources.
+    :param collection_obj: collection resource object
+    :return: a list of csv rows including the header row, or an empty list if the collection
+             contains no resources and has no deleted resources
+    """
+    csv_content_list = []
+    member_infos = get_member_infos(collection_obj)
+    deleted_resources = list(collection_obj.deleted_resources.prefetch_related('resource_owners'))
+    if member_infos or deleted_resources:
+        csv_content_list.append(CSV_HEADER_ROW)
+        # rows for currently contained resources
+        for info in member_infos:
+            csv_content_list.append(json.loads(info.csv_row))
+
+        # rows for deleted resources
+        for deleted_res_log in deleted_resources:
+            owners = list(deleted_res_log.resource_owners.all())
+            csv_data_row = [deleted_res_log.resource_title,
+                            deleted_res_log.resource_type,
+                            deleted_res_log.resource_id,
+                            DELETED_RES_STRING,
+                            _get_owners_string(owners) if owners else DELETED_RES_STRING,
+                            DELETED_RES_STRING
+                            ]
+            csv_content_list.append(csv_data_row)
+    return csv_content_list
+
+
 def update_collection_list_csv(collection_obj):
     """
     This function is to create a new csv file in bag that lists info of all contained resources.
+    The csv file is only replaced if its content differs from that of the file in the bag,
+    whose md5 checksum is kept in extra_data of the collection. Whether the file was replaced
+    can be found by comparing collection_obj.extra_data[CSV_CHECKSUM_KEY] before and after.
     A list that contains all csv content will be returned for unit test use.
     :param collection_obj: collection resource object
     :return: the csv content in a list object
@@ -58,59 +188,40 @@ def update_collection_list_csv(collection_obj):
         short_key = collection_obj.short_id
         csv_full_name = CSV_FULL_NAME_TEMPLATE.format(collection_obj.short_id)
 
+        csv_content_list = get_collection_list_csv(collection_obj)
+        csv_buffer = StringIO()
+        w = csv.writer(csv_buffer)
+        for row in csv_content_list:
+            # the csv module of Python 2 only writes byte strings
+            w.writerow([value.encode('utf-8') if isinstance(value, unicode) else value
+                        for value in row])
+        csv_content = csv_buffer.getvalue()
+        checksum = hashlib.md5(csv_content).hexdigest() if csv_content_list else ''
+
+        # The only possible file is a .csv file; it only needs to be replaced if it changed.
+        if checksum == collection_obj.extra_data.get(CSV_CHECKSUM_KEY, None) and \
+                collection_obj.files.exists() == bool(csv_content_list):
+            return csv_content_list
+
         # remove all files in bag
-        # The only possible file is a .csv file.
         # It is removed before another is added.
         for f in collection_obj.files.all():
             delete_resource_file_only(collection_obj, f)
 
-        if collection_obj.resources.count() > 0 or collection_obj.deleted_resources.count() > 0:
-            # prepare csv content
-            # create headers
-            csv_header_row = ['Title',
-                              'Type',
-                              'ID',
-                              'URL',
-                              'Owners',
-                              'Sharing Status'
-                              ]
-            csv_content_list.append(csv_header_row)
-            # create rows for currently contained resources
-            for res in collection_obj.resources.all():
-                csv_data_row = [res.metadata.title,
-                                res.resource_type,
-                                res.short_id,
-                                RES_LANDING_PAGE_URL_TEMPLATE.format(res.short_id),
-                                _get_owners_string(list(res.raccess.owners.all())),
-                                _get_sharing_status_string(res)
-                                ]
-                csv_content_list.append(csv_data_row)
-
-            # create rows for deleted resources
-            for deleted_res_log in collection_obj.deleted_resources:
-                csv_data_row = [deleted_res_log.resource_title,
-                                deleted_res_log.resource_type,
-                                deleted_res_log.resource_id,
-                                DELETED_RES_STRING,
-                                _get_owners_string(list(deleted_res_log.resource_owners.all()))
-                                if deleted_res_log.resource_owners.count() > 0
-                                else DELETED_RES_STRING,
-                                DELETED_RES_STRING
-                                ]
-                csv_content_list.append(csv_data_row)
-
+        if csv_content_list:
             # create a new csv on django server
             tmp_dir = tempfile.mkdtemp()
             csv_full_path = os.path.join(tmp_dir, csv_full_name)
             with open(csv_full_path, 'w') as csv_file_handle:
-                w = csv.writer(csv_file_handle)
-                for row in csv_content_list:
-                    w.writerow(row)
+                csv_file_handle.write(csv_content)
 
             # push the new csv file to irods bag
             files = (UploadedFile(file=open(csv_full_path, 'r'), name=csv_full_name))
             add_resource_files(collection_obj.short_id, files)
 
+        collection_obj.extra_data = dict(collection_obj.extra_data, **{CSV_CHECKSUM_KEY: checksum})
+        collection_obj.save(update_fields=['extra_data'])
+
     except Exception as ex:
         logger.error("Failed to update_collection_list_csv in {}"
                      "Error:{} ".format(short_key, ex.message))
@@ -1,5 +1,4 @@
 import logging
-from dateutil import parser
 
 from django.http import JsonResponse
 from django.db import transaction
@@ -8,7 +7,7 @@ from hs_core.views.utils import authorize, ACTION_TO_AUTHORIZE
 from hs_core.hydroshare.utils import get_resource_by_shortkey, resource_modified
 
 from .utils import add_or_remove_relation_metadata, RES_LANDING_PAGE_URL_TEMPLATE,\
-    update_collection_list_csv
+    update_collection_list_csv, get_collection_extent
 
 logger = logging.getLogger(__name__)
 UI_DATETIME_FORMAT = "%m/%d/%Y"
@@ -263,50 +262,21 @@ def _calculate_collection_coverages(collection_res_obj):
     :param collection_res_obj: instance of CollectionResource type
     :return: a list of coverage metadata dict
     """
-    res_id = collection_res_obj.short_id
     new_coverage_list = []
 
-    lon_list = []
-    lat_list = []
-    time_list = []
     output_spatial_projection_str = "WGS84 EPSG:4326"
     output_spatial_units_str = "Decimal degrees"
-    for contained_res_obj in collection_res_obj.resources.all():
-        for cvg in contained_res_obj.metadata.coverages.all():
-            if cvg.type.lower() == "box":
-                lon_list.append(float(cvg.value["eastlimit"]))
-                lon_list.append(float(cvg.value["westlimit"]))
-                lat_list.append(float(cvg.value["northlimit"]))
-                lat_list.append(float(cvg.value["southlimit"]))
-            elif cvg.type.lower() == "point":
-                lon_list.append(float(cvg.value["east"]))
-                lat_list.append(float(cvg.value["north"]))
-            elif cvg.type.lower() == "period":
-                try:
-                    if cvg.value.get("start", None) is not None:
-                        start_date = parser.parse(cvg.value["start"])
-                        time_list.append(start_date)
-                    if cvg.value.get("end", None) is not None:
-                        end_date = parser.parse(cvg.value["end"])
-                        time_list.append(end_date)
-                except ValueError as ex:
-                    # skip the res if it has invalid datetime string
-                    logger.warning("_calculate_collection_coverages: "
-                                   "Ignore unknown datetime string. "
-                                   "Collection resource ID: {0}. "
-                                   "Contained res ID: {1}"
-                                   "Msg: {2} ".
-                                   format(res_id,
-                                          contained_res_obj.short_id, ex.message))
+    # combine the coverage extents cached for each contained resource
+    extent = get_collection_extent(collection_res_obj)
 
     # spatial coverage
-    if len(lon_list) > 0 and len(lat_list) > 0:
+    if extent['lon_min'] is not None and extent['lat_min'] is not None:
         value_dict = {}
         type_str = 'point'
-        lon_min = min(lon_list)
-        lon_max = max(lon_list)
-        lat_min = min(lat_list)
-        lat_max = max(lat_list)
+        lon_min = extent['lon_min']
+        lon_max = extent['lon_max']
+        lat_min = extent['lat_min']
+        lat_max = extent['lat_max']
         if lon_min == lon_max and lat_min == lat_max:
             type_str = 'point'
             value_dict['east'] = lon_min
@@ -325,9 +295,9 @@ def _calculate_collection_coverages(collection_res_obj):
                                   'value': value_dict, 'element_id_str': "-1"})
 
     # temporal coverage
-    if len(time_list) > 0:
-        time_start = min(time_list)
-        time_end = max(time_list)
+    if extent['date_min'] is not None:
+        time_start = extent['date_min']
+        time_end = extent['date_max']
         value_dict = {'start': time_start.strftime(UI_DATETIME_FORMAT),
                       'end': time_end.strftime(UI_DATETIME_FORMAT)}
 
@@ -1,13 +1,127 @@
+from django.conf import settings
 from django.db import models
+from haystack import connections, connection_router
 from haystack.signals import RealtimeSignalProcessor
 from haystack.exceptions import NotHandled
 import logging
+import time
 import types
 from haystack.query import SearchQuerySet
 from haystack.utils import get_identifier
 
 logger = logging.getLogger(__name__)
 
+# Redis keys of the index update queue: the set of queued resource ids, the times of the
+# first and latest save of each queued resource, and the lag of the latest update.
+INDEX_QUEUE_KEY = 'hs_index_queue'
+INDEX_QUEUE_FIRST_KEY = 'hs_index_queue:first:{}'
+INDEX_QUEUE_LAST_KEY = 'hs_index_queue:last:{}'
+INDEX_QUEUE_LAG_KEY = 'hs_index_queue:lag'
+
+
+def get_index_update_delay():
+    """
+    Seconds to wait for further saves of a resource before reindexing it.
+
+    Zero (the default) reindexes synchronously within the request, as does a missing Redis
+    connection; queued updates also need a running Celery worker.
+    """
+    if getattr(settings, 'REDIS_CONNECTION', None) is None or \
+            getattr(settings, 'CELERY_ALWAYS_EAGER', False):
+        return 0
+    return getattr(settings, 'HS_INDEX_UPDATE_DELAY', 0)
+
+
+def index_resource(resource):
+    """
+    Add a public or discoverable resource to the index, or remove a private one.
+
+    :param resource: BaseResource to index
+    """
+    from hs_core.models import BaseResource
+
+    for using in connection_router.for_write(instance=resource):
+        # if object is public/discoverable or becoming public/discoverable, index it
+        if resource.raccess.public or resource.raccess.discoverable:
+            try:
+                index = connections[using].get_unified_index().get_index(BaseResource)
+                index.update_object(resource, using=using)
+            except NotHandled:
+                logger.exception("Failure: changes to %s with short_id %s not added to Solr Index.", str(type(resource)), resource.short_id)
+        # if object is private or becoming private, delete from index
+        else:
+            try:
+                index = connections[using].get_unified_index().get_index(BaseResource)
+                index.remove_object(resource, using=using)
+            except NotHandled:
+                logger.exception("Failure: delete of %s with short_id %s failed.", str(type(resource)), resource.short_id)
+
+
+def enqueue_index_update(resource_id):
+    """
+    Queue reindexing of a resource, coalescing bursts of saves into one update.
+
+    :param resource_id: primary key of the BaseResource to reindex
+
+    A resource is queued at most once; saves while it is queued only postpone the update
+    until no save has happened for HS_INDEX_UPDATE_DELAY seconds.
+    """
+    from hs_core.tasks import update_resource_index
+
+    redis = settings.REDIS_CONNECTION
+    now = time.time()
+    redis.set(INDEX_QUEUE_LAST_KEY.format(resource_id), now)
+    if redis.sadd(INDEX_QUEUE_KEY, resource_id):
+        redis.set(INDEX_QUEUE_FIRST_KEY.format(resource_id), now)
+        update_resource_index.apply_async((resource_id,), countdown=get_index_update_delay())
+
+
+def process_index_update(resource_id):
+    """
+    Reindex a queued resource once it has not been saved for HS_INDEX_UPDATE_DELAY seconds.
+
+    :param resource_id: primary key of the BaseResource to reindex
+    :return: seconds to wait before trying again, or None if the resource was reindexed.
+
+    A resource saved continuously is reindexed anyway once it has waited ten delays.
+    """
+    from hs_core.models import BaseResource
+
+    redis = settings.REDIS_CONNECTION
+    delay = get_index_update_delay()
+    now = time.time()
+    first = float(redis.get(INDEX_QUEUE_FIRST_KEY.format(resource_id)) or now)
+    last = float(redis.get(INDEX_QUEUE_LAST_KEY.format(resource_id)) or first)
+    if last + delay > now and first + 10 * delay > now:
+        return last + delay - now
+
+    # dequeue before indexing, so that saves from now on queue another update
+    redis.srem(INDEX_QUEUE_KEY, resource_id)
+    redis.delete(INDEX_QUEUE_FIRST_KEY.format(resource_id),
+                 INDEX_QUEUE_LAST_KEY.format(resource_id))
+    resource = BaseResource.objects.filter(pk=resource_id).first()
+    if resource is not None:
+        index_resource(resource)
+    lag = time.time() - first
+    redis.set(INDEX_QUEUE_LAG_KEY, lag)
+    logger.info("Reindexed resource %s %.1f seconds after its first queued save", resource_id, lag)
+    return None
+
+
+def get_index_queue_metrics():
+    """
+    Return depth and lag of the index update queue.
+
+    :return: dict with 'depth', the number of resources waiting to be reindexed, and 'lag',
+        the seconds between the first save and the reindexing of the latest resource updated.
+    """
+    redis = getattr(settings, 'REDIS_CONNECTION', None)
+    if redis is None:
+        return {'depth': 0, 'lag': None}
+    lag = redis.get(INDEX_QUEUE_LAG_KEY)
+    return {'depth': redis.scard(INDEX_QUEUE_KEY),
+            'lag': float(lag) if lag is not None else None}
+
 
 class HydroRealtimeSignalProcessor(RealtimeSignalProcessor):
 
@@ -29,27 +143,15 @@ class HydroRealtimeSignalProcessor(RealtimeSignalProcessor):
         from hs_access_control.models import ResourceAccess
     
         if isinstance(instance, BaseResource):
-            if hasattr(instance, 'raccess') and hasattr(instance, 'metadata'): 
-                # work around for failure of super(BaseResource, instance) to work properly.
-                # this always succeeds because this is a post-save object action. 
-                newinstance = BaseResource.objects.get(pk=instance.pk)
-                newsender = BaseResource
-                using_backends = self.connection_router.for_write(instance=newinstance)
-                for using in using_backends:
-                    # if object is public/discoverable or becoming public/discoverable, index it 
-                    if instance.raccess.public or instance.raccess.discoverable: 
-                        try:
-                            index = self.connections[using].get_unified_index().get_index(newsender)
-                            index.update_object(newinstance, using=using)
-                        except NotHandled:
-                            logger.exception("Failure: changes to %s with short_id %s not added to Solr Index.", str(type(instance)), newinstance.short_id)
-                    # if object is private or becoming private, delete from index
-                    else:
-                        try:
-                            index = self.connections[using].get_unified_index().get_index(newsender)
-                            index.remove_object(newinstance, using=using)
-                        except NotHandled:
-                            logger.exception("Failure: delete of %s with short_id %s failed.", str(type(instance)), newinstance.short_id)
+            if hasattr(instance, 'raccess') and hasattr(instance, 'metadata'):
+                # removal from the index is never delayed, to hide private resources at once
+                if get_index_update_delay() and \
+                        (instance.raccess.public or instance.raccess.discoverable):
+                    enqueue_index_update(instance.pk)
+                else:
+                    # work around for failure of super(BaseResource, instance) to work properly.
+                    # this always succeeds because this is a post-save object action.
+                    index_resource(BaseResource.objects.get(pk=instance.pk))
 
         elif isinstance(instance, ResourceAccess):
             # automatically a BaseResource; just call the routine on it. 
@@ -0,0 +1,225 @@
+"""
+Local read-through cache of files retrieved from iRODS.
+
+Each cached file lives in its own directory under TEMP_FILE_DIR, named after a hash of the
+storage path, size and checksum (or modification time) of the file, so that a changed file
+is never served from the cache. The bookkeeping is shared between processes in Redis: the
+last use and size of each cached file, a reference count of the callers using it, and hit
+and miss metrics. Once the cache holds more than HS_FILE_CACHE_SIZE bytes, the least recently
+used files that are not in use are evicted.
+
+The cache is disabled, and files are retrieved from iRODS every time, if there is no Redis
+connection or HS_FILE_CACHE_SIZE is 0.
+"""
+import os
+import errno
+import hashlib
+import logging
+import shutil
+import time
+from contextlib import contextmanager
+from uuid import uuid4
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# directory of the cache under TEMP_FILE_DIR
+FILE_CACHE_DIR = 'irods_file_cache'
+
+# Redis keys of the cache: the last use of each cached file as a sorted set, the size and the
+# reference count of each cached file, the hit and miss metrics, and a lock serializing
+# reference counting with eviction.
+FILE_CACHE_LRU_KEY = 'hs_file_cache:lru'
+FILE_CACHE_SIZE_KEY = 'hs_file_cache:size'
+FILE_CACHE_REFS_KEY = 'hs_file_cache:refs'
+FILE_CACHE_METRICS_KEY = 'hs_file_cache:metrics'
+FILE_CACHE_LOCK_KEY = 'hs_file_cache:lock'
+
+# seconds after which the lock is released even if its holder died
+FILE_CACHE_LOCK_TIMEOUT = 60
+
+
+def _get_redis():
+    """ Return the Redis connection of the cache, or None if the cache is disabled """
+    if not getattr(settings, 'HS_FILE_CACHE_SIZE', 0):
+        return None
+    return getattr(settings, 'REDIS_CONNECTION', None)
+
+
+def _get_cache_key(res_file):
+    """
+    Return the key of the current version of res_file in the cache, or None if the version
+    of the file cannot be told.
+    """
+    version = res_file._checksum or res_file.modified_time
+    if not version:
+        return None
+    return '{}:{}:{}'.format(res_file.storage_path, res_file.size, version)
+
+
+def _get_cache_file(key, file_name):
+    """ Return the path of the cached file with the given key and name """
+    return os.path.join(settings.TEMP_FILE_DIR, FILE_CACHE_DIR,
+                        hashlib.sha1(key.encode('utf-8')).hexdigest(), file_name)
+
+
+def _add_to_cache(redis, key, cache_file, fill):
+    """
+    Create cache_file by calling fill with the path of a partial file, and record it in the
+    cache as the file with the given key.
+    """
+    cache_dir = os.path.dirname(cache_file)
+    try:
+        os.makedirs(cache_dir)
+    except OSError as ex:
+        if ex.errno != errno.EEXIST:
+            raise
+    # fill under a unique name first, so that the cached file appears complete or not at all
+    partial_file = '{}.{}'.format(cache_file, uuid4().hex)
+    try:
+        fill(partial_file)
+        os.rename(partial_file, cache_file)
+    finally:
+        if os.path.exists(partial_file):
+            os.remove(partial_file)
+    size = os.path.getsize(cache_file)
+    # a file filled concurrently by another process is only counted once
+    if redis.hsetnx(FILE_CACHE_SIZE_KEY, key, size):
+        redis.hincrby(FILE_CACHE_METRICS_KEY, 'bytes_cached', size)
+    redis.zadd(FILE_CACHE_LRU_KEY, key, time.time())
+    return size
+
+
+def _evict(redis):
+    """ Remove the least recently used files not in use until the cache fits its size """
+    max_size = getattr(settings, 'HS_FILE_CACHE_SIZE', 0)
+    with redis.lock(FILE_CACHE_LOCK_KEY, timeout=FILE_CACHE_LOCK_TIMEOUT):
+        cached_size = int(redis.hget(FILE_CACHE_METRICS_KEY, 'bytes_cached') or 0)
+        for key in redis.zrange(FILE_CACHE_LRU_KEY, 0, -1):
+            if cached_size <= max_size:
+                break
+            if int(redis.hget(FILE_CACHE_REFS_KEY, key) or 0) > 0:
+                continue
+            size = int(redis.hget(FILE_CACHE_SIZE_KEY, key) or 0)
+            shutil.rmtree(os.path.dirname(_get_cache_file(key, '')), ignore_errors=True)
+            redis.zrem(FILE_CACHE_LRU_KEY, key)
+            redis.hdel(FILE_CACHE_SIZE_KEY, key)
+            redis.hdel(FILE_CACHE_REFS_KEY, key)
+            redis.hincrby(FILE_CACHE_METRICS_KEY, 'bytes_cached', -size)
+            redis.hincrby(FILE_CACHE_METRICS_KEY, 'evictions', 1)
+            cached_size -= size
+
+
+def _get_cache_entry(res_file):
+    """ Return the Redis connection and the cache key of res_file, or (None, None) if uncached """
+    redis = _get_redis()
+    if redis is None:
+        return None, None
+    key = _get_cache_key(res_file)
+    if key is None:
+        return None, None
+    return redis, key
+
+
+@contextmanager
+def cached_irods_file(res_file):
+    """
+    Provide a local copy of a resource file, retrieving it from iRODS only if the cache does
+    not hold the current version of the file.
+
+    The file cannot be evicted while the context is active. The file is shared with other
+    callers and must not be modified or moved; use copy_irods_file for a private copy.
+
+    :param res_file: an instance of ResourceFile
+    :return: context yielding the location of the local copy of the file
+    """
+    res_file_path = res_file.storage_path
+    file_name = os.path.basename(res_file_path)
+    istorage = res_file.resource.get_irods_storage()
+    redis, key = _get_cache_entry(res_file)
+    if key is None:
+        tmpdir = os.path.join(settings.TEMP_FILE_DIR, uuid4().hex)
+        os.makedirs(tmpdir)
+        try:
+            tmpfile = os.path.join(tmpdir, file_name)
+            istorage.getFile(res_file_path, tmpfile)
+            yield tmpfile
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        return
+
+    with redis.lock(FILE_CACHE_LOCK_KEY, timeout=FILE_CACHE_LOCK_TIMEOUT):
+        redis.hincrby(FILE_CACHE_REFS_KEY, key, 1)
+    try:
+        cache_file = _get_cache_file(key, file_name)
+        if os.path.exists(cache_file):
+            redis.hincrby(FILE_CACHE_METRICS_KEY, 'hits', 1)
+            redis.zadd(FILE_CACHE_LRU_KEY, key, time.time())
+        else:
+            redis.hincrby(FILE_CACHE_METRICS_KEY, 'misses', 1)
+            size = _add_to_cache(redis, key, cache_file,
+                                 lambda partial_file: istorage.getFile(res_file_path,
+                                                                       partial_file))
+            redis.hincrby(FILE_CACHE_METRICS_KEY, 'bytes_fetched', size)
+        yield cache_file
+    finally:
+        redis.hincrby(FILE_CACHE_REFS_KEY, key, -1)
+        _evict(redis)
+
+
+def copy_irods_file(res_file, local_file):
+    """
+    Copy a resource file to a local file that the caller may modify, through the cache.
+
+    :param res_file: an instance of ResourceFile
+    :param local_file: path of the copy
+    """
+    redis, key = _get_cache_entry(res_file)
+    if key is None:
+        res_file.resource.get_irods_storage().getFile(res_file.storage_path, local_file)
+        return
+    with cached_irods_file(res_file) as cache_file:
+        shutil.copyfile(cache_file, local_file)
+
+
+def cache_local_file(local_file, res_file):
+    """
+    Add a copy of a local file to the cache as the current version of res_file, after the
+    file was copied to iRODS, so that it need not be retrieved from iRODS again.
+
+    :param local_file: path of a file with the same content as res_file in iRODS
+    :param res_file: an instance of ResourceFile with up to date system metadata
+    """
+    redis, key = _get_cache_entry(res_file)
+    if key is None:
+        return
+    cache_file = _get_cache_file(key, os.path.basename(res_file.storage_path))
+    if os.path.exists(cache_file):
+        return
+    try:
+        _add_to_cache(redis, key, cache_file,
+                      lambda partial_file: shutil.copyfile(local_file, partial_file))
+        _evict(redis)
+    except (IOError, OSError) as ex:
+        # the cache only saves retrieving the file from iRODS next time
+        logger.warning("Failed to cache file %s. Error:%s", res_file.storage_path, ex)
+
+
+def get_file_cache_metrics():
+    """
+    Return the metrics of the file cache.
+
+    :return: dict with 'files' and 'bytes_cached', the number and total size of the cached
+        files, 'hits' and 'misses', the number of requests served from the cache and from
+        iRODS, 'bytes_fetched', the bytes retrieved from iRODS by misses, and 'evictions'.
+    """
+    metrics = {'files': 0, 'bytes_cached': 0, 'hits': 0, 'misses': 0, 'bytes_fetched': 0,
+               'evictions': 0}
+    redis = _get_redis()
+    if redis is None:
+        return metrics
+    for name, value in redis.hgetall(FILE_CACHE_METRICS_KEY).items():
+        metrics[name] = int(value)
+    metrics['files'] = redis.zcard(FILE_CACHE_LRU_KEY)
+    return metrics
@@ -1,6 +1,8 @@
 import os
+import json
 import shutil
 import errno
+import hashlib
 import tempfile
 import mimetypes
 import zipfile
@@ -13,6 +15,14 @@ from rdflib import Namespace, URIRef
 import bagit
 from mezzanine.conf import settings
 from hs_core.models import Bags, ResourceFile
+from hs_core.hydroshare.zipstream import ZipStream
+
+
+# bagit tag files written by the iRODS bagit rule in the root collection of a resource
+BAGIT_MANIFEST = 'manifest-md5.txt'
+BAGIT_TAG_MANIFEST = 'tagmanifest-md5.txt'
+BAGIT_TAG_FILES = ('bagit.txt', BAGIT_MANIFEST, 'readme.txt')
+BAGIT_DECLARATION = 'BagIt-Version: 0.96\nTag-File-Character-Encoding: UTF-8\n'
 
 
 class HsBagitException(Exception):
@@ -229,6 +239,235 @@ def create_bag(resource):
     return b
 
 
+def parse_bagit_manifest(text):
+    """
+    Parse the content of a bagit manifest file.
+
+    :param text: content of a manifest, one "<checksum> <path>" line per file
+    :return: dict of checksums keyed by path relative to the bag root
+    """
+    checksums = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        checksum, _, path = line.partition(' ')
+        checksums[path.strip()] = checksum
+    return checksums
+
+
+def render_bagit_manifest(checksums):
+    """
+    Render checksums keyed by path as the content of a bagit manifest file.
+
+    Lines are sorted by path and use the same layout as the iRODS bagit rule.
+    """
+    return u''.join(u'{}    {}\n'.format(checksums[path], path) for path in sorted(checksums))
+
+
+def diff_bag_state(previous_state, listing):
+    """
+    Compare the payload recorded at the last bag build with the current payload.
+
+    :param previous_state: dict of [checksum, size, modified] keyed by payload path, as
+        recorded by save_bag_state
+    :param listing: dict of (size, modified) keyed by payload path for the current payload
+    :return: (checksums, changed) where checksums is a dict of reusable checksums for files
+        whose size and modification time are unchanged, and changed is a sorted list of paths
+        that were added, modified or removed since the last build.
+    """
+    checksums = {}
+    changed = []
+    for path, (size, modified) in listing.items():
+        previous = previous_state.get(path)
+        if previous is not None and previous[1] == size and previous[2] == modified:
+            checksums[path] = previous[0]
+        else:
+            changed.append(path)
+    changed.extend(path for path in previous_state if path not in listing)
+    return checksums, sorted(changed)
+
+
+def get_bag_state(resource):
+    """ Return the payload state recorded at the last bag build, or {} if there is none """
+    bag = resource.bags.first()
+    if bag is None or not bag.file_state:
+        return {}
+    return json.loads(bag.file_state)
+
+
+def save_bag_state(resource, state):
+    """ Record the payload state of a freshly built bag for use by the next build """
+    bag = resource.bags.first()
+    if bag is not None:
+        bag.file_state = json.dumps(state)
+        bag.save(update_fields=['file_state'])
+
+
+def get_bag_payload_listing(resource, istorage):
+    """
+    List the bag payload (everything under data/) of a resource with a single iRODS query.
+
+    :return: dict of (size, modified) keyed by path relative to the bag root, as in manifests
+    """
+    from hs_core.hydroshare.utils import list_irods_collection
+
+    listing = list_irods_collection(istorage, os.path.join(resource.root_path, 'data'))
+    return {os.path.join('data', obj.path): (obj.size, obj.modified) for obj in listing}
+
+
+def record_bag_state(resource, istorage):
+    """
+    Record the payload state after the iRODS bagit rule has rebuilt the manifests.
+
+    The checksums are taken from the manifest written by the rule, so that later builds can
+    reuse them for files whose size and modification time have not changed.
+    """
+    temp_dir = tempfile.mkdtemp()
+    try:
+        local_manifest = os.path.join(temp_dir, BAGIT_MANIFEST)
+        istorage.getFile(os.path.join(resource.root_path, BAGIT_MANIFEST), local_manifest)
+        with open(local_manifest) as manifest:
+            checksums = parse_bagit_manifest(manifest.read().decode('utf-8'))
+    finally:
+        shutil.rmtree(temp_dir)
+
+    listing = get_bag_payload_listing(resource, istorage)
+    state = {path: [checksums[path], size, modified]
+             for path, (size, modified) in listing.items() if path in checksums}
+    save_bag_state(resource, state)
+
+
+def update_bag_manifests(resource, istorage):
+    """
+    Bring the bagit manifests of a resource up to date without running the iRODS bagit rule.
+
+    Only files that were added or whose size or modification time changed since the last bag
+    build are checksummed; checksums of all other files are carried over from the previous
+    build. manifest-md5.txt and tagmanifest-md5.txt are then rewritten in place.
+
+    :param resource: resource whose bag manifests are to be updated
+    :param istorage: IrodsStorage instance for the resource
+    :return: sorted list of payload paths that changed since the last build (empty if the
+        payload is unchanged), or None if the manifests cannot be updated incrementally, in
+        which case the caller must fall back to running the bagit rule.
+    """
+    from hs_core.hydroshare.utils import get_irods_checksum
+
+    previous_state = get_bag_state(resource)
+    if not previous_state or not istorage.exists(os.path.join(resource.root_path, 'bagit.txt')):
+        return None
+
+    listing = get_bag_payload_listing(resource, istorage)
+    checksums, changed = diff_bag_state(previous_state, listing)
+    if not changed:
+        return changed
+
+    for path in changed:
+        if path in listing:
+            checksum = get_irods_checksum(istorage, os.path.join(resource.root_path, path))
+            if checksum is None:
+                return None
+            checksums[path] = checksum
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        manifest_content = render_bagit_manifest(checksums).encode('utf-8')
+        tag_checksums = {BAGIT_MANIFEST: hashlib.md5(manifest_content).hexdigest()}
+        for tag_file in BAGIT_TAG_FILES:
+            if tag_file not in tag_checksums:
+                checksum = get_irods_checksum(istorage,
+                                              os.path.join(resource.root_path, tag_file))
+                if checksum is None:
+                    return None
+                tag_checksums[tag_file] = checksum
+
+        for file_name, content in ((BAGIT_MANIFEST, manifest_content),
+                                   (BAGIT_TAG_MANIFEST,
+                                    render_bagit_manifest(tag_checksums).encode('utf-8'))):
+            from_file_name = os.path.join(temp_dir, file_name)
+            with open(from_file_name, 'w') as out:
+                out.write(content)
+            istorage.saveFile(from_file_name, os.path.join(resource.root_path, file_name), False)
+    finally:
+        shutil.rmtree(temp_dir)
+
+    save_bag_state(resource, {path: [checksums[path], size, modified]
+                              for path, (size, modified) in listing.items()})
+    return changed
+
+
+def stream_bag(resource):
+    """
+    Zip the bag of a resource on the fly, as an iterable of byte strings.
+
+    Unlike create_bag_by_irods, neither the bagit rule nor ibun is run and no zip file is
+    written: payload files are read from iRODS and sent one after the other, and manifests
+    are computed from the streamed content and appended at the end of the archive. The
+    result has the same layout as the bag zipped by iRODS.
+
+    The metadata xml files are regenerated first if they are out of date; this and the
+    listing of the payload happen before this function returns, so that errors surface
+    before anything is sent.
+
+    :param resource: resource whose bag is to be streamed
+    :return: generator of chunks of the zipped bag
+    """
+    from hs_core.hydroshare.utils import list_irods_collection
+
+    istorage = resource.get_irods_storage()
+    metadata_dirty = istorage.getAVU(resource.root_path, 'metadata_dirty') or 'true'
+    if metadata_dirty.lower() == "true":
+        create_bag_files(resource)
+    listing = list_irods_collection(istorage, os.path.join(resource.root_path, 'data'))
+    return _generate_bag(resource, istorage, listing)
+
+
+def _hash_chunks(chunks, md5):
+    for chunk in chunks:
+        md5.update(chunk)
+        yield chunk
+
+
+def _generate_bag(resource, istorage, listing):
+    from hs_core.hydroshare.utils import stream_irods_file
+
+    zstream = ZipStream()
+    tag_checksums = {}
+    checksums = {}
+
+    def write_tag_file(file_name, content):
+        tag_checksums[file_name] = hashlib.md5(content).hexdigest()
+        return zstream.write_str(os.path.join(resource.short_id, file_name), content)
+
+    for chunk in write_tag_file('bagit.txt', BAGIT_DECLARATION):
+        yield chunk
+
+    for obj in listing:
+        path = os.path.join('data', obj.path)
+        md5 = hashlib.md5()
+        chunks = _hash_chunks(
+            stream_irods_file(istorage, os.path.join(resource.root_path, path)), md5)
+        for chunk in zstream.write_iter(os.path.join(resource.short_id, path), chunks,
+                                        size=obj.size):
+            yield chunk
+        checksums[path] = md5.hexdigest()
+
+    for chunk in write_tag_file(BAGIT_MANIFEST,
+                                render_bagit_manifest(checksums).encode('utf-8')):
+        yield chunk
+    readme_file_name = getattr(settings, 'HS_BAGIT_README_FILE_WITH_PATH',
+                               'docs/bagit/readme.txt')
+    with open(readme_file_name) as readme:
+        for chunk in write_tag_file('readme.txt', readme.read()):
+            yield chunk
+    for chunk in zstream.write_str(os.path.join(resource.short_id, BAGIT_TAG_MANIFEST),
+                                   render_bagit_manifest(tag_checksums).encode('utf-8')):
+        yield chunk
+    for chunk in zstream.close():
+        yield chunk
+
+
 def read_bag(bag_path):
     """
     :param bag_path:
@@ -1,14 +1,14 @@
 import json
+import re
 
 from django.core.exceptions import PermissionDenied
 from django.contrib.auth.models import User, Group
-from django.contrib.gis.geos import Polygon, Point
 from django.core.files import File
 from django.core.files.uploadedfile import UploadedFile
 from django.core import exceptions
 from django.db.models import Q
 
-from hs_core.models import BaseResource, Contributor, Creator, Subject, Description, Title, Coverage
+from hs_core.models import BaseResource, Contributor, Creator, Subject, Coverage
 from .utils import user_from_id, group_from_id, get_profile
 from theme.models import UserQuota
 
@@ -243,6 +243,17 @@ def get_public_groups():
         return Group.objects.filter(gaccess__public=True)
 
 
+def _get_search_query(text):
+    """
+    Return a Postgres tsquery matching resources that contain all words of text, or None if
+    text has no words. A word ending in '*' matches any word it is a prefix of.
+    """
+    terms = []
+    for word, prefix in re.findall(r'(\w+)(\*?)', text, re.UNICODE):
+        terms.append(word + ':*' if prefix else word)
+    return ' & '.join(terms) or None
+
+
 def get_resource_list(creator=None, group=None, user=None, owner=None, from_date=None,
                       to_date=None, start=None, count=None, full_text_search=None,
                       published=False, edit_permission=False, public=False,
@@ -316,30 +327,8 @@ def get_resource_list(creator=None, group=None, user=None, owner=None, from_date
         if not north or not west or not south or not east: \
             raise ValueError("coverage queries must have north, west, south, and east params")
 
-        coverages = set()
-        search_polygon = Polygon.from_bbox((east,south,west,north))
-
-        for coverage in Coverage.objects.filter(type="box"):
-            coverage_polygon = Polygon.from_bbox((
-                coverage.value.get('eastlimit', None),
-                coverage.value.get('southlimit', None),
-                coverage.value.get('westlimit', None),
-                coverage.value.get('northlimit', None)
-            ))
-
-            if search_polygon.intersects(coverage_polygon):
-                coverages.add(coverage.id)
-
-        for coverage in Coverage.objects.filter(type="point"):
-            coverage_shape = Point(
-                coverage.value.get('east', None),
-                coverage.value.get('north', None),
-            )
-
-            if search_polygon.intersects(coverage_shape):
-                coverages.add(coverage.id)
-
-        coverage_hits = (Coverage.objects.filter(id__in=coverages))
+        coverage_hits = Coverage.objects.filter(Coverage.get_intersects_query(
+            float(north), float(south), float(east), float(west)))
         q.append(Q(object_id__in=coverage_hits.values_list('object_id', flat=True)))
 
     if contributor:
@@ -382,35 +371,28 @@ def get_resource_list(creator=None, group=None, user=None, owner=None, from_date
     for q in q:
         flt = flt.filter(q)
 
-        if full_text_search:
-            desc_ids = Description.objects.filter(abstract__icontains=full_text_search).values_list('object_id', flat=True)
-            title_ids = Title.objects.filter(value__icontains=full_text_search).values_list('object_id', flat=True)
-
-            # Full text search must match within the title or abstract
-            if desc_ids:
-                flt = flt.filter(object_id__in=desc_ids)
-            elif title_ids:
-                flt = flt.filter(object_id__in=title_ids)
-            else:
-                # No matches on title or abstract, so treat as no results of search
-                flt = flt.none()
-
-    qcnt = 0
-    if flt:
-        qcnt = len(flt)
+    if full_text_search:
+        # Full text search matches the title, abstract, keywords and creators of resources,
+        # most relevant first
+        query = _get_search_query(full_text_search)
+        if query:
+            flt = flt.extra(
+                where=["hs_core_genericresource.search_vector @@ to_tsquery('english', %s)"],
+                params=[query],
+                select={'search_rank': "ts_rank(hs_core_genericresource.search_vector, "
+                                       "to_tsquery('english', %s))"},
+                select_params=[query],
+                order_by=['-search_rank'])
+        else:
+            flt = flt.none()
 
+    # slicing limits the query in the database; the queryset is not evaluated here
     if start is not None and count is not None:
-        if qcnt > start:
-            if qcnt >= start + count:
-                flt = flt[start:start+count]
-            else:
-                flt = flt[start:qcnt]
+        flt = flt[start:start+count]
     elif start is not None:
-        if qcnt >= start:
-            flt = flt[start:qcnt]
+        flt = flt[start:]
     elif count is not None:
-        if qcnt > count:
-            flt = flt[0:count]
+        flt = flt[:count]
 
     return flt
 
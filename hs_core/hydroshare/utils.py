@@ -2,12 +2,16 @@ from __future__ import absolute_import
 
 import mimetypes
 import os
-import tempfile
 import logging
 import shutil
 import string
 import copy
+import threading
+import time
+import zipfile
+from collections import namedtuple, OrderedDict
 from uuid import uuid4
+from multiprocessing.pool import ThreadPool
 import errno
 
 from django.apps import apps
@@ -20,13 +24,15 @@ from django.core.files import File
 from django.core.files.uploadedfile import UploadedFile
 from django.core.files.storage import DefaultStorage
 from django.core.validators import validate_email
+from django.db import transaction
 
 from mezzanine.conf import settings
 
 from hs_core.signals import pre_create_resource, post_create_resource, pre_add_files_to_resource, \
     post_add_files_to_resource
-from hs_core.models import AbstractResource, BaseResource, ResourceFile
+from hs_core.models import AbstractResource, BaseResource, ResourceFile, get_resource_file_path
 from hs_core.hydroshare.hs_bagit import create_bag_files
+from hs_core.hydroshare.file_cache import copy_irods_file, cache_local_file
 
 from django_irods.icommands import SessionException
 from django_irods.storage import IrodsStorage
@@ -211,6 +217,179 @@ def get_federated_zone_home_path(filepath):
         return ''
 
 
+IrodsDataObject = namedtuple('IrodsDataObject', ['path', 'size', 'modified', 'checksum'])
+
+
+def get_irods_absolute_path(path):
+    """
+    Return the fully qualified iRODS path for a path relative to the local home collection
+
+    Federated paths (e.g., resource.root_path of a federated resource) are already absolute
+    and are returned unchanged.
+    """
+    if path.startswith('/'):
+        return path
+    return os.path.join(settings.IRODS_HOME_COLLECTION, path)
+
+
+def list_irods_collection(istorage, path, recursive=True, data_name=None):
+    """
+    List the data objects in an iRODS collection with a single iCAT query
+
+    This replaces a listdir() followed by one size() call per file, each of which is a
+    separate round trip to iRODS.
+
+    :param istorage: IrodsStorage instance (local or federated) that holds the collection
+    :param path: path of the collection, either absolute or relative to the home collection
+    :param recursive: if True, data objects in all sub-collections are listed as well
+    :param data_name: if given, only data objects with this name are listed
+    :return: list of IrodsDataObject(path, size, modified, checksum) tuples where path is
+             relative to the listed collection, size is in bytes, modified is the modification
+             time in seconds since the epoch and checksum is the checksum registered in iCAT
+             ('' if none has been computed). An empty collection yields an empty list.
+             Paths containing quotes are listed by _list_irods_collection_by_name instead,
+             without modification times and checksums.
+    :raises SessionException: if the query fails for any reason other than finding no rows.
+    """
+    coll = get_irods_absolute_path(path).rstrip('/')
+    if "'" in coll or (data_name is not None and "'" in data_name):
+        # such names cannot be quoted in an iCAT query
+        return _list_irods_collection_by_name(istorage, coll, recursive, data_name)
+    if recursive:
+        condition = "COLL_NAME = '{coll}' || like '{coll}/%'".format(coll=coll)
+    else:
+        condition = "COLL_NAME = '{coll}'".format(coll=coll)
+    if data_name is not None:
+        condition += " AND DATA_NAME = '{}'".format(data_name)
+    query = "SELECT DATA_SIZE, DATA_MODIFY_TIME, DATA_CHECKSUM, COLL_NAME, DATA_NAME " \
+            "WHERE {}".format(condition)
+    zone = coll.split('/')[1]
+    try:
+        stdout = istorage.session.run("iquest", None, '--no-page', '-z', zone,
+                                      '%s\t%s\t%s\t%s\t%s', query)[0]
+    except SessionException as ex:
+        if 'CAT_NO_ROWS_FOUND' in (ex.stdout or '') + (ex.stderr or ''):
+            return []
+        raise
+
+    listing = OrderedDict()
+    for line in stdout.decode('utf-8').splitlines():
+        fields = line.split('\t', 4)
+        if len(fields) != 5:  # CAT_NO_ROWS_FOUND and other informational lines
+            continue
+        size, modified, checksum, coll_name, data_name = fields
+        # '_' and '%' in coll are wildcards of the like condition, which also matches
+        # sibling collections such as aXb/ for a_b/
+        if coll_name != coll and not coll_name.startswith(coll + '/'):
+            continue
+        relpath = os.path.relpath(os.path.join(coll_name, data_name), coll)
+        # iCAT returns one row per replica; keep the first
+        if relpath not in listing:
+            listing[relpath] = IrodsDataObject(relpath, int(size), int(modified),
+                                               checksum.strip())
+    return listing.values()
+
+
+def _list_irods_collection_by_name(istorage, coll, recursive, data_name):
+    """
+    List the data objects in an iRODS collection with one size request per data object
+
+    This is the fallback of list_irods_collection for paths containing quotes, which cannot
+    be quoted in an iCAT query. Modification times and checksums are not listed.
+    """
+    if data_name is not None:
+        data_path = os.path.join(coll, data_name)
+        if not istorage.exists(data_path):
+            return []
+        return [IrodsDataObject(data_name, istorage.size(data_path), None, '')]
+
+    folders, files = istorage.listdir(coll)
+    listing = [IrodsDataObject(name, istorage.size(os.path.join(coll, name)), None, '')
+               for name in files if name]
+    if recursive:
+        for folder in folders:
+            if not folder:
+                continue
+            for obj in _list_irods_collection_by_name(istorage, os.path.join(coll, folder),
+                                                      True, None):
+                listing.append(obj._replace(path=os.path.join(folder, obj.path)))
+    return listing
+
+
+def get_irods_data_object(istorage, path):
+    """
+    Return size, modification time and registered checksum of a single iRODS data object
+
+    :param istorage: IrodsStorage instance (local or federated) that holds the data object
+    :param path: path of the data object, either absolute or relative to the home collection
+    :return: IrodsDataObject whose path is the base name of the data object, or None if the
+             data object does not exist
+    """
+    coll, data_name = os.path.split(get_irods_absolute_path(path))
+    for obj in list_irods_collection(istorage, coll, recursive=False, data_name=data_name):
+        return obj
+    return None
+
+
+def get_irods_checksum(istorage, path):
+    """
+    Return the md5 checksum of an iRODS data object, computing it on the server if needed
+
+    The checksum registered in iCAT is reused when present, as the bagit rule does.
+
+    :param istorage: IrodsStorage instance (local or federated) that holds the data object
+    :param path: path of the data object, either absolute or relative to the home collection
+    :return: hex-encoded md5 checksum, or None if the server is not configured for md5
+             checksums (e.g. it returns a sha2 checksum instead)
+    """
+    stdout = istorage.session.run("ichksum", None, get_irods_absolute_path(path))[0]
+    for line in stdout.splitlines():
+        tokens = line.split()
+        # skip the trailing "Total checksum performed" summary line
+        if len(tokens) >= 2 and not line.startswith('Total'):
+            checksum = tokens[-1]
+            if checksum.startswith('sha2:'):
+                return None
+            return checksum
+    return None
+
+
+def stream_irods_file(istorage, path, offset=0, length=None, chunk_size=1024 * 1024):
+    """
+    Generate the content of an iRODS data object in chunks without making a local copy
+
+    :param istorage: IrodsStorage instance (local or federated) that holds the data object
+    :param path: path of the data object, either absolute or relative to the home collection
+    :param offset: number of leading bytes to skip; iget cannot seek, so these are read from
+                   iRODS and discarded rather than sent on.
+    :param length: maximum number of bytes to generate; None means up to the end of the file.
+    :param chunk_size: size of the chunks read from iRODS
+    :raises SessionException: if iget fails
+    """
+    proc = istorage.session.run_safe("iget", None, path, '-')
+    try:
+        while offset > 0:
+            skipped = proc.stdout.read(min(offset, chunk_size))
+            if not skipped:
+                break
+            offset -= len(skipped)
+        remaining = length
+        while remaining is None or remaining > 0:
+            to_read = chunk_size if remaining is None else min(remaining, chunk_size)
+            chunk = proc.stdout.read(to_read)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+        if length is None and proc.wait():
+            raise SessionException(proc.returncode, '', proc.stderr.read())
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+
 # TODO: replace with a cache facility that has automatic cleanup
 # TODO: pass a list rather than a string to allow commas in filenames.
 def get_fed_zone_files(irods_fnames):
@@ -258,15 +437,13 @@ def get_file_from_irods(res_file):
     Copy the file (res_file) from iRODS (local or federated zone)
     over to django (temp directory) which is
     necessary for manipulating the file (e.g. metadata extraction).
+    The file is copied from the local file cache if it holds the current version of the file.
     Note: The caller is responsible for cleaning the temp directory
 
     :param res_file: an instance of ResourceFile
     :return: location of the copied file
     """
-    res = res_file.resource
-    istorage = res.get_irods_storage()
-    res_file_path = res_file.storage_path
-    file_name = os.path.basename(res_file_path)
+    file_name = os.path.basename(res_file.storage_path)
 
     tmpdir = os.path.join(settings.TEMP_FILE_DIR, uuid4().hex)
     tmpfile = os.path.join(tmpdir, file_name)
@@ -282,9 +459,8 @@ def get_file_from_irods(res_file):
         else:
             raise Exception(ex.message)
 
-    istorage.getFile(res_file_path, tmpfile)
-    copied_file = tmpfile
-    return copied_file
+    copy_irods_file(res_file, tmpfile)
+    return tmpfile
 
 
 # TODO: should be ResourceFile.replace
@@ -303,6 +479,8 @@ def replace_resource_file_on_irods(new_file, original_resource_file, user):
 
     # Note: this doesn't update metadata at all.
     istorage.saveFile(new_file, ori_storage_path, True)
+    original_resource_file.set_system_metadata()
+    cache_local_file(new_file, original_resource_file)
 
     # do this so that the bag will be regenerated prior to download of the bag
     resource_modified(ori_res, by_user=user, overwrite_bag=False)
@@ -423,17 +601,21 @@ def copy_resource_files_and_AVUs(src_res_id, dest_res_id):
     avu_list = ['bag_modified', 'metadata_dirty', 'isPublic', 'resourceType']
     src_res = get_resource_by_shortkey(src_res_id)
     tgt_res = get_resource_by_shortkey(dest_res_id)
+    timings = OrderedDict()
 
     # This makes the assumption that the destination is in the same exact zone.
     # Also, bags and similar attached files are not copied.
     istorage = src_res.get_irods_storage()
 
     # This makes an exact copy of all physical files.
+    start = time.time()
     src_files = os.path.join(src_res.root_path, 'data')
     # This has to be one segment short of the source because it is a target directory.
     dest_files = tgt_res.root_path
     istorage.copyFiles(src_files, dest_files)
+    timings['copy files'] = time.time() - start
 
+    start = time.time()
     src_coll = src_res.root_path
     tgt_coll = tgt_res.root_path
     for avu_name in avu_list:
@@ -450,25 +632,34 @@ def copy_resource_files_and_AVUs(src_res_id, dest_res_id):
         # everything else gets copied literally
         else:
             istorage.setAVU(tgt_coll, avu_name, value)
+    timings['copy AVUs'] = time.time() - start
 
-    # link copied resource files to Django resource model
-    files = src_res.files.all()
+    # link copied resource files to Django resource model; the resource and logical file of
+    # every file are fetched with one query each
+    files = list(src_res.files.all().prefetch_related('content_object',
+                                                      'logical_file_content_object'))
 
     # if resource files are part of logical files, then logical files also need copying
+    start = time.time()
     src_logical_files = list(set([f.logical_file for f in files if f.has_logical_file]))
     map_logical_files = {}
-    for src_logical_file in src_logical_files:
-        map_logical_files[src_logical_file] = src_logical_file.get_copy()
-
-    for n, f in enumerate(files):
-        folder, base = os.path.split(f.short_path)  # strips object information.
-        new_resource_file = ResourceFile.create(tgt_res, base, folder=folder)
-
-        # if the original file is part of a logical file, then
-        # add the corresponding new resource file to the copy of that logical file
-        if f.has_logical_file:
-            tgt_logical_file = map_logical_files[f.logical_file]
-            tgt_logical_file.add_resource_file(new_resource_file)
+    with transaction.atomic():
+        for src_logical_file in src_logical_files:
+            map_logical_files[src_logical_file] = src_logical_file.get_copy()
+    timings['copy logical files'] = time.time() - start
+
+    # the copied files are checked with one listing of the target resource in iRODS and
+    # registered together, each in the copy of the logical file of its original
+    start = time.time()
+    ResourceFile.create_in_bulk(
+        tgt_res, [os.path.split(f.short_path) for f in files],  # strips object information.
+        logical_files=[map_logical_files[f.logical_file] if f.has_logical_file else None
+                       for f in files])
+    timings['register files'] = time.time() - start
+
+    logger.info("Copied {0} file(s) of resource {1} to resource {2} ({3})".format(
+        len(files), src_res_id, dest_res_id,
+        ', '.join('{0}: {1:.2f}s'.format(phase, t) for phase, t in timings.items())))
 
     if src_res.resource_type.lower() == "collectionresource":
         # clone contained_res list of original collection and add to new collection
@@ -487,7 +678,11 @@ def copy_and_create_metadata(src_res, dest_res):
     """
     # copy metadata from source resource to target resource except three elements
     exclude_elements = ['identifier', 'publisher', 'date']
-    dest_res.metadata.copy_all_elements_from(src_res.metadata, exclude_elements)
+    start = time.time()
+    with transaction.atomic():
+        dest_res.metadata.copy_all_elements_from(src_res.metadata, exclude_elements)
+    logger.info("Copied metadata of resource {0} to resource {1} in {2:.2f}s".format(
+        src_res.short_id, dest_res.short_id, time.time() - start))
 
     # create Identifier element that is specific to the new resource
     dest_res.metadata.create_element('identifier', name='hydroShareIdentifier',
@@ -1040,10 +1235,16 @@ def add_metadata_element_to_xml(root, md_element, md_fields):
                 field.text = str(attr)
 
 
+# number of zip file members uploaded to iRODS at once by add_zip_members_to_resource
+ZIP_UPLOAD_MAX_WORKERS = 4
+
+# minimum seconds between progress reports of add_zip_members_to_resource
+ZIP_PROGRESS_INTERVAL = 5
+
+
 class ZipContents(object):
     """
-    Extract the contents of a zip file one file at a time
-    using a generator.
+    Select the files of a zip file to be added to a resource.
     """
     def __init__(self, zip_file):
         self.zip_file = zip_file
@@ -1054,25 +1255,101 @@ class ZipContents(object):
     def black_list_name(self, file_name):
         return file_name == '.DS_Store'
 
-    def get_files(self):
-        temp_dir = tempfile.mkdtemp()
+    def get_members(self):
+        """ Return the ZipInfo of the files in the zip file, skipping folders and junk files """
+        members = []
+        for info in self.zip_file.infolist():
+            name = os.path.basename(info.filename)
+            if name != '' and not self.black_list_path(info.filename) and \
+                    not self.black_list_name(name):
+                members.append(info)
+        return members
+
+
+def add_zip_members_to_resource(resource, zip_file_path, progress=None,
+                                max_workers=ZIP_UPLOAD_MAX_WORKERS,
+                                progress_interval=ZIP_PROGRESS_INTERVAL):
+    """
+    Add the files in a zip file to a resource, keeping the folders of the zip file.
+
+    The members are streamed from the zip file to iRODS by max_workers threads, without
+    extracting them to disk first. The ResourceFile records are then created in bulk, and a
+    'format' metadata element is added for each new file type. If any upload fails, the
+    files already uploaded are removed again.
+
+    :param resource: resource to which the files are added
+    :param zip_file_path: path of the zip file
+    :param progress: function called with the number of files uploaded and the number of
+        files in the zip file, at most once every progress_interval seconds
+    :return: list of the new ResourceFile records
+    :raises ValidationError: if a file of the zip file is already in the resource; nothing
+        is added then.
+    """
+    istorage = resource.get_irods_storage()
+    # opened by name, the zip file gives each opened member its own file handle, so that
+    # members can be read by several threads at once
+    zfile = zipfile.ZipFile(zip_file_path)
+    try:
+        members = ZipContents(zfile).get_members()
+
+        # files in the resource must not be overwritten, since removing the uploaded files
+        # after a failure would then remove their contents
+        existing = set(obj.path for obj in list_irods_collection(istorage, resource.file_path))
+        conflicts = [info.filename for info in members if info.filename in existing]
+        if conflicts:
+            raise ValidationError("Zip file contains files already in the resource: {}"
+                                  .format(', '.join(sorted(conflicts))))
+
+        failed = threading.Event()
+
+        def upload(info):
+            # once an upload failed, the remaining members are skipped
+            if failed.is_set():
+                return None, None
+            member = zfile.open(info)
+            try:
+                f = File(file=member, name=info.filename)
+                f.size = info.file_size
+                return istorage.save(get_resource_file_path(resource, info.filename), f), None
+            except Exception as ex:
+                failed.set()
+                return None, ex
+            finally:
+                member.close()
+
+        uploaded = []
+        errors = []
+        pool = ThreadPool(max(1, min(len(members), max_workers)))
         try:
-            file_path = None
-            for name_path in self.zip_file.namelist():
-                if not self.black_list_path(name_path):
-                    name = os.path.basename(name_path)
-                    if name != '':
-                        if not self.black_list_name(name):
-                            self.zip_file.extract(name_path, temp_dir)
-                            file_path = os.path.join(temp_dir, name_path)
-                            logger.debug("Opening {0} as File with name {1}".format(file_path,
-                                                                                    name_path))
-                            f = File(file=open(file_path, 'rb'),
-                                     name=name_path)
-                            f.size = os.stat(file_path).st_size
-                            yield f
+            last_progress = time.time()
+            # every upload returns, so that all files written by this call are known when
+            # one of them failed
+            for name, error in pool.imap_unordered(upload, members):
+                if name is not None:
+                    uploaded.append(name)
+                if error is not None:
+                    errors.append(error)
+                if progress is not None and time.time() - last_progress >= progress_interval:
+                    progress(len(uploaded), len(members))
+                    last_progress = time.time()
+            if errors:
+                raise errors[0]
+            res_files = ResourceFile.create_in_bulk(resource, [(None, name) for name in uploaded])
+        except Exception:
+            for name in uploaded:
+                istorage.delete(name)
+            raise
         finally:
-            shutil.rmtree(temp_dir)
+            pool.close()
+    finally:
+        zfile.close()
+
+    # TODO: generate this from data in ResourceFile rather than extension
+    formats = set(resource.metadata.formats.values_list('value', flat=True))
+    for file_format_type in sorted(set(get_file_mime_type(name) for name in uploaded)):
+        if file_format_type not in formats:
+            resource.metadata.create_element('format', value=file_format_type)
+    return res_files
 
 
 def get_file_storage():
@@ -0,0 +1,197 @@
+"""
+Write zip archives to a stream, one chunk at a time.
+
+Unlike zipfile.ZipFile, ZipStream never seeks: every member is written with a local file
+header that defers sizes and crc to a data descriptor following the member data, so the
+archive can be sent to a client while it is being built. ZIP64 records are written where
+members or the archive exceed the 4 GB limit of the classic format.
+
+Typical usage::
+
+    zstream = ZipStream()
+    for chunk in zstream.write_iter('dir/name.txt', file_chunks, size=file_size):
+        yield chunk
+    for chunk in zstream.write_str('dir/small.txt', 'content'):
+        yield chunk
+    for chunk in zstream.close():
+        yield chunk
+"""
+import struct
+import time
+import zlib
+import zipfile
+
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_FILECOUNT_LIMIT = 0xFFFF
+
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+
+_LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+_DATA_DESCRIPTOR = struct.Struct('<IIII')
+_DATA_DESCRIPTOR64 = struct.Struct('<IIQQ')
+_CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+_END_RECORD = struct.Struct('<IHHHHIIH')
+_END_RECORD64 = struct.Struct('<IQHHIIQQQQ')
+_END_LOCATOR64 = struct.Struct('<IIQI')
+
+
+class ZipStreamException(Exception):
+    pass
+
+
+class _Member(object):
+    def __init__(self, name, flags, method, dos_time, dos_date, offset, zip64):
+        self.name = name
+        self.flags = flags
+        self.method = method
+        self.dos_time = dos_time
+        self.dos_date = dos_date
+        self.offset = offset
+        self.zip64 = zip64
+        self.crc = 0
+        self.compress_size = 0
+        self.file_size = 0
+
+
+def _needs_zip64(size):
+    """ whether a member of the given (possibly unknown) size needs ZIP64 sizes """
+    # leave room for the worst-case growth of deflated data
+    return size is None or size + (size >> 12) + 1024 >= ZIP64_LIMIT
+
+
+class ZipStream(object):
+    """
+    Build a zip archive as a sequence of byte strings.
+
+    All write methods are generators; the archive is complete once the generator returned
+    by close() is exhausted.
+    """
+
+    def __init__(self, compression=zipfile.ZIP_DEFLATED):
+        if compression not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            raise ZipStreamException("Unsupported compression method {}".format(compression))
+        self.compression = compression
+        self._members = []
+        self._offset = 0
+        self._closed = False
+
+    @property
+    def bytes_written(self):
+        """ number of bytes of the archive produced so far """
+        return self._offset
+
+    def _emit(self, data):
+        self._offset += len(data)
+        return data
+
+    def write_iter(self, arcname, chunks, size=None, date_time=None):
+        """
+        Add a member whose content is produced by an iterable of byte strings.
+
+        :param arcname: name of the member in the archive
+        :param chunks: iterable of byte strings making up the content of the member
+        :param size: expected uncompressed size, if known; decides whether ZIP64 sizes are
+                     needed for the member, so members of unknown size always use them.
+        :param date_time: modification time as a time tuple; defaults to now.
+        """
+        if self._closed:
+            raise ZipStreamException("Cannot add {} to a closed archive".format(arcname))
+        if isinstance(arcname, unicode):
+            arcname = arcname.encode('utf-8')
+        date_time = date_time or time.localtime()[:6]
+        dos_time = date_time[3] << 11 | date_time[4] << 5 | date_time[5] // 2
+        dos_date = (max(date_time[0], 1980) - 1980) << 9 | date_time[1] << 5 | date_time[2]
+
+        zip64 = _needs_zip64(size)
+        member = _Member(arcname, _FLAG_DATA_DESCRIPTOR | _FLAG_UTF8, self.compression,
+                         dos_time, dos_date, self._offset, zip64)
+        if zip64:
+            # sizes are deferred to the data descriptor; the extra field only announces ZIP64
+            extra = struct.pack('<HHQQ', 1, 16, 0, 0)
+            header_size = ZIP64_LIMIT
+        else:
+            extra = ''
+            header_size = 0
+        yield self._emit(_LOCAL_HEADER.pack(
+            0x04034b50, 45 if zip64 else 20, member.flags, member.method, dos_time, dos_date,
+            0, header_size, header_size, len(arcname), len(extra)) + arcname + extra)
+
+        compressor = None
+        if self.compression == zipfile.ZIP_DEFLATED:
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        crc = 0
+        for chunk in chunks:
+            if not chunk:
+                continue
+            member.file_size += len(chunk)
+            crc = zlib.crc32(chunk, crc)
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+                if not chunk:
+                    continue
+            member.compress_size += len(chunk)
+            yield self._emit(chunk)
+        if compressor is not None:
+            chunk = compressor.flush()
+            member.compress_size += len(chunk)
+            yield self._emit(chunk)
+        member.crc = crc & 0xffffffff
+
+        if not zip64 and (member.file_size >= ZIP64_LIMIT or
+                          member.compress_size >= ZIP64_LIMIT):
+            raise ZipStreamException("{} is larger than its announced size".format(arcname))
+        if zip64:
+            yield self._emit(_DATA_DESCRIPTOR64.pack(0x08074b50, member.crc,
+                                                     member.compress_size, member.file_size))
+        else:
+            yield self._emit(_DATA_DESCRIPTOR.pack(0x08074b50, member.crc,
+                                                   member.compress_size, member.file_size))
+        self._members.append(member)
+
+    def write_str(self, arcname, data, date_time=None):
+        """ Add a member whose content is the given byte string """
+        return self.write_iter(arcname, [data], size=len(data), date_time=date_time)
+
+    def close(self):
+        """ Write the central directory, completing the archive """
+        if self._closed:
+            raise ZipStreamException("Archive is already closed")
+        self._closed = True
+
+        cd_offset = self._offset
+        for member in self._members:
+            extra_fields = []
+            file_size = member.file_size
+            compress_size = member.compress_size
+            offset = member.offset
+            if file_size >= ZIP64_LIMIT or compress_size >= ZIP64_LIMIT or member.zip64:
+                extra_fields.extend([file_size, compress_size])
+                file_size = compress_size = ZIP64_LIMIT
+            if offset >= ZIP64_LIMIT:
+                extra_fields.append(offset)
+                offset = ZIP64_LIMIT
+            if extra_fields:
+                extra = struct.pack('<HH' + 'Q' * len(extra_fields), 1, 8 * len(extra_fields),
+                                    *extra_fields)
+                version = 45
+            else:
+                extra = ''
+                version = 20
+            yield self._emit(_CENTRAL_HEADER.pack(
+                0x02014b50, 3 << 8 | version, version, member.flags, member.method,
+                member.dos_time, member.dos_date, member.crc, compress_size, file_size,
+                len(member.name), len(extra), 0, 0, 0, 0o644 << 16, offset) +
+                member.name + extra)
+        cd_size = self._offset - cd_offset
+
+        count = len(self._members)
+        if count > ZIP_FILECOUNT_LIMIT or cd_offset >= ZIP64_LIMIT or cd_size >= ZIP64_LIMIT:
+            end64_offset = self._offset
+            yield self._emit(_END_RECORD64.pack(0x06064b50, _END_RECORD64.size - 12, 45, 45,
+                                                0, 0, count, count, cd_size, cd_offset))
+            yield self._emit(_END_LOCATOR64.pack(0x07064b50, 0, end64_offset, 1))
+        yield self._emit(_END_RECORD.pack(0x06054b50, 0, 0, min(count, ZIP_FILECOUNT_LIMIT),
+                                          min(count, ZIP_FILECOUNT_LIMIT),
+                                          min(cd_size, ZIP64_LIMIT),
+                                          min(cd_offset, ZIP64_LIMIT), 0))
@@ -8,9 +8,11 @@ This checks that:
 1. every ResourceFile corresponds to an iRODS file
 2. every iRODS file in {short_id}/data/contents corresponds to a ResourceFile
 3. every iRODS directory {short_id} corresponds to a Django resource
+4. cached ResourceFile sizes and checksums agree with iRODS
 
 * By default, prints errors on stdout.
 * Optional argument --log instead logs output to system log.
+* Optional argument --sync-sizes updates cached sizes and checksums from iRODS.
 """
 
 from django.core.management.base import BaseCommand
@@ -67,6 +69,14 @@ class Command(BaseCommand):
             help='check for local unreferenced iRODS files',
         )
 
+        # Named (optional) arguments
+        parser.add_argument(
+            '--sync-sizes',
+            action='store_true',  # True for presence, False for absence
+            dest='sync_sizes',    # value is options['sync_sizes']
+            help='update cached file sizes and checksums from iRODS',
+        )
+
     def handle(self, *args, **options):
         if options['unreferenced']:
             print("LOOKING FOR IRODS RESOURCES NOT IN DJANGO")
@@ -86,7 +96,8 @@ class Command(BaseCommand):
                 resource.check_irods_files(stop_on_error=False,
                                            echo_errors=not options['log'],
                                            log_errors=options['log'],
-                                           return_errors=False)
+                                           return_errors=False,
+                                           sync_sizes=options['sync_sizes'])
 
         else:  # check all resources
             print("LOOKING FOR FILE ERRORS FOR ALL RESOURCES")
@@ -94,4 +105,5 @@ class Command(BaseCommand):
                 r.check_irods_files(stop_on_error=False,
                                     echo_errors=not options['log'],  # Don't both log and echo
                                     log_errors=options['log'],
-                                    return_errors=False)
+                                    return_errors=False,
+                                    sync_sizes=options['sync_sizes'])
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+"""
+File cache status
+
+This reports on the local cache of files retrieved from iRODS.
+
+* files and size: the number and total size of the cached files.
+* hits and misses: the number of requests served from the cache and retrieved from iRODS.
+* fetched: the bytes retrieved from iRODS by misses.
+* evictions: the number of files removed to keep the cache within HS_FILE_CACHE_SIZE.
+"""
+
+from django.core.management.base import BaseCommand
+from hs_core.hydroshare.file_cache import get_file_cache_metrics
+
+
+class Command(BaseCommand):
+    help = "Print size, hits and misses of the local cache of files retrieved from iRODS."
+
+    def handle(self, *args, **options):
+        metrics = get_file_cache_metrics()
+        print("files: {}".format(metrics['files']))
+        print("size: {} bytes".format(metrics['bytes_cached']))
+        requests = metrics['hits'] + metrics['misses']
+        if requests:
+            print("hits: {} ({:.1%})".format(metrics['hits'], float(metrics['hits']) / requests))
+        else:
+            print("hits: 0")
+        print("misses: {}".format(metrics['misses']))
+        print("fetched: {} bytes".format(metrics['bytes_fetched']))
+        print("evictions: {}".format(metrics['evictions']))
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+"""
+Index queue status
+
+This reports on the queue of resources waiting to be reindexed in Solr.
+
+* depth: the number of resources waiting to be reindexed.
+* lag: seconds between the first queued save and the reindexing of the latest resource updated.
+"""
+
+from django.core.management.base import BaseCommand
+from hs_core.hydro_realtime_signal_processor import get_index_queue_metrics
+
+
+class Command(BaseCommand):
+    help = "Print depth and lag of the queue of resources waiting to be reindexed."
+
+    def handle(self, *args, **options):
+        metrics = get_index_queue_metrics()
+        print("depth: {}".format(metrics['depth']))
+        if metrics['lag'] is None:
+            print("lag: no resource reindexed from the queue yet")
+        else:
+            print("lag: {:.1f} seconds".format(metrics['lag']))
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hs_core', '0036_remove_baseresource_comments_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bags',
+            name='file_state',
+            field=models.TextField(default='', blank=True),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+
+from django.db import migrations, models
+
+
+def set_coverage_extents(apps, schema_editor):
+    # model methods are not available during migrations, so this repeats Coverage.get_extent
+    Coverage = apps.get_model('hs_core', 'Coverage')
+    for coverage in Coverage.objects.filter(type__in=('box', 'point')).iterator():
+        value = json.loads(coverage._value)
+        try:
+            if coverage.type == 'box':
+                north = float(value['northlimit'])
+                south = float(value['southlimit'])
+                extent = (max(north, south), min(north, south), float(value['eastlimit']),
+                          float(value['westlimit']))
+            else:
+                north = float(value['north'])
+                east = float(value['east'])
+                extent = (north, north, east, east)
+        except (KeyError, TypeError, ValueError):
+            continue
+        Coverage.objects.filter(id=coverage.id).update(
+            _north=extent[0], _south=extent[1], _east=extent[2], _west=extent[3])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hs_core', '0038_resourcefile_system_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coverage',
+            name='_east',
+            field=models.FloatField(db_index=True, null=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='coverage',
+            name='_north',
+            field=models.FloatField(db_index=True, null=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='coverage',
+            name='_south',
+            field=models.FloatField(db_index=True, null=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='coverage',
+            name='_west',
+            field=models.FloatField(db_index=True, null=True, editable=False, blank=True),
+        ),
+        migrations.RunPython(set_coverage_extents, migrations.RunPython.noop),
+    ]
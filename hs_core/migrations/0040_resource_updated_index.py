@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# resources inherit their last update time from mezzanine pages; REST resource lists paged by
+# cursor are ordered by (updated, id), so index the pages table on these columns
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hs_core', '0039_coverage_extent'),
+        ('pages', '__first__'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX hs_core_page_updated_id ON pages_page (updated, id);',
+            'DROP INDEX hs_core_page_updated_id;'),
+    ]
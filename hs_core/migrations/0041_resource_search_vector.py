@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# migrations do not depend on model code, so this repeats RESOURCE_SEARCH_VECTOR_SQL of
+# hs_core.models as it was when the column was added
+RESOURCE_SEARCH_VECTOR_SQL = """
+UPDATE hs_core_genericresource r SET search_vector =
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(e.value, ' ') FROM hs_core_title e
+        WHERE e.content_type_id = r.content_type_id AND e.object_id = r.object_id), '')), 'A') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(e.abstract, ' ') FROM hs_core_description e
+        WHERE e.content_type_id = r.content_type_id AND e.object_id = r.object_id), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(e.value, ' ') FROM hs_core_subject e
+        WHERE e.content_type_id = r.content_type_id AND e.object_id = r.object_id), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(e.name, ' ') FROM hs_core_creator e
+        WHERE e.content_type_id = r.content_type_id AND e.object_id = r.object_id), '')), 'C')
+"""
+
+
+# full text search vector of resources, maintained by update_resource_search_vector when their
+# title, abstract, keywords or creators change; resources are found by the metadata object id
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hs_core', '0040_resource_updated_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'ALTER TABLE hs_core_genericresource ADD COLUMN search_vector tsvector;',
+            'ALTER TABLE hs_core_genericresource DROP COLUMN search_vector;'),
+        migrations.RunSQL(
+            'CREATE INDEX hs_core_genericresource_search_vector ON hs_core_genericresource '
+            'USING gin (search_vector);',
+            'DROP INDEX hs_core_genericresource_search_vector;'),
+        migrations.RunSQL(
+            'CREATE INDEX hs_core_genericresource_object_id ON hs_core_genericresource '
+            '(object_id);',
+            'DROP INDEX hs_core_genericresource_object_id;'),
+        migrations.RunSQL(RESOURCE_SEARCH_VECTOR_SQL, migrations.RunSQL.noop),
+    ]
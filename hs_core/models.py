@@ -2,6 +2,7 @@ import os.path
 import json
 import arrow
 import logging
+from datetime import datetime
 from uuid import uuid4
 from languages_iso import languages as iso_languages
 from dateutil import parser
@@ -13,12 +14,12 @@ from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.fields import GenericRelation
 from django.contrib.auth.models import User, Group
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
-from django.db.models import Q
+from django.db import models, connection
+from django.db.models import Q, F
 from django.db.models.signals import post_save
 from django.db import transaction
 from django.dispatch import receiver
-from django.utils.timezone import now
+from django.utils.timezone import now, utc
 from django_irods.storage import IrodsStorage
 from django.conf import settings
 from django.core.files import File
@@ -944,11 +945,62 @@ class Coverage(AbstractMetaDataElement):
                     'projection': name of the projection (optional)}"
     """
     _value = models.CharField(max_length=1024)
+    # extent of box and point coverages, kept in sync with _value on save so that spatial
+    # queries run as indexed SQL predicates (see get_intersects_query)
+    _north = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    _south = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    _east = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    _west = models.FloatField(null=True, blank=True, editable=False, db_index=True)
 
     @property
     def value(self):
         return json.loads(self._value)
 
+    def save(self, *args, **kwargs):
+        self._north, self._south, self._east, self._west = self.get_extent()
+        super(Coverage, self).save(*args, **kwargs)
+
+    def get_extent(self):
+        """
+        Return (north, south, east, west) of a box or point coverage, or four Nones for a
+        period coverage or a value that is not numeric.
+
+        A box whose west limit is greater than its east limit crosses the antimeridian.
+        """
+        value = self.value
+        try:
+            if self.type == 'box':
+                north = float(value['northlimit'])
+                south = float(value['southlimit'])
+                return (max(north, south), min(north, south), float(value['eastlimit']),
+                        float(value['westlimit']))
+            elif self.type == 'point':
+                north = float(value['north'])
+                east = float(value['east'])
+                return north, north, east, east
+        except (KeyError, TypeError, ValueError):
+            pass
+        return None, None, None, None
+
+    @classmethod
+    def get_intersects_query(cls, north, south, east, west):
+        """
+        Return a Q object selecting the box and point coverages that intersect a box.
+
+        :param north, south, east, west: limits of the box in degrees; a box whose west limit
+            is greater than its east limit crosses the antimeridian.
+        """
+        north, south = max(north, south), min(north, south)
+        query = Q(_south__lte=north, _north__gte=south)
+        crosses = Q(_west__gt=F('_east'))
+        if west <= east:
+            query &= (~crosses & Q(_west__lte=east, _east__gte=west)) | \
+                (crosses & (Q(_west__lte=east) | Q(_east__gte=west)))
+        else:
+            # boxes that both cross the antimeridian always overlap there
+            query &= crosses | Q(_east__gte=west) | Q(_west__lte=east)
+        return query
+
     @classmethod
     def create(cls, **kwargs):
         """
@@ -1472,14 +1524,16 @@ class AbstractResource(ResourcePermissionsMixin):
     # It would seem to me that one only creates a bag after a resource has been created,
     # so that this would be an instance method....
     @classmethod
-    def bag_url(cls, resource_id):
+    def bag_url(cls, resource_id, res=None):
+        """ Return the url of the bag of a resource; pass res to save looking it up """
         bagit_path = getattr(settings, 'IRODS_BAGIT_PATH', 'bags')
         bagit_postfix = getattr(settings, 'IRODS_BAGIT_POSTFIX', 'zip')
         bag_path = "{path}/{resource_id}.{postfix}".format(path=bagit_path,
                                                            resource_id=resource_id,
                                                            postfix=bagit_postfix)
-        # type resolution is not relevant; grab base class instance.
-        res = BaseResource.objects.get(short_id=resource_id)
+        if res is None:
+            # type resolution is not relevant; grab base class instance.
+            res = BaseResource.objects.get(short_id=resource_id)
         istorage = res.get_irods_storage()
         bag_url = istorage.url(bag_path)
 
@@ -1822,7 +1876,7 @@ class AbstractResource(ResourcePermissionsMixin):
                           .format(self.short_id, r.type, target))
 
     def check_irods_files(self, stop_on_error=False, log_errors=True,
-                          echo_errors=False, return_errors=False):
+                          echo_errors=False, return_errors=False, sync_sizes=False):
         """
         Check whether files in self.files and on iRODS agree
 
@@ -1830,6 +1884,8 @@ class AbstractResource(ResourcePermissionsMixin):
         :param log_errors: whether to log errors to Django log
         :param echo_errors: whether to print errors on stdout
         :param return_errors: whether to collect errors in an array and return them.
+        :param sync_sizes: whether to update cached file sizes and checksums that disagree
+            with iRODS
         """
 
         logger = logging.getLogger(__name__)
@@ -1902,6 +1958,15 @@ class AbstractResource(ResourcePermissionsMixin):
                 if return_errors:
                     errors.append(msg)
 
+            # Step 4: do cached file sizes and checksums agree with iRODS?
+            error4, ecount4 = self.__check_cached_file_metadata(logger, sync_sizes=sync_sizes,
+                                                                stop_on_error=stop_on_error,
+                                                                log_errors=log_errors,
+                                                                echo_errors=echo_errors,
+                                                                return_errors=return_errors)
+            errors.extend(error4)
+            ecount += ecount4
+
             # finally, check whether the public flag agrees with ours
             django_public = self.raccess.public
             try:
@@ -1954,6 +2019,69 @@ class AbstractResource(ResourcePermissionsMixin):
 
         return errors, ecount  # empty unless return_errors=True
 
+    def __check_cached_file_metadata(self, logger, sync_sizes=False,
+                                     stop_on_error=False, log_errors=True,
+                                     echo_errors=False, return_errors=False):
+        """
+        compare cached ResourceFile sizes and checksums with a single listing of iRODS
+
+        Files whose sizes were never cached are not errors; they are filled in when
+        sync_sizes is True.
+
+        :param sync_sizes: whether to update cached values that are missing or disagree
+        :param stop_on_error: whether to raise a ValidationError exception on first error
+        :param log_errors: whether to log errors to Django log
+        :param echo_errors: whether to print errors on stdout
+        :param return_errors: whether to collect errors in an array and return them.
+        """
+        from hs_core.hydroshare.utils import list_irods_collection
+
+        errors = []
+        ecount = 0
+        istorage = self.get_irods_storage()
+        try:
+            listing = {os.path.join(self.file_path, obj.path): obj
+                       for obj in list_irods_collection(istorage, self.file_path)}
+        except SessionException:
+            msg = "check_irods_files: listing of iRODS directory {} failed"\
+                .format(self.file_path)
+            if echo_errors:
+                print(msg)
+            if log_errors:
+                logger.error(msg)
+            if return_errors:
+                errors.append(msg)
+            if stop_on_error:
+                raise ValidationError(msg)
+            return errors, 1
+
+        for f in self.files.all():
+            obj = listing.get(f.storage_path)
+            if obj is None:
+                continue  # reported in step 1
+            stale = f._size >= 0 and (f._size != obj.size or
+                                      (f._checksum and obj.checksum and
+                                       f._checksum != obj.checksum))
+            if stale:
+                ecount += 1
+                msg = "check_irods_files: cached size {} of {} disagrees with iRODS size {}"\
+                    .format(f._size, f.storage_path, obj.size)
+                if echo_errors:
+                    print(msg)
+                if log_errors:
+                    logger.error(msg)
+                if return_errors:
+                    errors.append(msg)
+                if stop_on_error:
+                    raise ValidationError(msg)
+            if sync_sizes and (stale or f._size < 0):
+                f._size = obj.size
+                f._modified_time = datetime.fromtimestamp(obj.modified, utc)
+                f._checksum = obj.checksum or None
+                f.save(update_fields=['_size', '_checksum', '_modified_time'])
+
+        return errors, ecount
+
     def __check_irods_directory(self, dir, logger,
                                 stop_on_error=False, log_errors=True,
                                 echo_errors=False, return_errors=False):
@@ -2128,6 +2256,13 @@ class ResourceFile(models.Model):
     logical_file_content_object = GenericForeignKey('logical_file_content_type',
                                                     'logical_file_object_id')
 
+    # File system metadata cached from iRODS by set_system_metadata so that listing files and
+    # computing resource sizes does not require one iRODS request per file.
+    # _size is -1 for records created before these fields existed, until first computed.
+    _size = models.BigIntegerField(default=-1)
+    _checksum = models.CharField(max_length=255, null=True, blank=True)
+    _modified_time = models.DateTimeField(null=True, blank=True)
+
     def __str__(self):
         if self.resource.resource_federation_path:
             return self.fed_resource_file.name
@@ -2230,7 +2365,67 @@ class ResourceFile(models.Model):
         # Actually create the file record
         # when file is a File, the file is copied to storage in this step
         # otherwise, the copy must precede this step.
-        return ResourceFile.objects.create(**kwargs)
+        res_file = ResourceFile.objects.create(**kwargs)
+        res_file.set_system_metadata()
+        return res_file
+
+    @classmethod
+    def create_in_bulk(cls, resource, files, logical_files=None, batch_size=1000):
+        """
+        Create the records of many files that already exist in iRODS in the proper place.
+
+        This is the bulk form of ResourceFile.create(r, file_name, folder=d): all files are
+        checked, and their system metadata cached, with one listing of the resource files in
+        iRODS, and the records are inserted batch_size at a time.
+
+        :param resource: resource that contains the files.
+        :param files: list of (folder, file_name) pairs of the files.
+        :param logical_files: list of the logical files that the files are part of, in the
+            order of files, with None for files that are not part of a logical file.
+        :param batch_size: number of records inserted by each query.
+        :return: list of the new ResourceFile records, in the order of files.
+        :raises ValidationError: if any of the files does not exist in iRODS.
+        """
+        # avoid import loop
+        from hs_core.hydroshare.utils import list_irods_collection
+
+        if not files:
+            return []
+        istorage = resource.get_irods_storage()
+        listing = {obj.path: obj for obj in list_irods_collection(istorage, resource.file_path)}
+        file_field = 'fed_resource_file' if resource.resource_federation_path else 'resource_file'
+        content_type = ContentType.objects.get_for_model(resource)
+
+        if logical_files is None:
+            logical_files = [None] * len(files)
+        targets = []
+        res_files = []
+        for (folder, file_name), logical_file in zip(files, logical_files):
+            target = get_resource_file_path(resource, file_name, folder=folder)
+            obj = listing.get(os.path.relpath(target, resource.file_path))
+            if obj is None:
+                raise ValidationError("ResourceFile.create_in_bulk: target {} does not exist"
+                                      .format(target))
+            res_file = cls(content_type=content_type, object_id=resource.id, file_folder=folder,
+                           _size=obj.size, _checksum=obj.checksum or None)
+            setattr(res_file, file_field, target)
+            if obj.modified is not None:
+                res_file._modified_time = datetime.fromtimestamp(obj.modified, utc)
+            if logical_file is not None:
+                res_file.logical_file_content_object = logical_file
+            targets.append(target)
+            res_files.append(res_file)
+        cls.objects.bulk_create(res_files, batch_size=batch_size)
+
+        # bulk_create does not set the primary keys of the records, so fetch them back;
+        # ordering by key makes the new records win over any older record of the same path
+        created = {}
+        for i in range(0, len(targets), batch_size):
+            filters = {file_field + '__in': targets[i:i + batch_size]}
+            for res_file in cls.objects.filter(content_type=content_type, object_id=resource.id,
+                                               **filters).order_by('pk'):
+                created[getattr(res_file, file_field).name] = res_file
+        return [created[path] for path in targets]
 
     # TODO: automagically handle orphaned logical files
     def delete(self):
@@ -2252,19 +2447,71 @@ class ResourceFile(models.Model):
     def resource(self):
         return self.content_object
 
-    # TODO: write unit test
     @property
     def size(self):
-        if self.resource.resource_federation_path:
-            if __debug__:
-                assert self.resource_file.name is None or \
-                       self.resource_file.name == ''
-            return self.fed_resource_file.size
-        else:
-            if __debug__:
-                assert self.fed_resource_file.name is None or \
-                       self.fed_resource_file.name == ''
-            return self.resource_file.size
+        """
+        Return the size of the file in bytes, or 0 if the file does not exist in iRODS.
+
+        The size is cached in the database and is only requested from iRODS the first time
+        for records that predate the cache.
+        """
+        if self._size < 0:
+            self.set_system_metadata()
+        return max(self._size, 0)
+
+    @property
+    def checksum(self):
+        """ Return the md5 checksum of the file, computing it in iRODS if necessary """
+        if not self._checksum:
+            self.set_system_metadata(compute_checksum=True)
+        return self._checksum
+
+    @property
+    def modified_time(self):
+        """ Return the time the file was last modified in iRODS """
+        if self._size < 0:
+            self.set_system_metadata()
+        return self._modified_time
+
+    def set_system_metadata(self, compute_checksum=False, save=True):
+        """
+        Refresh the cached size, checksum and modification time of this file from iRODS.
+
+        This must be called whenever the content of the file changes in iRODS.
+
+        :param compute_checksum: if True, compute the checksum in iRODS if none is registered;
+            otherwise only a checksum already registered in iRODS is cached.
+        :param save: if True, save the refreshed fields.
+        """
+        # avoid import loop
+        from hs_core.hydroshare.utils import get_irods_data_object, get_irods_checksum
+
+        istorage = self.resource.get_irods_storage()
+        obj = get_irods_data_object(istorage, self.storage_path)
+        if obj is None:
+            # leave the cache unset so that the file is checked again once it exists
+            return
+        self._size = obj.size
+        if obj.modified is not None:
+            self._modified_time = datetime.fromtimestamp(obj.modified, utc)
+        checksum = obj.checksum
+        if not checksum and compute_checksum:
+            checksum = get_irods_checksum(istorage, self.storage_path)
+        self._checksum = checksum or None
+        if save:
+            self.save(update_fields=['_size', '_checksum', '_modified_time'])
+
+    @classmethod
+    def get_total_size(cls, resource):
+        """
+        Return the total size in bytes of the files of a resource with a single aggregate query
+
+        Sizes of files that predate the cached size are computed and cached first.
+        """
+        for f in resource.files.filter(_size__lt=0):
+            f.set_system_metadata()
+        return resource.files.filter(_size__gt=0)\
+            .aggregate(total=models.Sum('_size'))['total'] or 0
 
     # TODO: write unit test
     @property
@@ -2632,6 +2879,9 @@ class Bags(models.Model):
 
     content_object = GenericForeignKey('content_type', 'object_id', for_concrete_model=False)
     timestamp = models.DateTimeField(default=now, db_index=True)
+    # JSON record of [checksum, size, modified time] keyed by payload path as of the last
+    # bag build; used by hs_bagit.update_bag_manifests to avoid rehashing unchanged files.
+    file_state = models.TextField(blank=True, default='')
 
     class Meta:
         ordering = ['-timestamp']
@@ -2836,9 +3086,7 @@ class BaseResource(Page, AbstractResource):
 
         Raises SessionException if iRODS fails.
         """
-        # compute the total file size for the resource
-        f_sizes = [f.size for f in self.files.all()]
-        return sum(f_sizes)
+        return ResourceFile.get_total_size(self)
 
     @property
     def verbose_name(self):
@@ -2909,6 +3157,37 @@ class BaseResource(Page, AbstractResource):
         return hs_term_dict
 
 
+# SQL setting the full text search vector of resources from their title, abstract, keywords
+# and creators, weighted in this order. The search_vector column and its GIN index are not
+# model fields, so that they are not loaded with every resource (see migration 0041).
+RESOURCE_SEARCH_VECTOR_SQL = """
+UPDATE hs_core_genericresource r SET search_vector =
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(e.value, ' ') FROM hs_core_title e
+        WHERE e.content_type_id = r.content_type_id AND e.object_id = r.object_id), '')), 'A') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(e.abstract, ' ') FROM hs_core_description e
+        WHERE e.content_type_id = r.content_type_id AND e.object_id = r.object_id), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(e.value, ' ') FROM hs_core_subject e
+        WHERE e.content_type_id = r.content_type_id AND e.object_id = r.object_id), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(e.name, ' ') FROM hs_core_creator e
+        WHERE e.content_type_id = r.content_type_id AND e.object_id = r.object_id), '')), 'C')
+"""
+
+
+def update_resource_search_vector(content_type_id, object_id):
+    """
+    Refresh the full text search vector of the resource whose metadata is identified by
+    content_type_id and object_id, after its title, abstract, keywords or creators changed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(RESOURCE_SEARCH_VECTOR_SQL +
+                       "WHERE r.content_type_id = %s AND r.object_id = %s",
+                       [content_type_id, object_id])
+
+
 class GenericResource(BaseResource):
     objects = ResourceManager('GenericResource')
 
@@ -10,11 +10,10 @@ from hs_core import languages_iso
 from forms import CreatorForm, ContributorForm, SubjectsForm, AbstractForm, RelationForm, \
     SourceForm, FundingAgencyForm, BaseCreatorFormSet, BaseContributorFormSet, BaseFormSet, \
     MetaDataElementDeleteForm, CoverageTemporalForm, CoverageSpatialForm, ExtendedMetadataForm
-from hs_tools_resource.models import SupportedResTypes, ToolResource
 from hs_core.views.utils import authorize, ACTION_TO_AUTHORIZE, show_relations_section, \
     can_user_copy_resource
 from hs_core.hydroshare.resource import METADATA_STATUS_SUFFICIENT, METADATA_STATUS_INSUFFICIENT
-from hs_tools_resource.utils import parse_app_url_template
+from hs_tools_resource.utils import parse_app_url_template, get_web_apps_for_resource_type
 
 
 @processor_for(GenericResource)
@@ -72,56 +71,29 @@ def get_page_context(page, user, resource_edit=False, extended_metadata_layout=N
                 tool_homepage_url = content_model.metadata.homepage_url.first().value
 
         relevant_tools = []
-        # loop through all SupportedResTypes objs (one webapp resources has one
-        # SupportedResTypes obj)
-        for res_type in SupportedResTypes.objects.all():
-            supported_flag = False
-            for supported_type in res_type.supported_res_types.all():
-                if content_model_str == supported_type.description.lower():
-                    supported_flag = True
-                    break
-
-            if supported_flag:
-                # reverse lookup: metadata obj --> res obj
-                tool_res_obj = ToolResource.objects.get(object_id=res_type.object_id)
-                if tool_res_obj:
-                    sharing_status_supported = False
-
-                    supported_sharing_status_obj = tool_res_obj.metadata.\
-                        supported_sharing_status.first()
-                    if supported_sharing_status_obj is not None:
-                        suppored_sharing_status_str = supported_sharing_status_obj.\
-                                                      get_sharing_status_str()
-                        if len(suppored_sharing_status_str) > 0:
-                            res_sharing_status = content_model.raccess.sharing_status
-                            if suppored_sharing_status_str.lower().\
-                                    find(res_sharing_status.lower()) != -1:
-                                sharing_status_supported = True
-                    else:
-                        # backward compatible: webapp without supported_sharing_status metadata
-                        # is considered to support all sharing status
-                        sharing_status_supported = True
-
-                    if sharing_status_supported:
-                        is_authorized = authorize(
-                            request, tool_res_obj.short_id,
-                            needed_permission=ACTION_TO_AUTHORIZE.VIEW_RESOURCE,
-                            raises_exception=False)[1]
-                        if is_authorized:
-                            tool_url = tool_res_obj.metadata.url_bases.first().value \
-                                if tool_res_obj.metadata.url_bases.first() else None
-                            tool_icon_url = tool_res_obj.metadata.tool_icon.first().data_url \
-                                if tool_res_obj.metadata.tool_icon.first() else "raise-img-error"
-                            hs_term_dict_user = {}
-                            hs_term_dict_user["HS_USR_NAME"] = request.user.username if \
-                                request.user.is_authenticated() else "anonymous"
-                            tool_url_new = parse_app_url_template(
-                                tool_url, [content_model.get_hs_term_dict(), hs_term_dict_user])
-                            if tool_url_new is not None:
-                                tl = {'title': str(tool_res_obj.metadata.title.value),
-                                      'icon_url': tool_icon_url,
-                                      'url': tool_url_new}
-                                relevant_tools.append(tl)
+        # web apps supporting the type of this resource, from an index of all web apps
+        for web_app in get_web_apps_for_resource_type(content_model_str):
+            sharing_status = web_app['sharing_status']
+            # backward compatible: webapp without supported_sharing_status metadata
+            # is considered to support all sharing status
+            if sharing_status is not None and \
+                    sharing_status.find(content_model.raccess.sharing_status.lower()) == -1:
+                continue
+            is_authorized = authorize(
+                request, web_app['short_id'],
+                needed_permission=ACTION_TO_AUTHORIZE.VIEW_RESOURCE,
+                raises_exception=False)[1]
+            if is_authorized:
+                hs_term_dict_user = {}
+                hs_term_dict_user["HS_USR_NAME"] = request.user.username if \
+                    request.user.is_authenticated() else "anonymous"
+                tool_url_new = parse_app_url_template(
+                    web_app['url'], [content_model.get_hs_term_dict(), hs_term_dict_user])
+                if tool_url_new is not None:
+                    tl = {'title': web_app['title'],
+                          'icon_url': web_app['icon_url'],
+                          'url': tool_url_new}
+                    relevant_tools.append(tl)
 
     just_created = False
     just_copied = False
@@ -2,9 +2,11 @@
 # Note: this module has been imported in the models.py in order to receive signals
 # se the end of the models.py for the import of this module
 
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from hs_core.signals import pre_metadata_element_create, pre_metadata_element_update
-from hs_core.models import GenericResource
+from hs_core.models import GenericResource, Title, Description, Subject, Creator, \
+    update_resource_search_vector
 from forms import SubjectsForm, AbstractValidationForm, CreatorValidationForm, \
     ContributorValidationForm, RelationValidationForm, SourceValidationForm, RightsValidationForm, \
     LanguageValidationForm, ValidDateValidationForm, FundingAgencyValidationForm, \
@@ -116,3 +118,12 @@ def metadata_element_pre_update_handler(sender, **kwargs):
     else:
         # TODO: need to return form errors
         return {'is_valid': False, 'element_data_dict': None}
+
+
+# The full text search vector of a resource covers its title, abstract, keywords and creators
+@receiver([post_save, post_delete], sender=Title)
+@receiver([post_save, post_delete], sender=Description)
+@receiver([post_save, post_delete], sender=Subject)
+@receiver([post_save, post_delete], sender=Creator)
+def search_vector_element_handler(sender, instance, **kwargs):
+    update_resource_search_vector(instance.content_type_id, instance.object_id)
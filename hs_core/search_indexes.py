@@ -1,12 +1,87 @@
 from haystack import indexes
 from hs_core.models import BaseResource
+from hs_access_control.models import PrivilegeCodes, UserResourceEffectivePrivilege
 from hs_geographic_feature_resource.models import GeographicFeatureMetaData
 from hs_app_netCDF.models import NetcdfMetaData
 from ref_ts.models import RefTSMetadata
 from hs_app_timeseries.models import TimeSeriesMetaData
-from django.db.models import Q
+from django.db.models import Q, Prefetch
+from django.db.models.query import QuerySet, prefetch_related_objects
 from datetime import datetime
 
+# metadata relations read by BaseResourceIndex, for all metadata types and for specific ones
+CORE_METADATA_RELATIONS = ['_title', '_description', '_language', '_publisher', 'creators',
+                           'contributors', 'subjects', 'coverages', 'formats', 'identifiers',
+                           'sources', 'relations']
+METADATA_RELATIONS = {
+    NetcdfMetaData: ['variables'],
+    RefTSMetadata: ['variables', 'sites', 'methods', 'quality_levels', 'datasources'],
+    TimeSeriesMetaData: ['_variables', '_sites', '_methods', '_time_series_results'],
+    GeographicFeatureMetaData: ['geometryinformation', 'fieldinformation'],
+}
+
+
+def prefetch_index_relations(resources):
+    """
+    Fetch everything BaseResourceIndex reads for a list of resources
+
+    :param resources: list of BaseResource objects, typically a batch of update_index
+
+    This costs a constant number of queries per batch: one for the users holding privilege,
+    and one per metadata relation for each metadata type present in the batch. Metadata
+    relations are prefetched separately for each type, because a generic relation can only
+    be prefetched for objects of a single content type.
+    """
+    prefetch_related_objects(resources, [
+        'content_object',
+        Prefetch('r2uep', queryset=UserResourceEffectivePrivilege.objects.select_related('user'))
+    ])
+    metadata_by_type = {}
+    for resource in resources:
+        if resource.content_object is not None:
+            metadata_by_type.setdefault(type(resource.content_object), [])\
+                .append(resource.content_object)
+    for metadata_type, metadata in metadata_by_type.items():
+        relations = list(CORE_METADATA_RELATIONS)
+        for indexed_type, type_relations in METADATA_RELATIONS.items():
+            if issubclass(metadata_type, indexed_type):
+                relations.extend(type_relations)
+        prefetch_related_objects(metadata, relations)
+
+
+class ResourceIndexQuerySet(QuerySet):
+    """
+    QuerySet of resources to be indexed, prefetching what BaseResourceIndex reads
+
+    update_index slices the index queryset into batches; each batch is fetched with
+    prefetch_index_relations, so that documents are built from objects in memory.
+    """
+
+    def iterator(self):
+        resources = list(super(ResourceIndexQuerySet, self).iterator())
+        prefetch_index_relations(resources)
+        for resource in resources:
+            yield resource
+
+
+def _first(related):
+    """ First object of a related manager, using prefetched objects when available """
+    for element in related.all():
+        return element
+    return None
+
+
+def _users_with_privilege(obj, privilege):
+    """
+    Active users holding at least privilege over a resource, from prefetched privileges
+
+    As with ResourceAccess.edit_users, nobody holds CHANGE over an immutable resource; its
+    owners are still listed as owners.
+    """
+    if privilege == PrivilegeCodes.CHANGE and obj.raccess.immutable:
+        return []
+    return [p.user for p in obj.r2uep.all() if p.privilege <= privilege and p.user.is_active]
+
 
 class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
     text = indexes.CharField(document=True, use_template=True)
@@ -78,25 +153,39 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
         return BaseResource
 
     def index_queryset(self, using=None):
-        return self.get_model().objects.filter(Q(raccess__discoverable=True) |
-                                               Q(raccess__public=True))
+        return ResourceIndexQuerySet(model=self.get_model())\
+            .filter(Q(raccess__discoverable=True) | Q(raccess__public=True))\
+            .select_related('raccess')
+
+    def update_object(self, instance, using=None, **kwargs):
+        # a single resource updated in real time gets the same prefetching as a batch
+        prefetch_index_relations([instance])
+        super(BaseResourceIndex, self).update_object(instance, using=using, **kwargs)
 
     def prepare_title(self, obj):
-        if hasattr(obj, 'metadata') and obj.metadata.title.value is not None:
-            return obj.metadata.title.value
+        metadata = obj.content_object
+        if metadata is not None and _first(metadata._title) is not None and \
+                _first(metadata._title).value is not None:
+            return _first(metadata._title).value
         else:
             return 'none'
 
     def prepare_abstract(self, obj):
-        if hasattr(obj, 'metadata') and obj.metadata.description is not None and \
-                        obj.metadata.description.abstract is not None:
-            return obj.metadata.description.abstract
+        metadata = obj.content_object
+        if metadata is not None and _first(metadata._description) is not None and \
+                _first(metadata._description).abstract is not None:
+            return _first(metadata._description).abstract
         else:
             return 'none'
 
     def prepare_author(self, obj):
-        if hasattr(obj, 'metadata'):
-            first_creator = obj.metadata.creators.filter(order=1).first()
+        metadata = obj.content_object
+        if metadata is not None:
+            first_creator = None
+            for creator in metadata.creators.all():
+                if creator.order == 1:
+                    first_creator = creator
+                    break
             if first_creator.name is not None:
                 return first_creator.name
             else:
@@ -105,31 +194,35 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
             return 'none'
 
     def prepare_creators(self, obj):
-        if hasattr(obj, 'metadata'):
-            return [creator.name for creator in obj.metadata.creators.all()
-                    .exclude(name__isnull=True)]
+        metadata = obj.content_object
+        if metadata is not None:
+            return [creator.name for creator in metadata.creators.all()
+                    if creator.name is not None]
         else:
             return []
 
     def prepare_contributors(self, obj):
-        if hasattr(obj, 'metadata'):
-            return [contributor.name for contributor in obj.metadata.contributors.all()
-                    .exclude(name__isnull=True)]
+        metadata = obj.content_object
+        if metadata is not None:
+            return [contributor.name for contributor in metadata.contributors.all()
+                    if contributor.name is not None]
         else:
             return []
 
     def prepare_subjects(self, obj):
-        if hasattr(obj, 'metadata'):
-            return [subject.value for subject in obj.metadata.subjects.all()
-                    .exclude(value__isnull=True)]
+        metadata = obj.content_object
+        if metadata is not None:
+            return [subject.value for subject in metadata.subjects.all()
+                    if subject.value is not None]
         else:
             return []
 
     def prepare_organizations(self, obj):
         organizations = []
         none = False  # only enter one value "none"
-        if hasattr(obj, 'metadata'):
-            for creator in obj.metadata.creators.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            for creator in metadata.creators.all():
                 if(creator.organization is not None):
                     organizations.append(creator.organization)
                 else:
@@ -139,8 +232,9 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
         return organizations
 
     def prepare_publisher(self, obj):
-        if hasattr(obj, 'metadata'):
-            publisher = obj.metadata.publisher
+        metadata = obj.content_object
+        if metadata is not None:
+            publisher = _first(metadata._publisher)
             if publisher is not None:
                 return publisher
             else:
@@ -149,9 +243,10 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
             return 'none'
 
     def prepare_author_emails(self, obj):
-        if hasattr(obj, 'metadata'):
-            return [creator.email for creator in obj.metadata.creators.all()
-                    .exclude(email__isnull=True)]
+        metadata = obj.content_object
+        if metadata is not None:
+            return [creator.email for creator in metadata.creators.all()
+                    if creator.email is not None]
         else:
             return []
 
@@ -183,27 +278,31 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
             return False
 
     def prepare_is_replaced_by(self, obj):
-        if hasattr(obj, 'metadata'):
-            return obj.metadata.relations.all().filter(type='isReplacedBy').exists()
+        metadata = obj.content_object
+        if metadata is not None:
+            return any(relation.type == 'isReplacedBy' for relation in metadata.relations.all())
         else:
             return False
 
     def prepare_coverages(self, obj):
         # TODO: reject empty coverages
-        if hasattr(obj, 'metadata'):
-            return [coverage._value for coverage in obj.metadata.coverages.all()]
+        metadata = obj.content_object
+        if metadata is not None:
+            return [coverage._value for coverage in metadata.coverages.all()]
         else:
             return []
 
     def prepare_coverage_types(self, obj):
-        if hasattr(obj, 'metadata'):
-            return [coverage.type for coverage in obj.metadata.coverages.all()]
+        metadata = obj.content_object
+        if metadata is not None:
+            return [coverage.type for coverage in metadata.coverages.all()]
         else:
             return []
 
     def prepare_coverage_east(self, obj):
-        if hasattr(obj, 'metadata'):
-            for coverage in obj.metadata.coverages.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            for coverage in metadata.coverages.all():
                 if coverage.type == 'point':
                     return float(coverage.value["east"])
                 elif coverage.type == 'box':
@@ -213,8 +312,9 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
             return 'none'
 
     def prepare_coverage_north(self, obj):
-        if hasattr(obj, 'metadata'):
-            for coverage in obj.metadata.coverages.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            for coverage in metadata.coverages.all():
                 if coverage.type == 'point':
                     return float(coverage.value["north"])
                 elif coverage.type == 'box':
@@ -224,40 +324,45 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
             return 'none'
 
     def prepare_coverage_northlimit(self, obj):
-        if hasattr(obj, 'metadata'):
-            for coverage in obj.metadata.coverages.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            for coverage in metadata.coverages.all():
                 if coverage.type == 'box':
                     return coverage.value["northlimit"]
         else:
             return 'none'
 
     def prepare_coverage_eastlimit(self, obj):
-        if hasattr(obj, 'metadata'):
-            for coverage in obj.metadata.coverages.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            for coverage in metadata.coverages.all():
                 if coverage.type == 'box':
                     return coverage.value["eastlimit"]
         else:
             return 'none'
 
     def prepare_coverage_southlimit(self, obj):
-        if hasattr(obj, 'metadata'):
-            for coverage in obj.metadata.coverages.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            for coverage in metadata.coverages.all():
                 if coverage.type == 'box':
                     return coverage.value["southlimit"]
         else:
             return 'none'
 
     def prepare_coverage_westlimit(self, obj):
-        if hasattr(obj, 'metadata'):
-            for coverage in obj.metadata.coverages.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            for coverage in metadata.coverages.all():
                 if coverage.type == 'box':
                     return coverage.value["westlimit"]
         else:
             return 'none'
 
     def prepare_coverage_start_date(self, obj):
-        if hasattr(obj, 'metadata'):
-            for coverage in obj.metadata.coverages.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            for coverage in metadata.coverages.all():
                 if coverage.type == 'period':
                     clean_date = coverage.value["start"][:10]
                     if "/" in clean_date:
@@ -272,8 +377,9 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
             return 'none'
 
     def prepare_coverage_end_date(self, obj):
-        if hasattr(obj, 'metadata'):
-            for coverage in obj.metadata.coverages.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            for coverage in metadata.coverages.all():
                 if coverage.type == 'period' and 'end' in coverage.value:
                     clean_date = coverage.value["end"][:10]
                     if "/" in clean_date:
@@ -288,32 +394,37 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
             return 'none'
 
     def prepare_formats(self, obj):
-        if hasattr(obj, 'metadata'):
-            return [format.value for format in obj.metadata.formats.all()]
+        metadata = obj.content_object
+        if metadata is not None:
+            return [format.value for format in metadata.formats.all()]
         else:
             return []
 
     def prepare_identifiers(self, obj):
-        if hasattr(obj, 'metadata'):
-            return [identifier.name for identifier in obj.metadata.identifiers.all()]
+        metadata = obj.content_object
+        if metadata is not None:
+            return [identifier.name for identifier in metadata.identifiers.all()]
         else:
             return []
 
     def prepare_language(self, obj):
-        if hasattr(obj, 'metadata'):
-            return obj.metadata.language.code
+        metadata = obj.content_object
+        if metadata is not None:
+            return _first(metadata._language).code
         else:
             return 'none'
 
     def prepare_sources(self, obj):
-        if hasattr(obj, 'metadata'):
-            return [source.derived_from for source in obj.metadata.sources.all()]
+        metadata = obj.content_object
+        if metadata is not None:
+            return [source.derived_from for source in metadata.sources.all()]
         else:
             return []
 
     def prepare_relations(self, obj):
-        if hasattr(obj, 'metadata'):
-            return [relation.value for relation in obj.metadata.relations.all()]
+        metadata = obj.content_object
+        if metadata is not None:
+            return [relation.value for relation in metadata.relations.all()]
         else:
             return []
 
@@ -328,68 +439,69 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
 
     def prepare_owners_logins(self, obj):
         if hasattr(obj, 'raccess'):
-            return [owner.username for owner in obj.raccess.owners.all()]
+            return [owner.username for owner in _users_with_privilege(obj, PrivilegeCodes.OWNER)]
         else:
             return []
 
     def prepare_owners_names(self, obj):
         names = []
         if hasattr(obj, 'raccess'):
-            for owner in obj.raccess.owners.all():
+            for owner in _users_with_privilege(obj, PrivilegeCodes.OWNER):
                 name = owner.first_name + ' ' + owner.last_name
                 names.append(name)
         return names
 
     def prepare_owners_count(self, obj):
         if hasattr(obj, 'raccess'):
-            return obj.raccess.owners.all().count()
+            return len(_users_with_privilege(obj, PrivilegeCodes.OWNER))
         else:
             return 0
 
     def prepare_viewers_logins(self, obj):
         if hasattr(obj, 'raccess'):
-            return [viewer.username for viewer in obj.raccess.view_users.all()]
+            return [viewer.username for viewer in _users_with_privilege(obj, PrivilegeCodes.VIEW)]
         else:
             return []
 
     def prepare_viewers_names(self, obj):
         names = []
         if hasattr(obj, 'raccess'):
-            for viewer in obj.raccess.view_users.all():
+            for viewer in _users_with_privilege(obj, PrivilegeCodes.VIEW):
                 name = viewer.first_name + ' ' + viewer.last_name
                 names.append(name)
         return names
 
     def prepare_viewers_count(self, obj):
         if hasattr(obj, 'raccess'):
-            return obj.raccess.view_users.all().count()
+            return len(_users_with_privilege(obj, PrivilegeCodes.VIEW))
         else:
             return 0
 
     def prepare_editors_logins(self, obj):
         if hasattr(obj, 'raccess'):
-            return [editor.username for editor in obj.raccess.edit_users.all()]
+            return [editor.username for editor in _users_with_privilege(obj, PrivilegeCodes.CHANGE)]
         else:
             return 0
 
     def prepare_editors_names(self, obj):
         names = []
         if hasattr(obj, 'raccess'):
-            for editor in obj.raccess.edit_users.all():
+            for editor in _users_with_privilege(obj, PrivilegeCodes.CHANGE):
                 name = editor.first_name + ' ' + editor.last_name
                 names.append(name)
         return names
 
     def prepare_editors_count(self, obj):
         if hasattr(obj, 'raccess'):
-            return obj.raccess.edit_users.all().count()
+            return len(_users_with_privilege(obj, PrivilegeCodes.CHANGE))
         else:
             return 0
 
     def prepare_geometry_type(self, obj):
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, GeographicFeatureMetaData):
-                geometry_info = obj.metadata.geometryinformation.all().first()
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, GeographicFeatureMetaData):
+                geometry_info = _first(metadata.geometryinformation)
                 if geometry_info is not None:
                     return geometry_info.geometryType
                 else:
@@ -400,9 +512,10 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
             return 'none'
 
     def prepare_field_name(self, obj):
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, GeographicFeatureMetaData):
-                field_info = obj.metadata.fieldinformation.all().first()
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, GeographicFeatureMetaData):
+                field_info = _first(metadata.fieldinformation)
                 if field_info is not None:
                     return field_info.fieldName
                 else:
@@ -413,9 +526,10 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
             return 'none'
 
     def prepare_field_type(self, obj):
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, GeographicFeatureMetaData):
-                field_info = obj.metadata.fieldinformation.all().first()
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, GeographicFeatureMetaData):
+                field_info = _first(metadata.fieldinformation)
                 if field_info is not None:
                     return field_info.fieldType
                 else:
@@ -426,9 +540,10 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
             return 'none'
 
     def prepare_field_type_code(self, obj):
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, GeographicFeatureMetaData):
-                field_info = obj.metadata.fieldinformation.all().first()
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, GeographicFeatureMetaData):
+                field_info = _first(metadata.fieldinformation)
                 if field_info is not None:
                     return field_info.fieldTypeCode
                 else:
@@ -440,125 +555,138 @@ class BaseResourceIndex(indexes.SearchIndex, indexes.Indexable):
 
     def prepare_variable_names(self, obj):
         variable_names = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, NetcdfMetaData):
-                for variable in obj.metadata.variables.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, NetcdfMetaData):
+                for variable in metadata.variables.all():
                     variable_names.append(variable.name)
-            elif isinstance(obj.metadata, RefTSMetadata):
-                for variable in obj.metadata.variables.all():
+            elif isinstance(metadata, RefTSMetadata):
+                for variable in metadata.variables.all():
                     variable_names.append(variable.name)
-            elif isinstance(obj.metadata, TimeSeriesMetaData):
-                for variable in obj.metadata.variables:
+            elif isinstance(metadata, TimeSeriesMetaData):
+                for variable in metadata.variables:
                     variable_names.append(variable.variable_name)
         return variable_names
 
     def prepare_variable_types(self, obj):
         variable_types = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, NetcdfMetaData):
-                for variable in obj.metadata.variables.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, NetcdfMetaData):
+                for variable in metadata.variables.all():
                     variable_types.append(variable.type)
-            elif isinstance(obj.metadata, RefTSMetadata):
-                for variable in obj.metadata.variables.all():
+            elif isinstance(metadata, RefTSMetadata):
+                for variable in metadata.variables.all():
                     variable_types.append(variable.data_type)
-            elif isinstance(obj.metadata, TimeSeriesMetaData):
-                for variable in obj.metadata.variables:
+            elif isinstance(metadata, TimeSeriesMetaData):
+                for variable in metadata.variables:
                     variable_types.append(variable.variable_type)
         return variable_types
 
     def prepare_variable_shapes(self, obj):
         variable_shapes = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, NetcdfMetaData):
-                for variable in obj.metadata.variables.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, NetcdfMetaData):
+                for variable in metadata.variables.all():
                     variable_shapes.append(variable.shape)
         return variable_shapes
 
     def prepare_variable_descriptive_names(self, obj):
         variable_descriptive_names = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, NetcdfMetaData):
-                for variable in obj.metadata.variables.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, NetcdfMetaData):
+                for variable in metadata.variables.all():
                     variable_descriptive_names.append(variable.descriptive_name)
         return variable_descriptive_names
 
     def prepare_variable_speciations(self, obj):
         variable_speciations = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, TimeSeriesMetaData):
-                for variable in obj.metadata.variables:
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, TimeSeriesMetaData):
+                for variable in metadata.variables:
                     variable_speciations.append(variable.speciation)
         return variable_speciations
 
     def prepare_sites(self, obj):
         sites = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, RefTSMetadata):
-                for site in obj.metadata.sites.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, RefTSMetadata):
+                for site in metadata.sites.all():
                     sites.append(site.name)
-            elif isinstance(obj.metadata, TimeSeriesMetaData):
-                for site in obj.metadata.sites:
+            elif isinstance(metadata, TimeSeriesMetaData):
+                for site in metadata.sites:
                     sites.append(site.site_name)
         return sites
 
     def prepare_methods(self, obj):
         methods = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, RefTSMetadata):
-                for method in obj.metadata.methods.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, RefTSMetadata):
+                for method in metadata.methods.all():
                     methods.append(method.description)
-            elif isinstance(obj.metadata, TimeSeriesMetaData):
-                for method in obj.metadata.methods:
+            elif isinstance(metadata, TimeSeriesMetaData):
+                for method in metadata.methods:
                     methods.append(method.method_description)
         return methods
 
     def prepare_quality_levels(self, obj):
         quality_levels = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, RefTSMetadata):
-                for quality_level in obj.metadata.quality_levels.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, RefTSMetadata):
+                for quality_level in metadata.quality_levels.all():
                     quality_levels.append(quality_level.code)
         return quality_levels
 
     def prepare_data_sources(self, obj):
         data_sources = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, RefTSMetadata):
-                for data_source in obj.metadata.datasources.all():
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, RefTSMetadata):
+                for data_source in metadata.datasources.all():
                     data_sources.append(data_source.code)
         return data_sources
 
     def prepare_sample_mediums(self, obj):
         sample_mediums = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, TimeSeriesMetaData):
-                for time_series_result in obj.metadata.time_series_results:
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, TimeSeriesMetaData):
+                for time_series_result in metadata.time_series_results:
                     sample_mediums.append(time_series_result.sample_medium)
-            elif isinstance(obj.metadata, RefTSMetadata):
-                for variable in obj.metadata.variables.all():
+            elif isinstance(metadata, RefTSMetadata):
+                for variable in metadata.variables.all():
                     sample_mediums.append(variable.sample_medium)
         return sample_mediums
 
     def prepare_units_names(self, obj):
         units_names = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, TimeSeriesMetaData):
-                for time_series_result in obj.metadata.time_series_results:
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, TimeSeriesMetaData):
+                for time_series_result in metadata.time_series_results:
                     units_names.append(time_series_result.units_name)
         return units_names
 
     def prepare_units_types(self, obj):
         units_types = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, TimeSeriesMetaData):
-                for time_series_result in obj.metadata.time_series_results:
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, TimeSeriesMetaData):
+                for time_series_result in metadata.time_series_results:
                     units_types.append(time_series_result.units_type)
         return units_types
 
     def prepare_aggregation_statistics(self, obj):
         aggregation_statistics = []
-        if hasattr(obj, 'metadata'):
-            if isinstance(obj.metadata, TimeSeriesMetaData):
-                for time_series_result in obj.metadata.time_series_results:
+        metadata = obj.content_object
+        if metadata is not None:
+            if isinstance(metadata, TimeSeriesMetaData):
+                for time_series_result in metadata.time_series_results:
                     aggregation_statistics.append(time_series_result.aggregation_statistics)
         return aggregation_statistics
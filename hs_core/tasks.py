@@ -3,7 +3,6 @@ from __future__ import absolute_import
 import os
 import sys
 import traceback
-import zipfile
 import logging
 
 import requests
@@ -21,7 +20,8 @@ from celery import shared_task
 
 from hs_core.models import BaseResource
 from hs_core.hydroshare import utils
-from hs_core.hydroshare.hs_bagit import create_bag_files
+from hs_core.hydroshare.hs_bagit import create_bag_files, update_bag_manifests, \
+    record_bag_state
 from hs_core.hydroshare.resource import get_activated_doi, get_resource_doi, \
     get_crossref_url, deposit_res_metadata_with_crossref
 
@@ -107,24 +107,19 @@ def check_doi_activation():
 
 @shared_task
 def add_zip_file_contents_to_resource(pk, zip_file_path):
-    zfile = None
     resource = None
     try:
         resource = utils.get_resource_by_shortkey(pk, or_404=False)
-        zfile = zipfile.ZipFile(zip_file_path)
-        num_files = len(zfile.infolist())
-        zcontents = utils.ZipContents(zfile)
-        files = zcontents.get_files()
 
         resource.file_unpack_status = 'Running'
         resource.save()
 
-        for i, f in enumerate(files):
-            logger.debug("Adding file {0} to resource {1}".format(f.name, pk))
-            utils.add_file_to_resource(resource, f)
+        def report_progress(num_imported, num_files):
             resource.file_unpack_message = "Imported {0} of about {1} file(s) ...".format(
-                i, num_files)
-            resource.save()
+                num_imported, num_files)
+            resource.save(update_fields=['file_unpack_message'])
+
+        utils.add_zip_members_to_resource(resource, zip_file_path, progress=report_progress)
 
         # Call success callback
         resource.file_unpack_message = None
@@ -142,9 +137,6 @@ def add_zip_file_contents_to_resource(pk, zip_file_path):
             resource.file_unpack_message = exc_info
             resource.save()
 
-        if zfile:
-            zfile.close()
-
         logger.error(exc_info)
     finally:
         # Delete upload file
@@ -157,6 +149,10 @@ def create_bag_by_irods(resource_id):
     create a resource bag on iRODS side by running the bagit rule followed by ibun zipping
     operation. This function runs as a celery task, invoked asynchronously so that it does not
     block the main web thread when it creates bags for very large files which will take some time.
+
+    When a previous build recorded the state of the bag payload, the bagit manifests are
+    updated incrementally instead: only files whose size or modification time changed are
+    checksummed, and if nothing in the payload changed and the bag exists, zipping is skipped.
     :param
     resource_id: the resource uuid that is used to look for the resource to create the bag for.
 
@@ -235,8 +231,12 @@ def create_bag_by_irods(resource_id):
             # for now as a workaround which could be raised from potential race conditions when
             # multiple ibun commands try to create the same zip file or the very same resource
             # gets deleted by another request when being downloaded
-            istorage.runBagitRule(bagit_rule_file, bagit_input_path, bagit_input_resource)
-            istorage.zipup(irods_bagit_input_path, bag_full_name)
+            changed = update_bag_manifests(res, istorage)
+            if changed is None:
+                istorage.runBagitRule(bagit_rule_file, bagit_input_path, bagit_input_resource)
+                record_bag_state(res, istorage)
+            if changed or changed is None or not istorage.exists(bag_full_name):
+                istorage.zipup(irods_bagit_input_path, bag_full_name)
             istorage.setAVU(irods_bagit_input_path, 'bag_modified', "false")
             return True
         except SessionException as ex:
@@ -250,3 +250,20 @@ def create_bag_by_irods(resource_id):
     else:
         logger.error('Resource does not exist.')
         return False
+
+
+@shared_task(ignore_result=True)
+def update_resource_index(resource_id):
+    """
+    Reindex a resource queued by the real time signal processor.
+
+    While the resource keeps being saved, the task reschedules itself, so that a burst of saves
+    results in a single reindexing.
+    :param
+    resource_id: primary key of the BaseResource to reindex.
+    """
+    from hs_core.hydro_realtime_signal_processor import process_index_update
+
+    wait = process_index_update(resource_id)
+    if wait is not None:
+        update_resource_index.apply_async((resource_id,), countdown=wait)
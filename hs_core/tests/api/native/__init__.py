@@ -26,4 +26,5 @@ from test_update_metadata import *
 from test_update_resource_file import *
 from test_user_from_id import *
 from test_utils import *
+from test_zipstream import *
 
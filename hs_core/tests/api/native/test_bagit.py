@@ -1,5 +1,5 @@
 from django.contrib.auth.models import Group, User
-from django.test import TestCase
+from django.test import TestCase, SimpleTestCase
 
 from hs_core import hydroshare
 from hs_core.hydroshare import hs_bagit
@@ -66,3 +66,35 @@ class TestBagIt(TestCase):
         hs_bagit.delete_files_and_bag(self.test_res)
         # resource should not have any bags
         self.assertEquals(self.test_res.bags.count(), 0)
+
+
+class TestBagManifests(SimpleTestCase):
+    def test_parse_and_render_manifest(self):
+        content = "d41d8cd98f00b204e9800998ecf8427e    data/contents/my file.txt\n" \
+                  "0cc175b9c0f1b6a831c399e269772661    data/resourcemap.xml\n"
+        checksums = hs_bagit.parse_bagit_manifest(content)
+        self.assertEquals(checksums['data/contents/my file.txt'],
+                          'd41d8cd98f00b204e9800998ecf8427e')
+        self.assertEquals(checksums['data/resourcemap.xml'], '0cc175b9c0f1b6a831c399e269772661')
+        # rendering sorts by path and round trips through parsing
+        rendered = hs_bagit.render_bagit_manifest(checksums)
+        self.assertTrue(rendered.startswith('d41d8cd98f00b204e9800998ecf8427e'))
+        self.assertEquals(hs_bagit.parse_bagit_manifest(rendered), checksums)
+
+    def test_diff_bag_state(self):
+        previous_state = {'data/contents/a.txt': ['aaa', 10, 1000],
+                          'data/contents/b.txt': ['bbb', 20, 1000],
+                          'data/contents/c.txt': ['ccc', 30, 1000]}
+        listing = {'data/contents/a.txt': (10, 1000),   # unchanged
+                   'data/contents/b.txt': (20, 2000),   # touched
+                   'data/contents/d.txt': (40, 2000)}   # added; c.txt was removed
+        checksums, changed = hs_bagit.diff_bag_state(previous_state, listing)
+        self.assertEquals(checksums, {'data/contents/a.txt': 'aaa'})
+        self.assertEquals(changed, ['data/contents/b.txt', 'data/contents/c.txt',
+                                    'data/contents/d.txt'])
+
+        # nothing changed
+        checksums, changed = hs_bagit.diff_bag_state(previous_state, {
+            path: (size, modified) for path, (_, size, modified) in previous_state.items()})
+        self.assertEquals(len(checksums), 3)
+        self.assertEquals(changed, [])
@@ -166,6 +166,10 @@ class TestCopyResource(TestCase):
                           msg='resource content path is not created correctly '
                               'for new copied resource')
 
+        # test the system metadata of the copied files is cached when they are registered
+        self.assertEqual(sorted(f._size for f in new_res_generic.files.all()),
+                         sorted(f.size for f in self.res_generic.files.all()))
+
         # test key/value metadata copied over
         self.assertEqual(new_res_generic.extra_metadata, self.res_generic.extra_metadata)
         # test science metadata elements are copied from the original resource to the new copied
@@ -0,0 +1,71 @@
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+from unittest import skipIf
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.test import TestCase, override_settings
+
+from hs_core import hydroshare
+from hs_core.hydroshare.file_cache import cached_irods_file, get_file_cache_metrics
+from hs_core.testing import MockIRODSTestCaseMixin
+
+
+@skipIf(getattr(settings, 'REDIS_CONNECTION', None) is None, "the file cache needs Redis")
+@override_settings(HS_FILE_CACHE_SIZE=1024 ** 2)
+class TestFileCache(MockIRODSTestCaseMixin, TestCase):
+    def setUp(self):
+        super(TestFileCache, self).setUp()
+        self.group, _ = Group.objects.get_or_create(name='Resource Author')
+        self.user = hydroshare.create_account(
+            'cache@gmail.com',
+            username='cache',
+            first_name='File',
+            last_name='Cache',
+            superuser=False,
+            groups=[]
+        )
+        self.res = hydroshare.create_resource(
+            resource_type='GenericResource',
+            owner=self.user,
+            title='Cached file resource',
+            metadata=[],
+        )
+        self.temp_dir = tempfile.mkdtemp()
+        file_path = os.path.join(self.temp_dir, 'cached.txt')
+        with open(file_path, 'w') as f:
+            f.write('cached content')
+        with open(file_path, 'r') as f:
+            hydroshare.add_resource_files(self.res.short_id, f)
+        self.res_file = self.res.files.first()
+
+    def tearDown(self):
+        super(TestFileCache, self).tearDown()
+        shutil.rmtree(self.temp_dir)
+        self.res.delete()
+
+    def test_hits_and_misses(self):
+        before = get_file_cache_metrics()
+        first_copy = hydroshare.utils.get_file_from_irods(self.res_file)
+        second_copy = hydroshare.utils.get_file_from_irods(self.res_file)
+        after = get_file_cache_metrics()
+        self.assertEqual(after['misses'], before['misses'] + 1)
+        self.assertEqual(after['hits'], before['hits'] + 1)
+
+        # every caller gets a private copy of the cached file
+        self.assertNotEqual(first_copy, second_copy)
+        for copy in (first_copy, second_copy):
+            with open(copy) as f:
+                self.assertEqual(f.read(), 'cached content')
+            shutil.rmtree(os.path.dirname(copy))
+
+    def test_eviction(self):
+        with override_settings(HS_FILE_CACHE_SIZE=1):
+            with cached_irods_file(self.res_file) as cache_file:
+                with cached_irods_file(self.res_file) as same_file:
+                    self.assertEqual(cache_file, same_file)
+                # the file is in use, so it is not evicted although the cache is too large
+                self.assertTrue(os.path.exists(cache_file))
+            self.assertFalse(os.path.exists(cache_file))
@@ -0,0 +1,95 @@
+from unittest import skipIf
+
+import mock
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.test import TestCase, override_settings
+
+from hs_core import hydroshare
+from hs_core.hydro_realtime_signal_processor import INDEX_QUEUE_KEY, INDEX_QUEUE_FIRST_KEY, \
+    INDEX_QUEUE_LAST_KEY
+from hs_core.tasks import update_resource_index
+from hs_core.testing import MockIRODSTestCaseMixin
+
+
+@skipIf(getattr(settings, 'REDIS_CONNECTION', None) is None, "the index queue needs Redis")
+@override_settings(HS_INDEX_UPDATE_DELAY=5, CELERY_ALWAYS_EAGER=False)
+class TestIndexUpdateQueue(MockIRODSTestCaseMixin, TestCase):
+    def setUp(self):
+        super(TestIndexUpdateQueue, self).setUp()
+        self.group, _ = Group.objects.get_or_create(name='Resource Author')
+        self.user = hydroshare.create_account(
+            'queue@gmail.com',
+            username='queue',
+            first_name='Index',
+            last_name='Queue',
+            superuser=False,
+            groups=[]
+        )
+        index_patcher = mock.patch('hs_core.hydro_realtime_signal_processor.index_resource')
+        self.index_resource = index_patcher.start()
+        self.addCleanup(index_patcher.stop)
+        task_patcher = mock.patch.object(update_resource_index, 'apply_async')
+        self.apply_async = task_patcher.start()
+        self.addCleanup(task_patcher.stop)
+        time_patcher = mock.patch('hs_core.hydro_realtime_signal_processor.time')
+        self.time = time_patcher.start()
+        self.addCleanup(time_patcher.stop)
+        self.time.time.return_value = 100.0
+
+        self.res = hydroshare.create_resource(
+            resource_type='GenericResource',
+            owner=self.user,
+            title='Queued resource',
+            metadata=[],
+        )
+        # making the resource public indexes it at once
+        with override_settings(HS_INDEX_UPDATE_DELAY=0):
+            self.res.raccess.public = True
+            self.res.raccess.save()
+        self.index_resource.reset_mock()
+        self.apply_async.reset_mock()
+
+    def tearDown(self):
+        super(TestIndexUpdateQueue, self).tearDown()
+        redis = settings.REDIS_CONNECTION
+        redis.srem(INDEX_QUEUE_KEY, self.res.pk)
+        redis.delete(INDEX_QUEUE_FIRST_KEY.format(self.res.pk),
+                     INDEX_QUEUE_LAST_KEY.format(self.res.pk))
+        self.res.delete()
+
+    def test_saves_queue_one_update(self):
+        for _ in range(3):
+            self.res.save()
+        self.apply_async.assert_called_once_with((self.res.pk,), countdown=5)
+        self.assertFalse(self.index_resource.called)
+        self.assertTrue(settings.REDIS_CONNECTION.sismember(INDEX_QUEUE_KEY, self.res.pk))
+
+    def test_update_rescheduled_while_saved(self):
+        self.res.save()
+        self.apply_async.reset_mock()
+        self.time.time.return_value = 103.0
+        self.res.save()
+        self.assertFalse(self.apply_async.called)
+
+        # the latest save was two seconds ago, so the task waits three more seconds
+        self.time.time.return_value = 105.0
+        update_resource_index(self.res.pk)
+        self.apply_async.assert_called_once_with((self.res.pk,), countdown=3.0)
+        self.assertFalse(self.index_resource.called)
+
+        self.apply_async.reset_mock()
+        self.time.time.return_value = 108.0
+        update_resource_index(self.res.pk)
+        self.assertFalse(self.apply_async.called)
+        self.assertEqual(self.index_resource.call_count, 1)
+        self.assertEqual(self.index_resource.call_args[0][0].pk, self.res.pk)
+        self.assertFalse(settings.REDIS_CONNECTION.sismember(INDEX_QUEUE_KEY, self.res.pk))
+
+    def test_no_delay_indexes_synchronously(self):
+        with override_settings(HS_INDEX_UPDATE_DELAY=0):
+            self.res.save()
+        self.assertFalse(self.apply_async.called)
+        self.assertEqual(self.index_resource.call_count, 1)
+        self.assertEqual(self.index_resource.call_args[0][0].pk, self.res.pk)
@@ -8,6 +8,7 @@ from hs_core import hydroshare
 from hs_core.testing import MockIRODSTestCaseMixin, TestCaseCommonUtilities
 
 from hs_core.models import ResourceFile, get_path
+from hs_core.hydroshare.utils import list_irods_collection
 
 
 class TestResourceFileAPI(MockIRODSTestCaseMixin,
@@ -319,3 +320,65 @@ class TestResourceFileAPI(MockIRODSTestCaseMixin,
 
         # delete resources to clean up
         hydroshare.delete_resource(self.res.short_id)
+
+    def test_cached_size(self):
+        """ file size is cached when a file is added and summed by the resource """
+        hydroshare.add_resource_files(self.res.short_id, self.test_file_1)
+        resfile = self.res.files.all()[0]
+        expected_size = len("Test text file in file1.txt")
+
+        # size and modification time were recorded when the file was created
+        self.assertEqual(resfile._size, expected_size)
+        self.assertIsNotNone(resfile.modified_time)
+        self.assertEqual(resfile.size, expected_size)
+        self.assertEqual(self.res.size, expected_size)
+
+        # a record that predates the cache gets its size from iRODS on first use
+        ResourceFile.objects.filter(pk=resfile.pk).update(_size=-1)
+        resfile = ResourceFile.objects.get(pk=resfile.pk)
+        self.assertEqual(resfile.size, expected_size)
+        self.assertEqual(ResourceFile.objects.get(pk=resfile.pk)._size, expected_size)
+
+        # a stale cached size is reported and repaired by check_irods_files
+        ResourceFile.objects.filter(pk=resfile.pk).update(_size=1)
+        _, ecount = self.res.check_irods_files(log_errors=False, sync_sizes=True)
+        self.assertEqual(ecount, 1)
+        self.assertEqual(ResourceFile.objects.get(pk=resfile.pk)._size, expected_size)
+        _, ecount = self.res.check_irods_files(log_errors=False)
+        self.assertEqual(ecount, 0)
+
+        # delete resources to clean up
+        hydroshare.delete_resource(self.res.short_id)
+
+    def test_cached_size_in_quoted_folder(self):
+        """ files in folders whose names cannot be quoted in an iCAT query are still listed """
+        ResourceFile.create_folder(self.res, "it's")
+        hydroshare.add_resource_files(self.res.short_id, self.test_file_1, folder="it's")
+        resfile = self.res.files.all()[0]
+        expected_size = len("Test text file in file1.txt")
+
+        self.assertEqual(resfile.short_path, "it's/file1.txt")
+        self.assertEqual(resfile._size, expected_size)
+        self.assertEqual(self.res.size, expected_size)
+
+        istorage = self.res.get_irods_storage()
+        listing = list_irods_collection(istorage, self.res.file_path)
+        self.assertEqual([(obj.path, obj.size) for obj in listing],
+                         [("it's/file1.txt", expected_size)])
+        listing = list_irods_collection(istorage, os.path.join(self.res.file_path, "it's"),
+                                        recursive=False)
+        self.assertEqual([obj.path for obj in listing], ['file1.txt'])
+
+    def test_listing_with_like_wildcards(self):
+        """ a recursive listing does not include sibling folders matched by LIKE wildcards """
+        for folder in ('a_b', 'a_b/sub', 'aXb'):
+            ResourceFile.create_folder(self.res, folder)
+            with open(self.test_file_name1, 'r') as test_file:
+                hydroshare.add_resource_files(self.res.short_id, test_file, folder=folder)
+
+        istorage = self.res.get_irods_storage()
+        listing = list_irods_collection(istorage, os.path.join(self.res.file_path, 'a_b'))
+        self.assertEqual(sorted(obj.path for obj in listing), ['file1.txt', 'sub/file1.txt'])
+
+        # delete resources to clean up
+        hydroshare.delete_resource(self.res.short_id)
@@ -0,0 +1,62 @@
+from django.contrib.auth.models import Group
+from django.test import TestCase
+
+from hs_access_control.models import PrivilegeCodes
+from hs_core import hydroshare
+from hs_core.search_indexes import BaseResourceIndex
+from hs_core.testing import MockIRODSTestCaseMixin
+
+
+class TestBaseResourceIndex(MockIRODSTestCaseMixin, TestCase):
+    def setUp(self):
+        super(TestBaseResourceIndex, self).setUp()
+        self.group, _ = Group.objects.get_or_create(name='Resource Author')
+        self.owner = hydroshare.create_account(
+            'owner@nowhere.com',
+            username='owner',
+            first_name='Owner_FirstName',
+            last_name='Owner_LastName',
+            superuser=False,
+            groups=[]
+        )
+        self.editor = hydroshare.create_account(
+            'editor@nowhere.com',
+            username='editor',
+            first_name='Editor_FirstName',
+            last_name='Editor_LastName',
+            superuser=False,
+            groups=[]
+        )
+        self.res = hydroshare.create_resource(
+            'GenericResource',
+            self.owner,
+            'indexed resource',
+        )
+        self.owner.uaccess.share_resource_with_user(self.res, self.editor,
+                                                    PrivilegeCodes.CHANGE)
+        self.index = BaseResourceIndex()
+
+    def test_owners_and_editors(self):
+        self.assertEqual(self.index.prepare_owners_logins(self.res), ['owner'])
+        self.assertEqual(self.index.prepare_owners_names(self.res),
+                         ['Owner_FirstName Owner_LastName'])
+        self.assertEqual(self.index.prepare_owners_count(self.res), 1)
+        self.assertEqual(sorted(self.index.prepare_editors_logins(self.res)),
+                         ['editor', 'owner'])
+        self.assertEqual(sorted(self.index.prepare_viewers_logins(self.res)),
+                         ['editor', 'owner'])
+
+    def test_published_resource_owners(self):
+        self.res.raccess.published = True
+        self.res.raccess.immutable = True
+        self.res.raccess.save()
+
+        # owners of a published resource are still indexed; nobody can edit it
+        self.assertEqual(self.index.prepare_owners_logins(self.res), ['owner'])
+        self.assertEqual(self.index.prepare_owners_names(self.res),
+                         ['Owner_FirstName Owner_LastName'])
+        self.assertEqual(self.index.prepare_owners_count(self.res), 1)
+        self.assertEqual(self.index.prepare_editors_logins(self.res), [])
+        self.assertEqual(self.index.prepare_editors_count(self.res), 0)
+        self.assertEqual(sorted(self.index.prepare_viewers_logins(self.res)),
+                         ['editor', 'owner'])
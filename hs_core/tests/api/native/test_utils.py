@@ -1,5 +1,10 @@
+import os
+import tempfile
+import zipfile
+
 from django.contrib.auth.models import Group
 from django.contrib.sites.models import Site
+from django.core.exceptions import ValidationError
 from django.test import TestCase
 
 from mezzanine.conf import settings
@@ -121,3 +126,34 @@ class TestUtils(MockIRODSTestCaseMixin, TestCase):
         modified_date2 = self.res.metadata.dates.filter(type='modified').first()
         self.assertTrue((modified_date2.start_date - modified_date1.start_date).total_seconds() > 0)
         self.assertEquals(self.res.last_changed_by, self.user2)
+
+    def test_add_zip_members_to_resource(self):
+        zip_file_path = tempfile.mktemp(suffix='.zip')
+        with zipfile.ZipFile(zip_file_path, 'w') as zfile:
+            zfile.writestr('readme.txt', 'read me')
+            zfile.writestr('data/values.csv', 'a,b\n1,2\n')
+            zfile.writestr('__MACOSX/data/._values.csv', '')
+            zfile.writestr('data/.DS_Store', '')
+        progress = []
+        try:
+            res_files = utils.add_zip_members_to_resource(
+                self.res, zip_file_path, progress=lambda *args: progress.append(args),
+                progress_interval=0)
+
+            # files already in the resource are not overwritten, and nothing is added
+            with zipfile.ZipFile(zip_file_path, 'a') as zfile:
+                zfile.writestr('other.txt', 'other')
+            with self.assertRaises(ValidationError):
+                utils.add_zip_members_to_resource(self.res, zip_file_path)
+        finally:
+            os.remove(zip_file_path)
+
+        self.assertEqual(sorted(f.short_path for f in res_files),
+                         ['data/values.csv', 'readme.txt'])
+        self.assertEqual(self.res.files.count(), 2)
+        self.assertEqual(sorted(f.size for f in res_files), [7, 8])
+        self.assertEqual(sorted(f.size for f in self.res.files.all()), [7, 8])
+        self.assertEqual(progress[-1], (2, 2))
+        formats = self.res.metadata.formats.values_list('value', flat=True)
+        self.assertIn('text/plain', formats)
+        self.assertIn('text/csv', formats)
@@ -0,0 +1,54 @@
+import os
+import zipfile
+from cStringIO import StringIO
+
+from django.test import SimpleTestCase
+
+from hs_core.hydroshare.zipstream import ZipStream, ZipStreamException
+from hs_core.views.utils import parse_byte_range
+
+
+class TestZipStream(SimpleTestCase):
+    def _build(self, compression):
+        zstream = ZipStream(compression)
+        content = os.urandom(64 * 1024) + 'x' * (256 * 1024)
+        chunks = []
+        chunks.extend(zstream.write_str('abc/bagit.txt', 'BagIt-Version: 0.96\n'))
+        # member of known size, fed in several chunks
+        chunks.extend(zstream.write_iter('abc/data/contents/big.bin',
+                                         [content[:1000], content[1000:]], size=len(content)))
+        # member of unknown size is written with ZIP64 sizes
+        chunks.extend(zstream.write_iter(u'abc/data/contents/caf\xe9.txt', iter(['a', 'b'])))
+        chunks.extend(zstream.close())
+        archive = ''.join(chunks)
+        self.assertEqual(len(archive), zstream.bytes_written)
+        return archive, content
+
+    def test_archive_is_readable(self):
+        for compression in (zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED):
+            archive, content = self._build(compression)
+            zfile = zipfile.ZipFile(StringIO(archive))
+            self.assertIsNone(zfile.testzip())
+            self.assertEqual(zfile.namelist(), ['abc/bagit.txt', 'abc/data/contents/big.bin',
+                                                u'abc/data/contents/caf\xe9.txt'])
+            self.assertEqual(zfile.read('abc/data/contents/big.bin'), content)
+            self.assertEqual(zfile.read(u'abc/data/contents/caf\xe9.txt'), 'ab')
+
+    def test_closed_archive(self):
+        zstream = ZipStream()
+        list(zstream.close())
+        with self.assertRaises(ZipStreamException):
+            list(zstream.write_str('late.txt', 'too late'))
+        with self.assertRaises(ZipStreamException):
+            list(zstream.close())
+
+    def test_parse_byte_range(self):
+        self.assertIsNone(parse_byte_range(None, 1000))
+        self.assertIsNone(parse_byte_range('items=0-10', 1000))
+        self.assertIsNone(parse_byte_range('bytes=0-10,20-30', 1000))
+        self.assertEqual(parse_byte_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_byte_range('bytes=500-', 1000), (500, 999))
+        self.assertEqual(parse_byte_range('bytes=900-2000', 1000), (900, 999))
+        self.assertEqual(parse_byte_range('bytes=-100', 1000), (900, 999))
+        with self.assertRaises(ValueError):
+            parse_byte_range('bytes=1000-', 1000)
@@ -1,9 +1,11 @@
 import json
 import os
 
+from mock import patch
 from rest_framework import status
 
 from hs_core.hydroshare import resource
+from hs_core.views.pagination import ResourceListPagination
 from .base import HSRESTTestCase
 
 
@@ -37,6 +39,33 @@ class TestResourceList(HSRESTTestCase):
         self.assertEqual(content['count'], 1)
         self.assertEqual(content['results'][0]['resource_id'], pid)
 
+    def test_resource_list_by_cursor(self):
+        pids = set()
+        for title in ('Resource 1', 'Resource 2', 'Resource 3'):
+            new_res = resource.create_resource('GenericResource', self.user, title)
+            pids.add(new_res.short_id)
+            self.resources_to_delete.append(new_res.short_id)
+
+        with patch.object(ResourceListPagination, 'page_size', 2):
+            response = self.client.get('/hsapi/resource/', {'cursor': ''}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            content = json.loads(response.content)
+            self.assertNotIn('count', content)
+            self.assertEqual(len(content['results']), 2)
+            listed = [item['resource_id'] for item in content['results']]
+
+            response = self.client.get(content['next'], format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            content = json.loads(response.content)
+            self.assertEqual(len(content['results']), 1)
+            self.assertIsNone(content['next'])
+            listed += [item['resource_id'] for item in content['results']]
+
+        self.assertEqual(set(listed), pids)
+
+        response = self.client.get('/hsapi/resource/', {'cursor': 'bad'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_DEPRECATED_resource_list_by_type(self):
 
         gen_res = resource.create_resource('GenericResource',
@@ -210,6 +239,36 @@ class TestResourceList(HSRESTTestCase):
         content = json.loads(response.content)
         self.assertEqual(content['count'], 2)
 
+    def test_resource_list_by_full_text_search(self):
+        gen_res_one = resource.create_resource('GenericResource', self.user,
+                                               'Streamflow in mountain rivers')
+        gen_res_two = resource.create_resource('GenericResource', self.user, 'Resource 2')
+
+        self.resources_to_delete.append(gen_res_one.short_id)
+        self.resources_to_delete.append(gen_res_two.short_id)
+
+        gen_res_two.metadata.create_element("subject", value="river")
+
+        # the resource matching in its title ranks above the one matching in a keyword
+        response = self.client.get('/hsapi/resource/', {'full_text_search': 'rivers'},
+                                   format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = json.loads(response.content)
+        self.assertEqual(content['count'], 2)
+        self.assertEqual(content['results'][0]['resource_id'], gen_res_one.short_id)
+
+        response = self.client.get('/hsapi/resource/', {'full_text_search': 'stream*'},
+                                   format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = json.loads(response.content)
+        self.assertEqual(content['count'], 1)
+
+        response = self.client.get('/hsapi/resource/', {'full_text_search': 'mountain lakes'},
+                                   format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = json.loads(response.content)
+        self.assertEqual(content['count'], 0)
+
     def test_resource_list_by_bounding_box(self):
         metadata_dict_one = [{'coverage': {'type': 'box', 'value': {'northlimit': '80',
                                                                     'eastlimit': '40',
@@ -264,6 +323,44 @@ class TestResourceList(HSRESTTestCase):
         content = json.loads(response.content)
         self.assertEqual(content['count'], 3)
 
+        # a search box that crosses the antimeridian
+        response = self.client.get('/hsapi/resource/', {'coverage_type': 'box',
+                                                        'north': '90',
+                                                        'east': '30',
+                                                        'south': '30',
+                                                        'west': '100'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = json.loads(response.content)
+        self.assertEqual(content['count'], 2)
+
+        # a resource box that crosses the antimeridian
+        metadata_dict_four = [{'coverage': {'type': 'box', 'value': {'northlimit': '10',
+                                                                     'eastlimit': '-170',
+                                                                     'southlimit': '-10',
+                                                                     'westlimit': '170',
+                                                                     'units': 'decimal deg'}}}]
+        gen_res_four = resource.create_resource('GenericResource', self.user, 'Resource 4',
+                                                metadata=metadata_dict_four)
+        self.resources_to_delete.append(gen_res_four.short_id)
+
+        response = self.client.get('/hsapi/resource/', {'coverage_type': 'box',
+                                                        'north': '5',
+                                                        'east': '-175',
+                                                        'south': '-5',
+                                                        'west': '-180'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = json.loads(response.content)
+        self.assertEqual(content['count'], 1)
+
+        response = self.client.get('/hsapi/resource/', {'coverage_type': 'box',
+                                                        'north': '5',
+                                                        'east': '0',
+                                                        'south': '-5',
+                                                        'west': '-160'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = json.loads(response.content)
+        self.assertEqual(content['count'], 0)
+
         # Bad coverage has no effect
         response = self.client.get('/hsapi/resource/', {'coverage_type': 'bad',
                                                         'nonsensical': '90',
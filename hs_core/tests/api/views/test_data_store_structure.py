@@ -0,0 +1,65 @@
+import json
+import os
+import shutil
+
+from django.contrib.auth.models import Group
+
+from rest_framework import status
+
+from hs_core import hydroshare
+from hs_core.models import ResourceFile
+from hs_core.views.resource_folder_hierarchy import data_store_structure
+from hs_core.testing import MockIRODSTestCaseMixin, ViewTestCase
+
+
+class TestDataStoreStructure(MockIRODSTestCaseMixin, ViewTestCase):
+    def setUp(self):
+        super(TestDataStoreStructure, self).setUp()
+        self.group, _ = Group.objects.get_or_create(name='Resource Author')
+        self.user = hydroshare.create_account(
+            'john@gmail.com',
+            username='john',
+            first_name='John',
+            last_name='Clarson',
+            superuser=False,
+            password='jhmypassword',
+            groups=[]
+        )
+        self.gen_res = hydroshare.create_resource(
+            resource_type='GenericResource',
+            owner=self.user,
+            title='Generic Resource Folder Testing'
+        )
+        file_path = os.path.join(self.temp_dir, 'file1.txt')
+        with open(file_path, 'w') as f:
+            f.write('Test text file in file1.txt')
+        ResourceFile.create_folder(self.gen_res, "it's")
+        with open(file_path, 'r') as f:
+            hydroshare.add_resource_files(self.gen_res.short_id, f, folder="it's")
+
+    def tearDown(self):
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        hydroshare.delete_resource(self.gen_res.short_id)
+        super(TestDataStoreStructure, self).tearDown()
+
+    def _get_structure(self, store_path):
+        request = self.factory.post('/hsapi/_internal/data-store-structure/',
+                                    data={'res_id': self.gen_res.short_id,
+                                          'store_path': store_path})
+        request.user = self.user
+        return data_store_structure(request)
+
+    def test_folder_with_quote(self):
+        response = self._get_structure('data/contents')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)['folders'], ["it's"])
+
+        # folders whose paths cannot be quoted in an iCAT query can still be browsed
+        response = self._get_structure("data/contents/it's")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        files = json.loads(response.content)['files']
+        self.assertEqual(len(files), 1)
+        self.assertEqual(files[0]['name'], 'file1.txt')
+        self.assertEqual(files[0]['size'], len('Test text file in file1.txt'))
+        self.assertEqual(files[0]['pk'], self.gen_res.files.first().pk)
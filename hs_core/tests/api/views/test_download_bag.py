@@ -0,0 +1,93 @@
+import os
+import shutil
+
+from django.contrib.auth.models import Group
+
+from rest_framework import status
+
+from hs_core import hydroshare
+from hs_core.views import download_bag
+from hs_core.testing import MockIRODSTestCaseMixin, ViewTestCase
+
+
+class TestDownloadBag(MockIRODSTestCaseMixin, ViewTestCase):
+    def setUp(self):
+        super(TestDownloadBag, self).setUp()
+        self.group, _ = Group.objects.get_or_create(name='Resource Author')
+        self.user = hydroshare.create_account(
+            'john@gmail.com',
+            username='john',
+            first_name='John',
+            last_name='Clarson',
+            superuser=False,
+            password='jhmypassword',
+            groups=[]
+        )
+        self.gen_res = hydroshare.create_resource(
+            resource_type='GenericResource',
+            owner=self.user,
+            title='Generic Resource Bag Download Testing'
+        )
+        file_path = os.path.join(self.temp_dir, 'file1.txt')
+        with open(file_path, 'w') as f:
+            f.write('Test text file in file1.txt')
+        with open(file_path, 'r') as f:
+            hydroshare.add_resource_files(self.gen_res.short_id, f)
+
+        # put an up to date bag in the bag cache
+        self.bag_content = 'zipped bag of the resource 0123456789'
+        bag_file = os.path.join(self.temp_dir, 'bag.zip')
+        with open(bag_file, 'w') as f:
+            f.write(self.bag_content)
+        self.istorage = self.gen_res.get_irods_storage()
+        self.istorage.saveFile(bag_file, self.gen_res.bag_path, True)
+        self.istorage.setAVU(self.gen_res.root_path, 'bag_modified', 'false')
+
+    def tearDown(self):
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        if self.istorage.exists(self.gen_res.bag_path):
+            self.istorage.delete(self.gen_res.bag_path)
+        hydroshare.delete_resource(self.gen_res.short_id)
+        super(TestDownloadBag, self).tearDown()
+
+    def _download_bag(self, **headers):
+        request = self.factory.get('/resource/{}/bag/'.format(self.gen_res.short_id), **headers)
+        request.user = self.user
+        return download_bag(request, shortkey=self.gen_res.short_id)
+
+    def test_full_bag(self):
+        response = self._download_bag()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(''.join(response.streaming_content), self.bag_content)
+        self.assertEqual(response['Content-Length'], str(len(self.bag_content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename="{}.zip"'.format(self.gen_res.short_id))
+
+    def test_range(self):
+        size = len(self.bag_content)
+        response = self._download_bag(HTTP_RANGE='bytes=5-9')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(''.join(response.streaming_content), self.bag_content[5:10])
+        self.assertEqual(response['Content-Range'], 'bytes 5-9/{}'.format(size))
+        self.assertEqual(response['Content-Length'], '5')
+
+        # a resumed download asks for the rest of the bag
+        response = self._download_bag(HTTP_RANGE='bytes=10-', HTTP_IF_RANGE=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(''.join(response.streaming_content), self.bag_content[10:])
+        self.assertEqual(response['Content-Range'], 'bytes 10-{}/{}'.format(size - 1, size))
+
+    def test_unsatisfiable_range(self):
+        size = len(self.bag_content)
+        response = self._download_bag(HTTP_RANGE='bytes={}-'.format(size))
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], 'bytes */{}'.format(size))
+
+    def test_stale_if_range(self):
+        # the bag changed since the first part was downloaded, so all of it is sent again
+        response = self._download_bag(HTTP_RANGE='bytes=10-', HTTP_IF_RANGE='"0-stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(''.join(response.streaming_content), self.bag_content)
+        self.assertNotIn('Content-Range', response)
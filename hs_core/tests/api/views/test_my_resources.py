@@ -0,0 +1,80 @@
+from django.contrib.auth.models import Group
+
+from hs_core.testing import MockIRODSTestCaseMixin, ViewTestCase
+from hs_core import hydroshare
+from hs_core.views.utils import get_my_resources_list
+from hs_access_control.models import PrivilegeCodes
+
+
+class TestMyResources(MockIRODSTestCaseMixin, ViewTestCase):
+
+    def setUp(self):
+        super(TestMyResources, self).setUp()
+        self.group, _ = Group.objects.get_or_create(name='Resource Author')
+        self.john = hydroshare.create_account(
+            'john@gmail.com',
+            username='john',
+            first_name='John',
+            last_name='Clarson',
+            superuser=False,
+            groups=[]
+        )
+        self.mike = hydroshare.create_account(
+            'mk@gmail.com',
+            username='mikeJ',
+            first_name='Mike',
+            last_name='Johnson',
+            superuser=False,
+            groups=[]
+        )
+        self.owned = hydroshare.create_resource(resource_type='GenericResource',
+                                                owner=self.john,
+                                                title='Owned by John')
+        self.shared = hydroshare.create_resource(resource_type='GenericResource',
+                                                 owner=self.mike,
+                                                 title='Shared with John')
+        self.claimed = hydroshare.create_resource(resource_type='GenericResource',
+                                                  owner=self.mike,
+                                                  title='Added to My Resources by John')
+
+    def _get_my_resources(self, per_page=None):
+        request = self.factory.get('/my-resources/')
+        request.user = self.john
+        return get_my_resources_list(request, per_page=per_page)
+
+    def test_my_resources(self):
+        # shared via user and via group, the resource is listed once with the highest privilege
+        self.mike.uaccess.share_resource_with_user(self.shared, self.john, PrivilegeCodes.VIEW)
+        group = self.mike.uaccess.create_group(title='Test Group', description='Test Group')
+        self.mike.uaccess.share_group_with_user(group, self.john, PrivilegeCodes.VIEW)
+        self.mike.uaccess.share_resource_with_group(self.shared, group, PrivilegeCodes.CHANGE)
+        self.john.ulabels.claim_resource(self.claimed)
+        self.john.ulabels.favorite_resource(self.owned)
+        self.john.ulabels.label_resource(self.shared, 'beta')
+        self.john.ulabels.label_resource(self.shared, 'alpha')
+
+        resources = {res.short_id: res for res in self._get_my_resources()}
+        self.assertEqual(len(resources), 3)
+
+        owned = resources[self.owned.short_id]
+        self.assertTrue(owned.owned)
+        self.assertTrue(owned.is_favorite)
+        self.assertEqual(owned.labels, [])
+
+        shared = resources[self.shared.short_id]
+        self.assertFalse(shared.owned)
+        self.assertTrue(shared.editable)
+        self.assertFalse(shared.is_favorite)
+        self.assertEqual(shared.labels, ['alpha', 'beta'])
+
+        claimed = resources[self.claimed.short_id]
+        self.assertFalse(claimed.owned or claimed.editable or claimed.viewable)
+
+    def test_my_resources_paged(self):
+        self.mike.uaccess.share_resource_with_user(self.shared, self.john, PrivilegeCodes.VIEW)
+        page = self._get_my_resources(per_page=1)
+        self.assertEqual(page.paginator.count, 2)
+        self.assertEqual(len(page), 1)
+        # newest resource first
+        self.assertEqual(page[0].short_id, self.shared.short_id)
+        self.assertTrue(page[0].viewable)
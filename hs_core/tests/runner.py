@@ -23,6 +23,16 @@ def _set_eager():
     current_app.conf.CELERY_EAGER_PROPAGATES_EXCEPTIONS = True
 
 
+def _disable_tracking_buffer():
+    """
+    Write tracking visits to the database immediately, as buffered visits would outlive the
+    test that recorded them.
+    :return:
+    """
+    from hs_tracking.models import visit_buffer
+    visit_buffer.size = 1
+
+
 class CustomTestSuiteRunner(NoseTestSuiteRunner):
     """Override the default django 'test' command, exclude from testing
     all 3rd part apps which we know will probably fail."""
@@ -37,6 +47,7 @@ class CustomTestSuiteRunner(NoseTestSuiteRunner):
         """
         _set_eager()
         super(CustomTestSuiteRunner, self).setup_test_environment(**kwargs)
+        _disable_tracking_buffer()
 
     def run_tests(self, test_labels, extra_tests=None, **kwargs):
         if not test_labels:
@@ -32,6 +32,9 @@ urlpatterns = patterns('',
     # public copy resource endpoint
     url(r'^resource/(?P<pk>[0-9a-f-]+)/copy/$', views.copy_resource_public, name='copy_resource_public'),
 
+    # streaming download of the zipped bag of a resource
+    url(r'^resource/(?P<shortkey>[0-9a-f-]+)/bag/$', views.download_bag, name='download_bag'),
+
     # DEPRECATED: use form above instead
     url(r'^resource/accessRules/(?P<pk>[0-9a-f-]+)/$', views.resource_rest_api.AccessRulesUpdate.as_view(),
         name='DEPRECATED_update_access_rules'),
@@ -14,7 +14,7 @@ from django.contrib.messages import get_messages
 from django.utils.decorators import method_decorator
 from django.core.exceptions import ValidationError, PermissionDenied, ObjectDoesNotExist
 from django.http import HttpResponseRedirect, HttpResponse, JsonResponse, \
-    HttpResponseBadRequest, HttpResponseForbidden
+    HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse, Http404
 from django.shortcuts import get_object_or_404, render_to_response, render, redirect
 from django.template import RequestContext
 from django.core import signing
@@ -37,8 +37,9 @@ from django_irods.icommands import SessionException
 
 from hs_core import hydroshare
 from hs_core.hydroshare.utils import get_resource_by_shortkey, resource_modified, resolve_request
+from hs_core.hydroshare import hs_bagit
 from .utils import authorize, upload_from_irods, ACTION_TO_AUTHORIZE, run_script_to_update_hyrax_input_files, \
-    get_my_resources_list, send_action_to_take_email, get_coverage_data_dict
+    get_my_resources_list, send_action_to_take_email, get_coverage_data_dict, parse_byte_range
 from hs_core.models import GenericResource, resource_processor, CoreMetaData, Subject
 from hs_core.hydroshare.resource import METADATA_STATUS_SUFFICIENT, METADATA_STATUS_INSUFFICIENT
 
@@ -477,6 +478,55 @@ def file_download_url_mapper(request, shortkey):
     return HttpResponseRedirect(file_download_url)
 
 
+def download_bag(request, shortkey, *args, **kwargs):
+    """
+    Stream the zipped bag of a resource to the client.
+
+    If the bag zipped by iRODS is up to date it is sent from the bag cache, honoring a single
+    Range header (and If-Range) so that interrupted downloads can be resumed. Otherwise the
+    bag is zipped on the fly while it is being sent, so the first bytes go out right away
+    instead of after the whole bag has been built.
+    """
+    res, _, _ = authorize(request, shortkey, needed_permission=ACTION_TO_AUTHORIZE.VIEW_RESOURCE)
+    istorage = res.get_irods_storage()
+    if not istorage.exists(res.root_path):
+        raise Http404("Resource {} does not exist in iRODS".format(shortkey))
+
+    bag_modified = istorage.getAVU(res.root_path, 'bag_modified') or 'true'
+    if bag_modified.lower() != 'true' and istorage.exists(res.bag_path):
+        size = istorage.size(res.bag_path)
+        etag = '"{}-{}"'.format(size, res.updated.isoformat())
+        byte_range = None
+        if request.META.get('HTTP_IF_RANGE', etag) == etag:
+            try:
+                byte_range = parse_byte_range(request.META.get('HTTP_RANGE'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = 'bytes */{}'.format(size)
+                return response
+        if byte_range is None:
+            response = StreamingHttpResponse(utils.stream_irods_file(istorage, res.bag_path),
+                                             content_type='application/zip')
+            response['Content-Length'] = size
+        else:
+            first, last = byte_range
+            response = StreamingHttpResponse(
+                utils.stream_irods_file(istorage, res.bag_path, offset=first,
+                                        length=last - first + 1),
+                status=206, content_type='application/zip')
+            response['Content-Range'] = 'bytes {}-{}/{}'.format(first, last, size)
+            response['Content-Length'] = last - first + 1
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+    else:
+        response = StreamingHttpResponse(hs_bagit.stream_bag(res),
+                                         content_type='application/zip')
+        response['Accept-Ranges'] = 'none'
+
+    response['Content-Disposition'] = 'attachment; filename="{}.zip"'.format(res.short_id)
+    return response
+
+
 def delete_metadata_element(request, shortkey, element_name, element_id, *args, **kwargs):
     res, _, _ = authorize(request, shortkey, needed_permission=ACTION_TO_AUTHORIZE.EDIT_RESOURCE)
     res.metadata.delete_element(element_name, element_id)
@@ -1042,7 +1092,8 @@ class GroupUpdateForm(GroupForm):
 @login_required
 def my_resources(request, page):
 
-    resource_collection = get_my_resources_list(request)
+    resource_collection = get_my_resources_list(
+        request, per_page=getattr(settings, 'HS_MY_RESOURCES_PER_PAGE', None))
     context = {'collection': resource_collection}
 
     return context
@@ -1,7 +1,130 @@
+import base64
+import hashlib
+from collections import OrderedDict
+from functools import partial
+
+from dateutil import parser
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# Redis key of the cached count of resources listed for anonymous users by a set of
+# query parameters
+RESOURCE_COUNT_CACHE_KEY = 'hs_resource_list:count:{}'
+
 
 class SmallDatumPagination(PageNumberPagination):
     """ Only use for requests whose resulting datum elements are small and where
         one wants to force all results to be on one page
     """
     page_size = None
+
+
+class CachedCountPaginator(Paginator):
+    """ A Paginator that stores its count in Redis under cache_key for cache_timeout seconds """
+
+    def __init__(self, object_list, per_page, cache_key=None, cache_timeout=0, **kwargs):
+        super(CachedCountPaginator, self).__init__(object_list, per_page, **kwargs)
+        self.cache_key = cache_key
+        self.cache_timeout = cache_timeout
+        self._cached_count = None
+
+    @property
+    def count(self):
+        if self._cached_count is None:
+            redis = getattr(settings, 'REDIS_CONNECTION', None)
+            cached = redis.get(self.cache_key) if redis is not None else None
+            if cached is not None:
+                self._cached_count = int(cached)
+            else:
+                self._cached_count = super(CachedCountPaginator, self).count
+                if redis is not None:
+                    redis.set(self.cache_key, self._cached_count, ex=self.cache_timeout)
+        return self._cached_count
+
+
+class ResourceListPagination(PageNumberPagination):
+    """
+    Page number pagination of resource lists, with keyset pagination for clients that page
+    through the whole list.
+
+    A request with a 'cursor' query parameter, empty for the first page, lists resources in
+    order of last update and id, starting after the resource the cursor points to. The
+    response has only the url of the next page as 'next' and the 'results', so each page
+    costs the same however far the client has paged.
+
+    Page numbered lists count the resources in the database. The counts of lists requested
+    by anonymous users are cached for HS_RESOURCE_COUNT_CACHE_TIMEOUT seconds.
+    """
+    cursor_query_param = 'cursor'
+    cursor_ordering = ('updated', 'pk')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.by_cursor = self.cursor_query_param in request.query_params
+        if self.by_cursor:
+            return self.paginate_queryset_by_cursor(queryset, request)
+
+        cache_timeout = getattr(settings, 'HS_RESOURCE_COUNT_CACHE_TIMEOUT', 0)
+        if cache_timeout and not request.user.is_authenticated():
+            params = sorted((key, sorted(request.query_params.getlist(key)))
+                            for key in request.query_params
+                            if key not in (self.page_query_param, self.page_size_query_param))
+            cache_key = RESOURCE_COUNT_CACHE_KEY.format(hashlib.sha1(repr(params)).hexdigest())
+            self.django_paginator_class = partial(CachedCountPaginator, cache_key=cache_key,
+                                                  cache_timeout=cache_timeout)
+        return super(ResourceListPagination, self).paginate_queryset(queryset, request, view)
+
+    def paginate_queryset_by_cursor(self, queryset, request):
+        if not queryset.query.can_filter():
+            raise ValidationError(detail={'cursor': ["cursor can not be combined with start "
+                                                     "or count"]})
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.cursor_ordering)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            updated, pk = cursor
+            queryset = queryset.filter(Q(updated__gt=updated) | Q(updated=updated, pk__gt=pk))
+        page = list(queryset[:page_size + 1]) if page_size else list(queryset)
+        self.request = request
+        self.next_cursor = None
+        if page_size and len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self.encode_cursor(page[-1])
+        return page
+
+    def decode_cursor(self, request):
+        """ Return (updated, pk) of the resource the cursor points to, or None if empty """
+        encoded = request.query_params[self.cursor_query_param]
+        if not encoded:
+            return None
+        try:
+            updated, pk = base64.urlsafe_b64decode(encoded.encode('ascii')).split('|')
+            return parser.parse(updated), int(pk)
+        except (TypeError, ValueError, UnicodeEncodeError):
+            raise NotFound("Invalid cursor")
+
+    def encode_cursor(self, resource):
+        return base64.urlsafe_b64encode('{}|{}'.format(resource.updated.isoformat(),
+                                                       resource.pk))
+
+    def get_next_link(self):
+        if not self.by_cursor:
+            return super(ResourceListPagination, self).get_next_link()
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if not self.by_cursor:
+            return super(ResourceListPagination, self).get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data)
+        ]))
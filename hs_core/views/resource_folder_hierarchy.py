@@ -10,8 +10,8 @@ from rest_framework.decorators import api_view
 
 from django_irods.icommands import SessionException
 
-from hs_core.hydroshare.utils import get_file_mime_type, get_resource_file_name_and_extension, \
-    get_resource_file_url, resolve_request
+from hs_core.hydroshare.utils import get_file_mime_type, get_resource_file_url, \
+    resolve_request, list_irods_collection
 from hs_core.views.utils import authorize, ACTION_TO_AUTHORIZE, zip_folder, unzip_file, \
     create_folder, remove_folder, move_or_rename_file_or_folder, get_coverage_data_dict
 from hs_core.models import ResourceFile
@@ -63,39 +63,44 @@ def data_store_structure(request):
     if resource.resource_federation_path:
         # This implies that the path starts with data/contents
         res_coll = os.path.join(resource.resource_federation_path, res_id, store_path)
-        rel_path = store_path
     else:
         res_coll = os.path.join(res_id, store_path)
-        rel_path = res_coll
     try:
         store = istorage.listdir(res_coll)
-        files = []
-        for fname in store[1]:
-            name_with_full_path = os.path.join(res_coll, fname)
-            name_with_rel_path = os.path.join(rel_path, fname)
-            size = istorage.size(name_with_full_path)
-            mtype = get_file_mime_type(fname)
-            idx = mtype.find('/')
-            if idx >= 0:
-                mtype = mtype[idx + 1:]
-            f_pk = ''
-            f_url = ''
-            logical_file_type = ''
-            logical_file_id = ''
-            for f in ResourceFile.objects.filter(object_id=resource.id):
-                if name_with_rel_path == get_resource_file_name_and_extension(f)[0]:
-                    f_pk = f.pk
-                    f_url = get_resource_file_url(f)
-                    if resource.resource_type == "CompositeResource":
-                        logical_file_type = f.logical_file_type_name
-                        logical_file_id = f.logical_file.id
-                    break
-
-            files.append({'name': fname, 'size': size, 'type': mtype, 'pk': f_pk, 'url': f_url,
-                          'logical_type': logical_file_type, 'logical_file_id': logical_file_id})
+        # one iCAT query for names and sizes of all files in the folder, rather than one
+        # size request per file
+        listing = sorted(list_irods_collection(istorage, res_coll, recursive=False),
+                         key=lambda obj: obj.path)
     except SessionException as ex:
         return HttpResponse(ex.stderr, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    # index the resource files of this folder by storage path in one query
+    res_files = ResourceFile.list_folder(resource, res_coll)\
+        .prefetch_related('content_object', 'logical_file_content_object')
+    files_by_path = {f.storage_path: f for f in res_files}
+
+    files = []
+    for obj in listing:
+        fname = obj.path
+        mtype = get_file_mime_type(fname)
+        idx = mtype.find('/')
+        if idx >= 0:
+            mtype = mtype[idx + 1:]
+        f_pk = ''
+        f_url = ''
+        logical_file_type = ''
+        logical_file_id = ''
+        f = files_by_path.get(os.path.join(res_coll, fname))
+        if f is not None:
+            f_pk = f.pk
+            f_url = get_resource_file_url(f)
+            if resource.resource_type == "CompositeResource":
+                logical_file_type = f.logical_file_type_name
+                logical_file_id = f.logical_file.id
+
+        files.append({'name': fname, 'size': obj.size, 'type': mtype, 'pk': f_pk, 'url': f_url,
+                      'logical_type': logical_file_type, 'logical_file_id': logical_file_id})
+
     return_object = {'files': files,
                      'folders': store[0],
                      'can_be_public': resource.can_be_public_or_discoverable}
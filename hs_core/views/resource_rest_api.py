@@ -11,6 +11,7 @@ from django.core.exceptions import ObjectDoesNotExist, SuspiciousFileOperation
 from django.http import HttpResponseRedirect
 from django.shortcuts import redirect
 from django.contrib.sites.models import Site
+from django.conf import settings
 
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.views import APIView
@@ -20,7 +21,7 @@ from rest_framework.request import Request
 from rest_framework.exceptions import ValidationError, NotAuthenticated, PermissionDenied, NotFound
 
 from hs_core import hydroshare
-from hs_core.models import AbstractResource
+from hs_core.models import AbstractResource, Title, Creator
 from hs_core.hydroshare.utils import get_resource_by_shortkey, get_resource_types
 from hs_core.views import utils as view_utils
 from hs_core.views.utils import ACTION_TO_AUTHORIZE
@@ -34,31 +35,95 @@ from hs_core.hydroshare.hs_bagit import create_bag_files
 
 logger = logging.getLogger(__name__)
 
+# resource id reversed into urls and replaced by the id of each resource listed
+URL_RESOURCE_ID_PLACEHOLDER = '0' * 32
+
 
 # Mixins
 class ResourceToListItemMixin(object):
     def resourceToResourceListItem(self, r):
+        return self.resourcesToResourceListItems([r])[0]
+
+    def resourcesToResourceListItems(self, resources):
+        """
+        Convert resources to list items, reading the titles and the first creators of all
+        resources with one query each. Select raccess with the resources to read their access
+        flags without a query per resource.
+        """
+        resources = list(resources)
+        object_ids = [r.object_id for r in resources]
+        titles = {(content_type_id, object_id): value for content_type_id, object_id, value in
+                  Title.objects.filter(object_id__in=object_ids)
+                  .values_list('content_type_id', 'object_id', 'value')}
+        creators = {(content_type_id, object_id): name for content_type_id, object_id, name in
+                    Creator.objects.filter(object_id__in=object_ids, order=1)
+                    .values_list('content_type_id', 'object_id', 'name')}
+
         site_url = hydroshare.utils.current_site_url()
-        bag_url = site_url + AbstractResource.bag_url(r.short_id)
-        science_metadata_url = site_url + reverse('get_update_science_metadata', args=[r.short_id])
-        resource_map_url = site_url + reverse('get_resource_map', args=[r.short_id])
-        resource_url = site_url + r.get_absolute_url()
-        resource_list_item = serializers.ResourceListItem(resource_type=r.resource_type,
-                                                          resource_id=r.short_id,
-                                                          resource_title=r.metadata.title.value,
-                                                          creator=r.first_creator.name,
-                                                          public=r.raccess.public,
-                                                          discoverable=r.raccess.discoverable,
-                                                          shareable=r.raccess.shareable,
-                                                          immutable=r.raccess.immutable,
-                                                          published=r.raccess.published,
-                                                          date_created=r.created,
-                                                          date_last_updated=r.updated,
-                                                          bag_url=bag_url,
-                                                          science_metadata_url=science_metadata_url,
-                                                          resource_map_url=resource_map_url,
-                                                          resource_url=resource_url)
-        return resource_list_item
+        # reverse the urls once, with a placeholder for the resource id
+        science_metadata_url = site_url + reverse(
+            'get_update_science_metadata', args=[URL_RESOURCE_ID_PLACEHOLDER])
+        resource_map_url = site_url + reverse('get_resource_map',
+                                              args=[URL_RESOURCE_ID_PLACEHOLDER])
+
+        resource_list_items = []
+        for r in resources:
+            metadata_key = (r.content_type_id, r.object_id)
+            resource_list_item = serializers.ResourceListItem(
+                resource_type=r.resource_type,
+                resource_id=r.short_id,
+                resource_title=titles.get(metadata_key),
+                creator=creators.get(metadata_key),
+                public=r.raccess.public,
+                discoverable=r.raccess.discoverable,
+                shareable=r.raccess.shareable,
+                immutable=r.raccess.immutable,
+                published=r.raccess.published,
+                date_created=r.created,
+                date_last_updated=r.updated,
+                bag_url=site_url + AbstractResource.bag_url(r.short_id, res=r),
+                science_metadata_url=science_metadata_url.replace(URL_RESOURCE_ID_PLACEHOLDER,
+                                                                  r.short_id),
+                resource_map_url=resource_map_url.replace(URL_RESOURCE_ID_PLACEHOLDER,
+                                                          r.short_id),
+                resource_url=site_url + r.get_absolute_url())
+            resource_list_items.append(resource_list_item)
+        return resource_list_items
+
+
+class ResourceListMixin(ResourceToListItemMixin):
+    """ Lists the resources selected by the query parameters of a GET request """
+    pagination_class = pagination.ResourceListPagination
+
+    def get_queryset(self):
+        resource_list_request_validator = serializers.ResourceListRequestValidator(
+            data=self.request.query_params)
+        if not resource_list_request_validator.is_valid():
+            raise ValidationError(detail=resource_list_request_validator.errors)
+
+        filter_parms = resource_list_request_validator.validated_data
+        filter_parms['user'] = (self.request.user if self.request.user.is_authenticated() else None)
+        if len(filter_parms['type']) == 0:
+            filter_parms['type'] = None
+        else:
+            filter_parms['type'] = list(filter_parms['type'])
+
+        filter_parms['public'] = not self.request.user.is_authenticated()
+
+        return hydroshare.get_resource_list(**filter_parms).select_related('raccess')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(self.resourcesToResourceListItems(page), many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(self.resourcesToResourceListItems(queryset), many=True)
+        return Response(serializer.data)
+
+    def get_serializer_class(self):
+        return serializers.ResourceListItemSerializer
 
 
 class ResourceFileToListItemMixin(object):
@@ -131,7 +196,7 @@ class ResourceTypes(generics.ListAPIView):
         return serializers.ResourceTypesSerializer
 
 
-class ResourceList(ResourceToListItemMixin, generics.ListAPIView):
+class ResourceList(ResourceListMixin, generics.ListAPIView):
     """
     Get a list of resources based on the following filter query parameters
     DEPRECATED: See GET /resource/ in CreateResource
@@ -156,6 +221,8 @@ class ResourceList(ResourceToListItemMixin, generics.ListAPIView):
     :param  to_date: (optional) - to get a list of resources created on or before this date
     :param  edit_permission: (optional) - to get a list of resources for which the authorised user
     has edit permission
+    :param  cursor: (optional) - to page through resources in order of last update: empty for
+    the first page, then taken from the "next" link, which is the only other key of the result
     :rtype:  json string
     :return:  a paginated list of resources with data for resource id, title, resource type,
     creator, public, date created, date last updated, resource bag url path, and science
@@ -189,38 +256,9 @@ class ResourceList(ResourceToListItemMixin, generics.ListAPIView):
         }
 
     """
-    pagination_class = PageNumberPagination
-
     def get(self, request):
         return self.list(request)
 
-    # needed for list of resources
-    def get_queryset(self):
-        resource_list_request_validator = serializers.ResourceListRequestValidator(
-            data=self.request.query_params)
-        if not resource_list_request_validator.is_valid():
-            raise ValidationError(detail=resource_list_request_validator.errors)
-
-        filter_parms = resource_list_request_validator.validated_data
-        filter_parms['user'] = (self.request.user if self.request.user.is_authenticated() else None)
-        if len(filter_parms['type']) == 0:
-            filter_parms['type'] = None
-        else:
-            filter_parms['type'] = list(filter_parms['type'])
-
-        filter_parms['public'] = not self.request.user.is_authenticated()
-
-        filtered_res_list = []
-
-        for r in hydroshare.get_resource_list(**filter_parms):
-            resource_list_item = self.resourceToResourceListItem(r)
-            filtered_res_list.append(resource_list_item)
-
-        return filtered_res_list
-
-    def get_serializer_class(self):
-        return serializers.ResourceListItemSerializer
-
 
 class CheckTaskStatus(generics.RetrieveAPIView):
     def get(self, request, task_id):
@@ -274,6 +312,8 @@ class ResourceReadUpdateDelete(ResourceToListItemMixin, generics.RetrieveUpdateD
             # if res is RefTimeSeriesResource
             bag_url = site_url + reverse('rest_download_refts_resource_bag',
                                          kwargs={'shortkey': pk})
+        elif getattr(settings, 'HS_STREAM_BAG_DOWNLOAD', False):
+            bag_url = site_url + reverse('download_bag', kwargs={'shortkey': pk})
         else:
             bag_url = site_url + reverse('rest_download',
                                          kwargs={'path': 'bags/{}.zip'.format(pk)})
@@ -295,7 +335,7 @@ class ResourceReadUpdateDelete(ResourceToListItemMixin, generics.RetrieveUpdateD
         return serializers.ResourceListItemSerializer
 
 
-class ResourceListCreate(ResourceToListItemMixin, generics.ListCreateAPIView):
+class ResourceListCreate(ResourceListMixin, generics.ListCreateAPIView):
     """
     Create a new resource or list existing resources
 
@@ -355,6 +395,8 @@ class ResourceListCreate(ResourceToListItemMixin, generics.ListCreateAPIView):
     :param  to_date: (optional) - to get a list of resources created on or before this date
     :param  edit_permission: (optional) - to get a list of resources for which the authorised user
     has edit permission
+    :param  cursor: (optional) - to page through resources in order of last update: empty for
+    the first page, then taken from the "next" link, which is the only other key of the result
     :rtype:  json string
     :return:  a paginated list of resources with data for resource id, title, resource type,
     creator, public, date created, date last updated, resource bag url path, and science
@@ -505,40 +547,9 @@ class ResourceListCreate(ResourceToListItemMixin, generics.ListCreateAPIView):
 
         return Response(data=response_data,  status=status.HTTP_201_CREATED)
 
-    pagination_class = PageNumberPagination
-
     def get(self, request):
         return self.list(request)
 
-    # needed for list of resources
-    # copied from ResourceList
-    def get_queryset(self):
-        resource_list_request_validator = serializers.ResourceListRequestValidator(
-            data=self.request.query_params)
-        if not resource_list_request_validator.is_valid():
-            raise ValidationError(detail=resource_list_request_validator.errors)
-
-        filter_parms = resource_list_request_validator.validated_data
-        filter_parms['user'] = (self.request.user if self.request.user.is_authenticated() else None)
-        if len(filter_parms['type']) == 0:
-            filter_parms['type'] = None
-        else:
-            filter_parms['type'] = list(filter_parms['type'])
-
-        filter_parms['public'] = not self.request.user.is_authenticated()
-
-        filtered_res_list = []
-
-        for r in hydroshare.get_resource_list(**filter_parms):
-            resource_list_item = self.resourceToResourceListItem(r)
-            filtered_res_list.append(resource_list_item)
-
-        return filtered_res_list
-
-    # covers serialization of output from GET request
-    def get_serializer_class(self):
-        return serializers.ResourceListItemSerializer
-
 
 class SystemMetadataRetrieve(ResourceToListItemMixin, APIView):
     """
@@ -12,6 +12,7 @@ from django.contrib.auth.models import Group, User
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Q
 from django.core.files.base import File
 from django.utils.http import int_to_base36
 from django.http import HttpResponse
@@ -20,6 +21,7 @@ from rest_framework.exceptions import NotFound, PermissionDenied, ValidationErro
 
 from mezzanine.utils.email import subject_template, default_token_generator, send_mail_template
 from mezzanine.utils.urls import next_url
+from mezzanine.utils.views import paginate
 from mezzanine.conf import settings
 
 from hs_core import hydroshare
@@ -29,7 +31,8 @@ from hs_core.models import AbstractMetaDataElement, BaseResource, GenericResourc
 from hs_core.signals import pre_metadata_element_create, post_delete_file_from_resource
 from hs_core.hydroshare.utils import get_file_mime_type
 from django_irods.storage import IrodsStorage
-from hs_access_control.models import PrivilegeCodes
+from hs_access_control.models import PrivilegeCodes, UserResourceEffectivePrivilege
+from hs_labels.models import FlagCodes, UserResourceFlags, UserResourceLabels
 
 ActionToAuthorize = namedtuple('ActionToAuthorize',
                                'VIEW_METADATA, '
@@ -57,6 +60,35 @@ def json_or_jsonp(r, i, code=200):
         return HttpResponse(i, content_type='application/json', status=code)
 
 
+def parse_byte_range(range_header, size):
+    """
+    Parse the value of an HTTP Range header for a single byte range
+
+    :param range_header: value of the Range header, e.g. "bytes=100-" or "bytes=-500"
+    :param size: size of the requested entity in bytes
+    :return: (first, last) byte positions, inclusive, or None if the header is absent,
+             malformed or asks for multiple ranges, in which case the whole entity is sent.
+    :raises ValueError: if the range cannot be satisfied for an entity of the given size
+    """
+    if not range_header or not range_header.startswith('bytes='):
+        return None
+    byte_range = range_header[len('bytes='):].strip()
+    if ',' in byte_range or '-' not in byte_range:
+        return None
+    first, _, last = byte_range.partition('-')
+    try:
+        if not first:  # suffix range: the last N bytes
+            first, last = max(size - int(last), 0), size - 1
+        else:
+            first = int(first)
+            last = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if first > last or first >= size:
+        raise ValueError("Range {} not satisfiable for size {}".format(range_header, size))
+    return first, last
+
+
 # Since an SessionException will be raised for all irods-related operations from django_irods
 # module, there is no need to raise iRODS SessionException from within this function
 def upload_from_irods(username, password, host, port, zone, irods_fnames, res_files):
@@ -345,56 +377,79 @@ def create_form(formclass, request):
     return params
 
 
-def get_my_resources_list(request):
+def get_my_resources_queryset(user):
+    """
+    QuerySet of the resources listed on the My Resources page of a user, newest first
+
+    These are the resources over which the user holds any privilege, directly or via a group,
+    except obsoleted versions, and the resources the user added to My Resources from the
+    Discover page. Each resource is listed once.
+    """
+    shared = UserResourceEffectivePrivilege.objects.filter(user=user).values('resource')
+    claimed = UserResourceFlags.objects.filter(user=user, kind=FlagCodes.MINE).values('resource')
+    obsoleted = Relation.objects.filter(type='isReplacedBy').values('object_id')
+    return BaseResource.objects\
+        .filter((Q(pk__in=shared) & ~Q(object_id__in=obsoleted)) | Q(pk__in=claimed))\
+        .select_related('raccess')\
+        .order_by('-created')
+
+
+def annotate_my_resources(user, resources):
+    """
+    Set the attributes used by the My Resources page on each resource
+
+    :param user: user whose page is being built
+    :param resources: iterable of resources, e.g., from get_my_resources_queryset
+    :return: list of resources, with owned, editable, viewable, is_favorite and labels set
+
+    Privileges, favorites and labels of all resources are read with one query each.
+    """
+    resources = list(resources)
+    ids = [res.pk for res in resources]
+    privileges = dict(UserResourceEffectivePrivilege.objects
+                      .filter(user=user, resource__in=ids)
+                      .values_list('resource_id', 'privilege'))
+    favorites = set(UserResourceFlags.objects
+                    .filter(user=user, kind=FlagCodes.FAVORITE, resource__in=ids)
+                    .values_list('resource_id', flat=True))
+    labels = {}
+    for resource_id, label in UserResourceLabels.objects\
+            .filter(user=user, resource__in=ids)\
+            .order_by('label')\
+            .values_list('resource_id', 'label'):
+        labels.setdefault(resource_id, []).append(label)
+
+    for res in resources:
+        privilege = privileges.get(res.pk, PrivilegeCodes.NONE)
+        # immutable resources can be viewed but not changed
+        if res.raccess.immutable and privilege == PrivilegeCodes.CHANGE:
+            privilege = PrivilegeCodes.VIEW
+        res.owned = privilege == PrivilegeCodes.OWNER
+        res.editable = privilege == PrivilegeCodes.CHANGE
+        res.viewable = privilege == PrivilegeCodes.VIEW
+        res.is_favorite = res.pk in favorites
+        res.labels = labels.get(res.pk, [])
+    return resources
+
+
+def get_my_resources_list(request, per_page=None):
+    """
+    Resources of the My Resources page of the requesting user
+
+    :param request: request of the user, holding the page number in GET parameter 'page'
+    :param per_page: number of resources per page, or None (the default) for all resources.
+    :return: list of resources, or a Page of them if per_page is given; see
+             annotate_my_resources for the attributes set on each resource.
+    """
     user = request.user
-    # get a list of resources with effective OWNER privilege
-    owned_resources = user.uaccess.get_resources_with_explicit_access(PrivilegeCodes.OWNER)
-    # remove obsoleted resources from the owned_resources
-    owned_resources = owned_resources.exclude(object_id__in=Relation.objects.filter(
-        type='isReplacedBy').values('object_id'))
-
-    # get a list of resources with effective CHANGE privilege (should include resources that the
-    # user has access to via group
-    editable_resources = user.uaccess.get_resources_with_explicit_access(PrivilegeCodes.CHANGE,
-                                                                         via_group=True)
-    # remove obsoleted resources from the editable_resources
-    editable_resources = editable_resources.exclude(object_id__in=Relation.objects.filter(
-        type='isReplacedBy').values('object_id'))
-
-    # get a list of resources with effective VIEW privilege (should include resources that the
-    # user has access via group
-    viewable_resources = user.uaccess.get_resources_with_explicit_access(PrivilegeCodes.VIEW,
-                                                                         via_group=True)
-    # remove obsoleted resources from the viewable_resources
-    viewable_resources = viewable_resources.exclude(object_id__in=Relation.objects.filter(
-        type='isReplacedBy').values('object_id'))
-
-    owned_resources = list(owned_resources)
-    editable_resources = list(editable_resources)
-    viewable_resources = list(viewable_resources)
-    favorite_resources = list(user.ulabels.favorited_resources)
-    labeled_resources = list(user.ulabels.labeled_resources)
-    discovered_resources = list(user.ulabels.my_resources)
-
-    for res in owned_resources:
-        res.owned = True
-
-    for res in editable_resources:
-        res.editable = True
-
-    for res in viewable_resources:
-        res.viewable = True
-
-    for res in (owned_resources + editable_resources + viewable_resources + discovered_resources):
-        res.is_favorite = False
-        if res in favorite_resources:
-            res.is_favorite = True
-        if res in labeled_resources:
-            res.labels = res.rlabels.get_labels(user)
-
-    resource_collection = (owned_resources + editable_resources + viewable_resources +
-                           discovered_resources)
-    return resource_collection
+    resources = get_my_resources_queryset(user)
+    if per_page:
+        resources = paginate(resources, request.GET.get('page', 1), per_page,
+                             settings.MAX_PAGING_LINKS)
+        annotate_my_resources(user, resources)
+        return resources
+    else:
+        return annotate_my_resources(user, resources)
 
 
 def send_action_to_take_email(request, user, action_type, **kwargs):
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hs_file_types', '0003_auto_20170302_2257'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='netcdffilemetadata',
+            name='header_info',
+            field=models.TextField(null=True, blank=True),
+        ),
+    ]
@@ -592,7 +592,9 @@ class AbstractLogicalFile(models.Model):
     @property
     def size(self):
         # get total size (in bytes) of all files in this file type
-        return sum([f.size for f in self.files.all()])
+        for f in self.files.filter(_size__lt=0):
+            f.set_system_metadata()
+        return self.files.filter(_size__gt=0).aggregate(total=models.Sum('_size'))['total'] or 0
 
     @property
     def resource(self):
@@ -2,11 +2,13 @@ import os
 import shutil
 import logging
 import re
+from uuid import uuid4
 
 from functools import partial, wraps
 import netCDF4
 import numpy as np
 
+from django.conf import settings
 from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import UploadedFile
@@ -16,6 +18,7 @@ from django.forms.models import formset_factory, BaseFormSet
 from dominate.tags import div, legend, form, button, p, textarea, strong, input
 
 from hs_core.hydroshare import utils
+from hs_core.hydroshare.file_cache import cached_irods_file
 from hs_core.hydroshare.resource import delete_resource_file
 from hs_core.forms import CoverageTemporalForm, CoverageSpatialForm
 from hs_core.models import Creator, Contributor
@@ -32,6 +35,9 @@ import hs_file_types.nc_functions.nc_meta as nc_meta
 class NetCDFFileMetaData(NetCDFMetaDataMixin, AbstractFileMetaData):
     # the metadata element models are from the netcdf resource type app
     model_app_label = 'hs_app_netCDF'
+    # content of the header info text file of the logical file, which is only rewritten
+    # when the netcdf file is
+    header_info = models.TextField(null=True, blank=True)
 
     def get_metadata_elements(self):
         elements = super(NetCDFFileMetaData, self).get_metadata_elements()
@@ -213,12 +219,15 @@ class NetCDFFileMetaData(NetCDFMetaDataMixin, AbstractFileMetaData):
                 nc_dump_res_file = f
                 break
         if nc_dump_res_file is not None:
+            if self.header_info is None:
+                # header info of files created before it was kept in the database
+                self.header_info = nc_dump_res_file.resource_file.read().decode('utf-8')
+                self.save()
             nc_dump_div = div(style="clear: both", cls="col-xs-12")
             with nc_dump_div:
                 legend("NetCDF Header Information")
                 p(nc_dump_res_file.full_path[33:])
-                header_info = nc_dump_res_file.resource_file.read()
-                header_info = header_info.decode('utf-8')
+                header_info = self.header_info
                 textarea(header_info, readonly="", rows="15",
                          cls="input-xlarge", style="min-width: 100%")
 
@@ -313,6 +322,13 @@ class NetCDFLogicalFile(AbstractLogicalFile):
         """does not allow the original folder to be deleted upon zipping of that folder"""
         return False
 
+    def get_copy(self):
+        """Overrides the base class function to copy the header info of the netcdf file"""
+        copy_of_logical_file = super(NetCDFLogicalFile, self).get_copy()
+        copy_of_logical_file.metadata.header_info = self.metadata.header_info
+        copy_of_logical_file.metadata.save()
+        return copy_of_logical_file
+
     def update_netcdf_file(self, user):
         """
         writes metadata to the netcdf file associated with this instance of the logical file
@@ -372,130 +388,141 @@ class NetCDFLogicalFile(AbstractLogicalFile):
         file_type_metadata = []
         files_to_add_to_resource = []
         if res_file.has_generic_logical_file:
-            # get the file from irods to temp dir
-            temp_file = utils.get_file_from_irods(res_file)
-            temp_dir = os.path.dirname(temp_file)
-            files_to_add_to_resource.append(temp_file)
-            # file validation and metadata extraction
-            nc_dataset = nc_utils.get_nc_dataset(temp_file)
-            if isinstance(nc_dataset, netCDF4.Dataset):
-                # Extract the metadata from netcdf file
-                res_dublin_core_meta, res_type_specific_meta = nc_meta.get_nc_meta_dict(temp_file)
-                # populate resource_metadata and file_type_metadata lists with extracted metadata
-                add_metadata_to_list(resource_metadata, res_dublin_core_meta,
-                                     res_type_specific_meta, file_type_metadata, resource)
-
-                # create the ncdump text file
-                dump_file = create_header_info_txt_file(temp_file, nc_file_name)
-                files_to_add_to_resource.append(dump_file)
-                file_folder = res_file.file_folder
-                with transaction.atomic():
-                    # first delete the netcdf file that we retrieved from irods
-                    # for setting it to netcdf file type
-                    delete_resource_file(resource.short_id, res_file.id, user)
-
-                    # create a netcdf logical file object to be associated with
-                    # resource files
-                    logical_file = cls.create()
-
-                    # by default set the dataset_name attribute of the logical file to the
-                    # name of the file selected to set file type unless the extracted metadata
-                    # has a value for title
-                    dataset_title = res_dublin_core_meta.get('title', None)
-                    if dataset_title is not None:
-                        logical_file.dataset_name = dataset_title
-                    else:
-                        logical_file.dataset_name = nc_file_name
-                    logical_file.save()
-
-                    try:
-                        # create a folder for the netcdf file type using the base file
-                        # name as the name for the new folder
-                        new_folder_path = cls.compute_file_type_folder(resource, file_folder,
-                                                                       nc_file_name)
-                        # Alva: This does nothing at all.
-                        # fed_file_full_path = ''
-                        # if resource.resource_federation_path:
-                        #     fed_file_full_path = os.path.join(resource.root_path,
-                        #                                       new_folder_path)
-
-                        create_folder(resource.short_id, new_folder_path)
-                        log.info("Folder created:{}".format(new_folder_path))
-
-                        new_folder_name = new_folder_path.split('/')[-1]
-                        if file_folder is None:
-                            upload_folder = new_folder_name
-                        else:
-                            upload_folder = os.path.join(file_folder, new_folder_name)
-                        # add all new files to the resource
-                        for f in files_to_add_to_resource:
-                            uploaded_file = UploadedFile(file=open(f, 'rb'),
-                                                         name=os.path.basename(f))
-                            new_res_file = utils.add_file_to_resource(
-                                resource, uploaded_file, folder=upload_folder
-                            )
-
-                            # make each resource file we added part of the logical file
-                            logical_file.add_resource_file(new_res_file)
-
-                        log.info("NetCDF file type - new files were added to the resource.")
-                    except Exception as ex:
-                        msg = "NetCDF file type. Error when setting file type. Error:{}"
-                        msg = msg.format(ex.message)
-                        log.exception(msg)
-                        # TODO: in case of any error put the original file back and
-                        # delete the folder that was created
-                        raise ValidationError(msg)
-                    finally:
-                        # remove temp dir
-                        if os.path.isdir(temp_dir):
-                            shutil.rmtree(temp_dir)
-
-                    log.info("NetCDF file type was created.")
-
-                    # use the extracted metadata to populate resource metadata
-                    for element in resource_metadata:
-                        # here k is the name of the element
-                        # v is a dict of all element attributes/field names and field values
-                        k, v = element.items()[0]
-                        if k == 'title':
-                            # update title element
-                            title_element = resource.metadata.title
-                            resource.metadata.update_element('title', title_element.id, **v)
-                        else:
-                            resource.metadata.create_element(k, **v)
-
-                    log.info("Resource - metadata was saved to DB")
-
-                    # use the extracted metadata to populate file metadata
-                    for element in file_type_metadata:
-                        # here k is the name of the element
-                        # v is a dict of all element attributes/field names and field values
-                        k, v = element.items()[0]
-                        if k == 'subject':
-                            logical_file.metadata.keywords = v
-                            logical_file.metadata.save()
-                            # update resource level keywords
-                            resource_keywords = [subject.value.lower() for subject in
-                                                 resource.metadata.subjects.all()]
-                            for kw in logical_file.metadata.keywords:
-                                if kw.lower() not in resource_keywords:
-                                    resource.metadata.create_element('subject', value=kw)
+            # the netcdf file is only read, so the shared copy in the file cache is used;
+            # the header text file is created in a temp dir of its own
+            temp_dir = os.path.join(settings.TEMP_FILE_DIR, uuid4().hex)
+            os.makedirs(temp_dir)
+            with cached_irods_file(res_file) as temp_file:
+                files_to_add_to_resource.append(temp_file)
+                # file validation and metadata extraction
+                nc_dataset = nc_utils.get_nc_dataset(temp_file)
+                if isinstance(nc_dataset, netCDF4.Dataset):
+                    # Extract the metadata from netcdf file
+                    # only a checksum already registered in iRODS is used, since computing one
+                    # reads the whole file
+                    res_dublin_core_meta, res_type_specific_meta = nc_meta.get_nc_meta_dict(
+                        nc_dataset, checksum=res_file._checksum)
+                    # populate resource_metadata and file_type_metadata lists with extracted
+                    # metadata
+                    add_metadata_to_list(resource_metadata, res_dublin_core_meta,
+                                         res_type_specific_meta, file_type_metadata, resource)
+
+                    # create the ncdump text file
+                    dump_file = create_header_info_txt_file(temp_file, nc_file_name,
+                                                            temp_dir)
+                    with open(dump_file) as dump_file_obj:
+                        header_info = dump_file_obj.read().decode('utf-8')
+                    files_to_add_to_resource.append(dump_file)
+                    file_folder = res_file.file_folder
+                    with transaction.atomic():
+                        # first delete the netcdf file that we retrieved from irods
+                        # for setting it to netcdf file type
+                        delete_resource_file(resource.short_id, res_file.id, user)
+
+                        # create a netcdf logical file object to be associated with
+                        # resource files
+                        logical_file = cls.create()
+
+                        # by default set the dataset_name attribute of the logical file to the
+                        # name of the file selected to set file type unless the extracted metadata
+                        # has a value for title
+                        dataset_title = res_dublin_core_meta.get('title', None)
+                        if dataset_title is not None:
+                            logical_file.dataset_name = dataset_title
                         else:
-                            logical_file.metadata.create_element(k, **v)
-                    log.info("NetCDF file type - metadata was saved to DB")
-                    # set resource to private if logical file is missing required metadata
-                    if not logical_file.metadata.has_all_required_elements():
-                        resource.raccess.public = False
-                        resource.raccess.discoverable = False
-                        resource.raccess.save()
-            else:
-                err_msg = "Not a valid NetCDF file. File type file validation failed."
-                log.error(err_msg)
-                # remove temp dir
-                if os.path.isdir(temp_dir):
-                    shutil.rmtree(temp_dir)
-                raise ValidationError(err_msg)
+                            logical_file.dataset_name = nc_file_name
+                        logical_file.save()
+                        logical_file.metadata.header_info = header_info
+                        logical_file.metadata.save()
+
+                        try:
+                            # create a folder for the netcdf file type using the base file
+                            # name as the name for the new folder
+                            new_folder_path = cls.compute_file_type_folder(resource, file_folder,
+                                                                           nc_file_name)
+                            # Alva: This does nothing at all.
+                            # fed_file_full_path = ''
+                            # if resource.resource_federation_path:
+                            #     fed_file_full_path = os.path.join(resource.root_path,
+                            #                                       new_folder_path)
+
+                            create_folder(resource.short_id, new_folder_path)
+                            log.info("Folder created:{}".format(new_folder_path))
+
+                            new_folder_name = new_folder_path.split('/')[-1]
+                            if file_folder is None:
+                                upload_folder = new_folder_name
+                            else:
+                                upload_folder = os.path.join(file_folder, new_folder_name)
+                            # add all new files to the resource
+                            for f in files_to_add_to_resource:
+                                uploaded_file = UploadedFile(file=open(f, 'rb'),
+                                                             name=os.path.basename(f))
+                                new_res_file = utils.add_file_to_resource(
+                                    resource, uploaded_file, folder=upload_folder
+                                )
+
+                                # make each resource file we added part of the logical file
+                                logical_file.add_resource_file(new_res_file)
+
+                            log.info("NetCDF file type - new files were added to the resource.")
+                        except Exception as ex:
+                            msg = "NetCDF file type. Error when setting file type. Error:{}"
+                            msg = msg.format(ex.message)
+                            log.exception(msg)
+                            # TODO: in case of any error put the original file back and
+                            # delete the folder that was created
+                            raise ValidationError(msg)
+                        finally:
+                            # remove temp dir
+                            if os.path.isdir(temp_dir):
+                                shutil.rmtree(temp_dir)
+
+                        log.info("NetCDF file type was created.")
+
+                        # use the extracted metadata to populate resource metadata
+                        for element in resource_metadata:
+                            # here k is the name of the element
+                            # v is a dict of all element attributes/field names and field values
+                            k, v = element.items()[0]
+                            if k == 'title':
+                                # update title element
+                                title_element = resource.metadata.title
+                                resource.metadata.update_element('title', title_element.id, **v)
+                            else:
+                                resource.metadata.create_element(k, **v)
+
+                        log.info("Resource - metadata was saved to DB")
+
+                        # use the extracted metadata to populate file metadata
+                        for element in file_type_metadata:
+                            # here k is the name of the element
+                            # v is a dict of all element attributes/field names and field values
+                            k, v = element.items()[0]
+                            if k == 'subject':
+                                logical_file.metadata.keywords = v
+                                logical_file.metadata.save()
+                                # update resource level keywords
+                                resource_keywords = [subject.value.lower() for subject in
+                                                     resource.metadata.subjects.all()]
+                                for kw in logical_file.metadata.keywords:
+                                    if kw.lower() not in resource_keywords:
+                                        resource.metadata.create_element('subject', value=kw)
+                            else:
+                                logical_file.metadata.create_element(k, **v)
+                        log.info("NetCDF file type - metadata was saved to DB")
+                        # set resource to private if logical file is missing required metadata
+                        if not logical_file.metadata.has_all_required_elements():
+                            resource.raccess.public = False
+                            resource.raccess.discoverable = False
+                            resource.raccess.save()
+                else:
+                    err_msg = "Not a valid NetCDF file. File type file validation failed."
+                    log.error(err_msg)
+                    # remove temp dir
+                    if os.path.isdir(temp_dir):
+                        shutil.rmtree(temp_dir)
+                    raise ValidationError(err_msg)
 
 
 def add_metadata_to_list(res_meta_list, extracted_core_meta, extracted_specific_meta,
@@ -765,29 +792,23 @@ def add_keywords_metadata(metadata_list, extracted_metadata, file_type=True):
                 metadata_list.append({'subject': {'value': keyword}})
 
 
-def create_header_info_txt_file(nc_temp_file, nc_file_name):
+def create_header_info_txt_file(nc_temp_file, nc_file_name, dump_dir=None):
     """
     Creates the header text file using the *nc_temp_file*
     :param nc_temp_file: the netcdf file copied from irods to django
     for metadata extraction
+    :param dump_dir: directory of the header text file, by default the directory of
+    *nc_temp_file*
     :return:
     """
 
-    if nc_dump.get_nc_dump_string_by_ncdump(nc_temp_file):
-        dump_str = nc_dump.get_nc_dump_string_by_ncdump(nc_temp_file)
-    else:
-        dump_str = nc_dump.get_nc_dump_string(nc_temp_file)
+    dump_str = nc_dump.get_nc_dump_cdl_string(nc_temp_file, nc_file_name)
 
     # file name without the extension
-    temp_dir = os.path.dirname(nc_temp_file)
+    temp_dir = dump_dir or os.path.dirname(nc_temp_file)
     dump_file_name = nc_file_name + '_header_info.txt'
     dump_file = os.path.join(temp_dir, dump_file_name)
     if dump_str:
-        # refine dump_str first line
-        first_line = list('netcdf {0} '.format(nc_file_name))
-        first_line_index = dump_str.index('{')
-        dump_str_list = first_line + list(dump_str)[first_line_index:]
-        dump_str = "".join(dump_str_list)
         with open(dump_file, 'w') as dump_file_obj:
             dump_file_obj.write(dump_str)
     else:
@@ -983,6 +1004,8 @@ def netcdf_file_update(instance, nc_res_file, txt_res_file, user):
     # create the ncdump text file
     nc_file_name = os.path.basename(temp_nc_file).split(".")[0]
     temp_text_file = create_header_info_txt_file(temp_nc_file, nc_file_name)
+    with open(temp_text_file) as temp_text_file_obj:
+        header_info = temp_text_file_obj.read().decode('utf-8')
 
     # push the updated nc file and the txt file to iRODS
     utils.replace_resource_file_on_irods(temp_nc_file, nc_res_file,
@@ -992,6 +1015,8 @@ def netcdf_file_update(instance, nc_res_file, txt_res_file, user):
 
     metadata = instance.metadata
     metadata.is_dirty = False
+    if file_type:
+        metadata.header_info = header_info
     metadata.save()
 
     # cleanup the temp dir
@@ -3,6 +3,7 @@ import logging
 import shutil
 import subprocess
 import zipfile
+from uuid import uuid4
 
 import xml.etree.ElementTree as ET
 import gdal
@@ -10,6 +11,7 @@ from gdalconst import GA_ReadOnly
 
 from functools import partial, wraps
 
+from django.conf import settings
 from django.db import models, transaction
 from django.core.files.uploadedfile import UploadedFile
 from django.core.exceptions import ValidationError
@@ -19,6 +21,7 @@ from django.template import Template, Context
 from dominate.tags import div, legend, form, button
 
 from hs_core.hydroshare import utils
+from hs_core.hydroshare.file_cache import cached_irods_file
 from hs_core.hydroshare.resource import delete_resource_file
 from hs_core.forms import CoverageTemporalForm, CoverageSpatialForm
 
@@ -272,89 +275,95 @@ class GeoRasterLogicalFile(AbstractLogicalFile):
         file_folder = res_file.file_folder
 
         if res_file is not None and res_file.has_generic_logical_file:
-            # get the file from irods to temp dir
-            temp_file = utils.get_file_from_irods(res_file)
-            # validate the file
-            error_info, files_to_add_to_resource = raster_file_validation(raster_file=temp_file)
-            if not error_info:
-                log.info("Geo raster file type file validation successful.")
-                # extract metadata
-                temp_dir = os.path.dirname(temp_file)
-                temp_vrt_file_path = [os.path.join(temp_dir, f) for f in os.listdir(temp_dir) if
-                                      '.vrt' == os.path.splitext(f)[1]].pop()
-                metadata = extract_metadata(temp_vrt_file_path)
-                log.info("Geo raster file type metadata extraction was successful.")
-                with transaction.atomic():
-                    # first delete the raster file that we retrieved from irods
-                    # for setting it to raster file type
-                    delete_resource_file(resource.short_id, res_file.id, user)
-                    # create a geo raster logical file object to be associated with resource files
-                    logical_file = cls.create()
-                    # by default set the dataset_name attribute of the logical file to the
-                    # name of the file selected to set file type
-                    logical_file.dataset_name = file_name
-                    logical_file.save()
-
-                    try:
-                        # create a folder for the raster file type using the base file name as the
-                        # name for the new folder
-                        new_folder_path = cls.compute_file_type_folder(resource, file_folder,
-                                                                       file_name)
-
-                        # Alva: This does nothing.
-                        # fed_file_full_path = ''
-                        # if resource.resource_federation_path:
-                        #     fed_file_full_path = os.path.join(resource.root_path, new_folder_path)
-
-                        log.info("Folder created:{}".format(new_folder_path))
-                        create_folder(resource.short_id, new_folder_path)
-
-                        new_folder_name = new_folder_path.split('/')[-1]
-                        if file_folder is None:
-                            upload_folder = new_folder_name
-                        else:
-                            upload_folder = os.path.join(file_folder, new_folder_name)
-
-                        # add all new files to the resource
-                        for f in files_to_add_to_resource:
-                            uploaded_file = UploadedFile(file=open(f, 'rb'),
-                                                         name=os.path.basename(f))
-                            new_res_file = utils.add_file_to_resource(
-                                resource, uploaded_file, folder=upload_folder)
-
-                            # make each resource file we added as part of the logical file
-                            logical_file.add_resource_file(new_res_file)
-
-                        log.info("Geo raster file type - new files were added to the resource.")
-                    except Exception as ex:
-                        msg = "Geo raster file type. Error when setting file type. Error:{}"
-                        msg = msg.format(ex.message)
-                        log.exception(msg)
-                        raise ex
-                    finally:
-                        # remove temp dir
-                        if os.path.isdir(temp_dir):
-                            shutil.rmtree(temp_dir)
-
-                    log.info("Geo raster file type was created.")
-
-                    # use the extracted metadata to populate file metadata
-                    for element in metadata:
-                        # here k is the name of the element
-                        # v is a dict of all element attributes/field names and field values
-                        k, v = element.items()[0]
-                        logical_file.metadata.create_element(k, **v)
-                    log.info("Geo raster file type - metadata was saved to DB")
-                    # set resource to private if logical file is missing required metadata
-                    if not logical_file.metadata.has_all_required_elements():
-                        resource.raccess.public = False
-                        resource.raccess.discoverable = False
-                        resource.raccess.save()
-            else:
-                err_msg = "Geo raster file type file validation failed.{}".format(
-                    ' '.join(error_info))
-                log.info(err_msg)
-                raise ValidationError(err_msg)
+            # the raster file is only read, so the shared copy in the file cache is linked
+            # into a temp dir, where the files created from it are written
+            temp_dir = os.path.join(settings.TEMP_FILE_DIR, uuid4().hex)
+            os.makedirs(temp_dir)
+            with cached_irods_file(res_file) as cached_file:
+                temp_file = os.path.join(temp_dir, os.path.basename(cached_file))
+                os.symlink(cached_file, temp_file)
+                # validate the file
+                error_info, files_to_add_to_resource = raster_file_validation(raster_file=temp_file)
+                if not error_info:
+                    log.info("Geo raster file type file validation successful.")
+                    # extract metadata
+                    temp_vrt_file_path = [os.path.join(temp_dir, f) for f in os.listdir(temp_dir) if
+                                          '.vrt' == os.path.splitext(f)[1]].pop()
+                    metadata = extract_metadata(temp_vrt_file_path)
+                    log.info("Geo raster file type metadata extraction was successful.")
+                    with transaction.atomic():
+                        # first delete the raster file that we retrieved from irods
+                        # for setting it to raster file type
+                        delete_resource_file(resource.short_id, res_file.id, user)
+                        # create a geo raster logical file object to be associated with
+                        # resource files
+                        logical_file = cls.create()
+                        # by default set the dataset_name attribute of the logical file to the
+                        # name of the file selected to set file type
+                        logical_file.dataset_name = file_name
+                        logical_file.save()
+
+                        try:
+                            # create a folder for the raster file type using the base file
+                            # name as the name for the new folder
+                            new_folder_path = cls.compute_file_type_folder(resource, file_folder,
+                                                                           file_name)
+
+                            # Alva: This does nothing.
+                            # fed_file_full_path = ''
+                            # if resource.resource_federation_path:
+                            #     fed_file_full_path = os.path.join(resource.root_path,
+                            #                                       new_folder_path)
+
+                            log.info("Folder created:{}".format(new_folder_path))
+                            create_folder(resource.short_id, new_folder_path)
+
+                            new_folder_name = new_folder_path.split('/')[-1]
+                            if file_folder is None:
+                                upload_folder = new_folder_name
+                            else:
+                                upload_folder = os.path.join(file_folder, new_folder_name)
+
+                            # add all new files to the resource
+                            for f in files_to_add_to_resource:
+                                uploaded_file = UploadedFile(file=open(f, 'rb'),
+                                                             name=os.path.basename(f))
+                                new_res_file = utils.add_file_to_resource(
+                                    resource, uploaded_file, folder=upload_folder)
+
+                                # make each resource file we added as part of the logical file
+                                logical_file.add_resource_file(new_res_file)
+
+                            log.info("Geo raster file type - new files were added to the resource.")
+                        except Exception as ex:
+                            msg = "Geo raster file type. Error when setting file type. Error:{}"
+                            msg = msg.format(ex.message)
+                            log.exception(msg)
+                            raise ex
+                        finally:
+                            # remove temp dir
+                            if os.path.isdir(temp_dir):
+                                shutil.rmtree(temp_dir)
+
+                        log.info("Geo raster file type was created.")
+
+                        # use the extracted metadata to populate file metadata
+                        for element in metadata:
+                            # here k is the name of the element
+                            # v is a dict of all element attributes/field names and field values
+                            k, v = element.items()[0]
+                            logical_file.metadata.create_element(k, **v)
+                        log.info("Geo raster file type - metadata was saved to DB")
+                        # set resource to private if logical file is missing required metadata
+                        if not logical_file.metadata.has_all_required_elements():
+                            resource.raccess.public = False
+                            resource.raccess.discoverable = False
+                            resource.raccess.save()
+                else:
+                    err_msg = "Geo raster file type file validation failed.{}".format(
+                        ' '.join(error_info))
+                    log.info(err_msg)
+                    raise ValidationError(err_msg)
         else:
             if res_file is None:
                 err_msg = "Failed to set Geo raster file type. " \
@@ -457,7 +466,8 @@ def raster_file_validation(raster_file):
 
 def extract_metadata(temp_vrt_file_path):
     metadata = []
-    res_md_dict = raster_meta_extract.get_raster_meta_dict(temp_vrt_file_path)
+    res_md_dict = raster_meta_extract.get_raster_meta_dict(
+        temp_vrt_file_path, accuracy=getattr(settings, 'HS_RASTER_STATISTICS_ACCURACY', 1))
     wgs_cov_info = res_md_dict['spatial_coverage_info']['wgs84_coverage_info']
     # add core metadata coverage - box
     if wgs_cov_info:
@@ -2,36 +2,57 @@
 Module used to get the header info of netcdf file
 
 WORKFLOW:
-There are two ways to get the netcdf header string.
-1) method1 run ncdump -h by python subprocess module: get_nc_dump_string_by_ncdump()
-2) method2 use the netCDF4 python lib to look into the netcdf to extract the the header info:
-   get_nc_dump_string()
-3) get_netcdf_header_file() will try the first method and if it fails it will call the second method
-
-NOTES:
-1) make sure the 'ncdump' is registered by the system path. otherwise suprocess won't recoganize
-   the ncdump command
+There are two ways to get the netcdf header string, both using the netCDF4 python lib to look
+into the netcdf file in process.
+1) get_nc_dump_cdl_string() renders the header info in CDL as the "ncdump -h" command does
+2) get_nc_dump_string() dumps the header info as json
+3) get_netcdf_header_file() writes the CDL header info to a text file
 
 REF
 ncdump c code:
     http://www.unidata.ucar.edu/software/netcdf/docs/ncdump_8c_source.html
+CDL syntax:
+    https://www.unidata.ucar.edu/software/netcdf/docs/netcdf_utilities_guide.html#cdl_syntax
 json dump dict in pretty format:
     http://stackoverflow.com/questions/3229419/pretty-printing-nested-dictionaries-in-python
-subprocess call:
-    https://docs.python.org/2/library/subprocess.html
-    http://stackoverflow.com/questions/923079/how-can-i-capture-the-stdout-output-of-a-child
-    -process/923108#923108
 """
 
 from collections import OrderedDict
 from os.path import basename
 import os
 import json
-import subprocess
 
+import numpy
 import netCDF4
 from nc_utils import get_nc_dataset
 
+# CDL names of netCDF data types, by numpy data type name
+CDL_TYPE_NAMES = {
+    'int8': 'byte',
+    'int16': 'short',
+    'int32': 'int',
+    'int64': 'int64',
+    'float32': 'float',
+    'float64': 'double',
+    'uint8': 'ubyte',
+    'uint16': 'ushort',
+    'uint32': 'uint',
+    'uint64': 'uint64',
+    'S1': 'char',
+}
+
+# CDL suffixes of numeric attribute values, by numpy data type name
+CDL_VALUE_SUFFIXES = {
+    'int8': 'b',
+    'int16': 's',
+    'int64': 'LL',
+    'float32': 'f',
+    'uint8': 'UB',
+    'uint16': 'US',
+    'uint32': 'U',
+    'uint64': 'ULL',
+}
+
 
 def get_netcdf_header_file(nc_file_name, dump_folder=''):
     """
@@ -48,28 +69,127 @@ def get_netcdf_header_file(nc_file_name, dump_folder=''):
     nc_dump_file = open(nc_dump_file_name, 'w')
 
     # write the nc_dump string in text fle
-    dump_string = get_nc_dump_string_by_ncdump(nc_file_name) \
-        if get_nc_dump_string_by_ncdump(nc_file_name) else get_nc_dump_string(nc_file_name)
+    dump_string = get_nc_dump_cdl_string(nc_file_name)
     if dump_string:
         nc_dump_file.write(dump_string)
 
 
-def get_nc_dump_string_by_ncdump(nc_file_name):
+def get_nc_dump_cdl_string(nc_file_name, dataset_name=''):
     """
-    (string) -> string
+    (string, string) -> string
 
-    Return: string create by running "ncdump -h" command for netcdf file.
+    Return: string in CDL created by python netCDF4 lib as the "ncdump -h" command does for
+            netcdf file. The dataset is named dataset_name, by default the base file name.
     """
-
     try:
-        process = subprocess.Popen(['ncdump', '-h', nc_file_name], stdout=subprocess.PIPE)
-        nc_dump_string = process.communicate()[0]
+        nc_dataset = get_nc_dataset(nc_file_name)
+        if not dataset_name:
+            dataset_name = '.'.join(basename(nc_file_name).split('.')[:-1])
+        try:
+            lines = ['netcdf {0} {{'.format(dataset_name)]
+            lines.extend(get_group_cdl_lines(nc_dataset))
+            lines.append('}')
+        finally:
+            nc_dataset.close()
+        nc_dump_string = '\n'.join(lines) + '\n'
     except Exception:
         nc_dump_string = ''
 
     return nc_dump_string
 
 
+def get_group_cdl_lines(nc_group, indent=''):
+    """
+    (obj, string) -> list
+
+    Return: lines of CDL for the dimensions, variables, global attributes and sub groups of a
+            netcdf group object, following the layout of "ncdump -h". Unlike get_nc_dump_dict,
+            which keeps attribute values as plain strings, this keeps the CDL types and quoting
+            of the values.
+    """
+    lines = []
+    if nc_group.dimensions:
+        lines.append(indent + 'dimensions:')
+        for dim_name, dim_obj in nc_group.dimensions.items():
+            if dim_obj.isunlimited():
+                lines.append('{0}\t{1} = UNLIMITED ; // ({2} currently)'.format(
+                    indent, dim_name, len(dim_obj)))
+            else:
+                lines.append('{0}\t{1} = {2} ;'.format(indent, dim_name, len(dim_obj)))
+
+    if nc_group.variables:
+        lines.append(indent + 'variables:')
+        for var_name, var_obj in nc_group.variables.items():
+            try:
+                # scalar variables have no dimension list, as in "int crs ;"
+                dimensions = '({0})'.format(', '.join(var_obj.dimensions)) \
+                    if var_obj.dimensions else ''
+                lines.append('{0}\t{1} {2}{3} ;'.format(indent, get_cdl_type_name(var_obj),
+                                                        var_name, dimensions))
+                for attr_name in var_obj.ncattrs():
+                    lines.append('{0}\t\t{1}:{2} = {3} ;'.format(
+                        indent, var_name, attr_name,
+                        get_cdl_attr_value(var_obj.getncattr(attr_name))))
+            except Exception:
+                continue
+
+    if nc_group.ncattrs():
+        lines.append('')
+        lines.append(indent + '// global attributes:' if not indent else
+                     indent + '// group attributes:')
+        for attr_name in nc_group.ncattrs():
+            try:
+                lines.append('{0}\t\t:{1} = {2} ;'.format(
+                    indent, attr_name, get_cdl_attr_value(nc_group.getncattr(attr_name))))
+            except Exception:
+                continue
+
+    for group_name, group_obj in nc_group.groups.items():
+        lines.append('')
+        lines.append('{0}group: {1} {{'.format(indent, group_name))
+        lines.extend(get_group_cdl_lines(group_obj, indent + '  '))
+        lines.append('{0}  }} // group {1}'.format(indent, group_name))
+
+    return lines
+
+
+def get_cdl_type_name(var_obj):
+    """
+    (obj) -> string
+
+    Return: CDL name of the data type of a netcdf variable
+    """
+    if isinstance(var_obj.datatype, netCDF4.CompoundType):
+        return var_obj.datatype.name
+    if isinstance(var_obj.datatype, netCDF4.VLType):
+        return var_obj.datatype.name if var_obj.datatype.name else 'vlen'
+    if var_obj.dtype == str:
+        return 'string'
+    return CDL_TYPE_NAMES.get(numpy.dtype(var_obj.dtype).name, var_obj.dtype.name)
+
+
+def get_cdl_attr_value(value):
+    """
+    (obj) -> string
+
+    Return: CDL representation of the value of a netcdf attribute
+    """
+    if isinstance(value, basestring):
+        if isinstance(value, unicode):
+            value = value.encode('utf-8')
+        value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return '"{0}"'.format(value)
+
+    values = numpy.atleast_1d(value)
+    suffix = CDL_VALUE_SUFFIXES.get(values.dtype.name, '')
+    if values.dtype.kind == 'f':
+        strings = ['{0}{1}'.format(repr(float(v)) if values.dtype.name == 'float64' else
+                                   '{0:g}'.format(v), suffix) for v in values]
+    else:
+        strings = ['{0}{1}'.format(v, suffix) for v in values]
+    return ', '.join(strings)
+
+
 def get_nc_dump_string(nc_file_name):
     """
     (string) -> string
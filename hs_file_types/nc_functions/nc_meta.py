@@ -16,6 +16,8 @@ coverage info by acdd:
 """
 
 import json
+import copy
+from collections import OrderedDict
 
 import re
 import osr
@@ -24,7 +26,11 @@ from pyproj import Proj, transform
 
 from nc_utils import get_nc_dataset, get_nc_grid_mapping_projection_import_string_dict,\
     get_nc_variables_coordinate_type_mapping, get_nc_grid_mapping_crs_name, \
-    get_nc_variable_coordinate_meta
+    get_nc_variable_coordinate_meta, nc_dataset_cache
+
+# number of files whose metadata is kept by get_nc_meta_dict, by checksum of the file
+NC_META_CACHE_SIZE = 100
+_nc_meta_cache = OrderedDict()
 
 
 def get_nc_meta_json(nc_file_name):
@@ -39,20 +45,29 @@ def get_nc_meta_json(nc_file_name):
     return nc_meta_json
 
 
-def get_nc_meta_dict(nc_file_name):
+def get_nc_meta_dict(nc_file_name, checksum=None):
     """
-    (string)-> dict
+    (string, string)-> dict
 
     Return: the netCDF Dublincore and Type specific Metadata
+    If the checksum of the file is given, the metadata is kept for the next call for a file
+    with the same checksum.
     """
 
+    if checksum and checksum in _nc_meta_cache:
+        _nc_meta_cache[checksum] = _nc_meta_cache.pop(checksum)
+        if isinstance(nc_file_name, netCDF4.Dataset):
+            nc_file_name.close()
+        return copy.deepcopy(_nc_meta_cache[checksum])
+
     if isinstance(nc_file_name, netCDF4.Dataset):
         nc_dataset = nc_file_name
     else:
         nc_dataset = get_nc_dataset(nc_file_name)
 
-    dublin_core_meta = get_dublin_core_meta(nc_dataset)
-    type_specific_meta = get_type_specific_meta(nc_dataset)
+    with nc_dataset_cache(nc_dataset):
+        dublin_core_meta = get_dublin_core_meta(nc_dataset)
+        type_specific_meta = get_type_specific_meta(nc_dataset)
     nc_meta_dict = {'dublin_core_meta': dublin_core_meta, 'type_specific_meta': type_specific_meta}
     nc_dataset.close()
     try:
@@ -62,6 +77,11 @@ def get_nc_meta_dict(nc_file_name):
         res_dublin_core_meta = {}
         res_type_specific_meta = {}
 
+    if checksum:
+        _nc_meta_cache[checksum] = copy.deepcopy((res_dublin_core_meta, res_type_specific_meta))
+        while len(_nc_meta_cache) > NC_META_CACHE_SIZE:
+            _nc_meta_cache.popitem(last=False)
+
     return res_dublin_core_meta, res_type_specific_meta
 
 
@@ -410,7 +430,8 @@ def get_limit_meta_by_coor_type(nc_dataset, coor_type, coor_type_mapping):
         if coor_type_name in coor_type_list:
             index = coor_type_list.index(coor_type_name)
             var_name = var_name_list[index]
-            var_coor_meta = get_nc_variable_coordinate_meta(nc_dataset, var_name)
+            var_coor_meta = get_nc_variable_coordinate_meta(nc_dataset, var_name,
+                                                            coor_type_mapping)
 
             if var_coor_meta.get('coordinate_start') is not None:
                 coor_start.append(var_coor_meta.get('coordinate_start'))
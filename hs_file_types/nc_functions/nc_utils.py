@@ -11,11 +11,18 @@ http://netcdf4-python.googlecode.com/svn/trunk/docs/netCDF4-module.html
 
 import re
 from collections import OrderedDict
+from contextlib import contextmanager
 
 import osr
 import netCDF4
 import numpy
 
+# maximum number of values of a coordinate variable read into memory at a time
+COORDINATE_CHUNK_SIZE = 1000000
+
+# caches of datasets opened with nc_dataset_cache, by id of the dataset
+_nc_dataset_caches = {}
+
 
 # Functions for General Purpose
 def get_nc_dataset(nc_file_name):
@@ -71,6 +78,21 @@ def get_nc_variable_original_meta(nc_dataset, nc_variable_name):
     return nc_variable_original_meta
 
 
+@contextmanager
+def nc_dataset_cache(nc_dataset):
+    """
+    (object)-> context manager
+
+    Within the context, the coordinate type mapping and the coordinate meta of variables of
+    the dataset are computed only once, however many times they are asked for.
+    """
+    _nc_dataset_caches[id(nc_dataset)] = {'coordinate_meta': {}}
+    try:
+        yield
+    finally:
+        del _nc_dataset_caches[id(nc_dataset)]
+
+
 # Functions for coordinate information of the dataset
 # The functions below will call functions defined for auxiliary, coordinate and bounds variables.
 def get_nc_variables_coordinate_type_mapping(nc_dataset):
@@ -82,6 +104,10 @@ def get_nc_variables_coordinate_type_mapping(nc_dataset):
             XC_bnd, YC_bnd, ZC_bnd, TC_bnd, Unknown_bnd for coordinate bounds variable
             XA_bnd, YA_bnd, ZA_bnd, TA_bnd, Unknown_A_bnd for auxiliary coordinate bounds variable
     """
+    cache = _nc_dataset_caches.get(id(nc_dataset))
+    if cache is not None and 'coordinate_type_mapping' in cache:
+        return cache['coordinate_type_mapping']
+
     nc_variables_dict = {
         "C": get_nc_coordinate_variables(nc_dataset),
         "A": get_nc_auxiliary_coordinate_variables(nc_dataset)
@@ -96,6 +122,8 @@ def get_nc_variables_coordinate_type_mapping(nc_dataset):
                 var_coor_bounds_type_name = var_coor_type_name+'_bnd'
                 nc_variables_coordinate_type_mapping[var_obj.bounds] = var_coor_bounds_type_name
 
+    if cache is not None:
+        cache['coordinate_type_mapping'] = nc_variables_coordinate_type_mapping
     return nc_variables_coordinate_type_mapping
 
 
@@ -142,26 +170,31 @@ def get_nc_variable_coordinate_type(nc_variable):
     return 'Unknown'
 
 
-def get_nc_variable_coordinate_meta(nc_dataset, nc_variable_name):
+def get_nc_variable_coordinate_meta(nc_dataset, nc_variable_name,
+                                    nc_variables_coordinate_type_mapping=None):
     """
-    (object)-> dict
+    (object, string, dict)-> dict
 
     Return: coordinate meta data if the variable is related to a coordinate type:
             coordinate or auxiliary coordinate variable or bounds variable
     """
-    nc_variables_coordinate_type_mapping = get_nc_variables_coordinate_type_mapping(nc_dataset)
+    cache = _nc_dataset_caches.get(id(nc_dataset))
+    if cache is not None and nc_variable_name in cache['coordinate_meta']:
+        return cache['coordinate_meta'][nc_variable_name]
+
+    if nc_variables_coordinate_type_mapping is None:
+        nc_variables_coordinate_type_mapping = \
+            get_nc_variables_coordinate_type_mapping(nc_dataset)
     nc_variable_coordinate_meta = {}
     if nc_variable_name in nc_variables_coordinate_type_mapping.keys():
         nc_variable = nc_dataset.variables[nc_variable_name]
-        nc_variable_data = nc_variable[:]
         nc_variable_coordinate_type = nc_variables_coordinate_type_mapping[nc_variable_name]
-        coordinate_max = None
-        coordinate_min = None
-        if nc_variable_data.size:
-            coordinate_min = nc_variable_data[numpy.unravel_index(nc_variable_data.argmin(),
-                                                                  nc_variable_data.shape)]
-            coordinate_max = nc_variable_data[numpy.unravel_index(nc_variable_data.argmax(),
-                                                                  nc_variable_data.shape)]
+        if nc_variable_coordinate_type.split('_')[0].endswith('C'):
+            # coordinate variables and their bounds are monotonic (COARDS and CF conventions)
+            coordinate_min, coordinate_max = get_nc_variable_endpoint_limits(nc_variable)
+        else:
+            coordinate_min, coordinate_max = get_nc_variable_limits(nc_variable)
+        if coordinate_min is not None:
             coordinate_units = nc_variable.units if hasattr(nc_variable, 'units') else ''
 
             if nc_variable_coordinate_type in ['TC', 'TA', 'TC_bnd', 'TA_bnd']:
@@ -189,9 +222,69 @@ def get_nc_variable_coordinate_meta(nc_dataset, nc_variable_name):
                 'coordinate_end': coordinate_max
             }
 
+    if cache is not None:
+        cache['coordinate_meta'][nc_variable_name] = nc_variable_coordinate_meta
     return nc_variable_coordinate_meta
 
 
+def get_nc_variable_limits(nc_variable, chunk_size=COORDINATE_CHUNK_SIZE):
+    """
+    (object, int)-> (value, value)
+
+    Return: the minimum and maximum of the variable data, ignoring masked values, or
+            (None, None) if the variable has no such data. The data is read in slices along
+            the first dimension of at most about chunk_size values each, so that large
+            variables never have to fit into memory.
+    """
+    shape = nc_variable.shape
+    if not shape or numpy.dtype(nc_variable.dtype).kind not in 'iuf':
+        # scalar and non-numeric variables are read as a whole
+        return _get_data_limits(nc_variable[:])
+
+    row_size = max(int(numpy.prod(shape[1:])), 1)
+    rows_per_chunk = max(chunk_size // row_size, 1)
+    limits = [_get_data_limits(nc_variable[start:start + rows_per_chunk])
+              for start in xrange(0, shape[0], rows_per_chunk)]
+    limits = [limit for limit in limits if limit[0] is not None]
+    if not limits:
+        return None, None
+    return min(limit[0] for limit in limits), max(limit[1] for limit in limits)
+
+
+def get_nc_variable_endpoint_limits(nc_variable):
+    """
+    (object)-> (value, value)
+
+    Return: the minimum and maximum of a variable that is monotonic along its first
+            dimension, such as a coordinate variable or its bounds variable, found from its
+            first and last values along that dimension. Falls back to get_nc_variable_limits
+            if an endpoint is masked.
+    """
+    if not nc_variable.shape or nc_variable.shape[0] == 0:
+        return get_nc_variable_limits(nc_variable)
+
+    endpoints = numpy.ma.concatenate([numpy.ma.ravel(nc_variable[0]),
+                                      numpy.ma.ravel(nc_variable[-1])])
+    if numpy.ma.count_masked(endpoints):
+        return get_nc_variable_limits(nc_variable)
+    return _get_data_limits(endpoints)
+
+
+def _get_data_limits(data):
+    """
+    (array)-> (value, value)
+
+    Return: the minimum and maximum of the array, ignoring masked values, or (None, None) if
+            it has no such values.
+    """
+    data = numpy.ma.asanyarray(data)
+    if data.size == 0 or data.count() == 0:
+        return None, None
+    coordinate_min = data[numpy.unravel_index(data.argmin(), data.shape)]
+    coordinate_max = data[numpy.unravel_index(data.argmax(), data.shape)]
+    return coordinate_min, coordinate_max
+
+
 # Functions for Coordinate Variable
 # coordinate variable has the following attributes:
 # 1) it has 1 dimension
@@ -17,23 +17,32 @@ import gdal
 from gdalconst import GA_ReadOnly
 from osgeo import osr
 from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+import os
 import re
 import logging
+import xml.etree.ElementTree as ET
 import pycrs
 import numpy
 
+# maximum number of cells of a raster band read into memory at a time
+BAND_STATISTICS_WINDOW_SIZE = 4 * 1024 * 1024
+# maximum number of raster bands whose statistics are computed in parallel
+BAND_STATISTICS_MAX_WORKERS = 4
 
-def get_raster_meta_dict(raster_file_name):
+
+def get_raster_meta_dict(raster_file_name, accuracy=1):
     """
-    (string)-> dict
+    (string, number)-> dict
 
-    Return: the raster science metadata extracted from the raster file
+    Return: the raster science metadata extracted from the raster file. The band statistics
+    are approximate if accuracy is below 1 (see get_band_statistics).
     """
 
     # get the metadata info from raster files
     spatial_coverage_info = get_spatial_coverage_info(raster_file_name)
     cell_info = get_cell_info(raster_file_name)
-    band_info = get_band_info(raster_file_name)
+    band_info = get_band_info(raster_file_name, accuracy)
 
     # write meta as dictionary
     raster_meta_dict = {
@@ -274,39 +283,44 @@ def get_cell_info(raster_file_name):
     return cell_info
 
 
-def get_band_info(raster_file_name):
+def get_band_info(raster_file_name, accuracy=1, max_workers=BAND_STATISTICS_MAX_WORKERS):
+    """
+    (string, number, int) --> dict
 
-    raster_dataset = gdal.Open(raster_file_name, GA_ReadOnly)
+    Return: meta info of each band in raster, by band number. The minimum and maximum values
+    of the bands are computed by get_band_statistics, for several bands in parallel.
+    """
 
-    import os
-    ori_dir = os.getcwd()
-    os.chdir(os.path.dirname(raster_file_name))
+    raster_dataset = _open_raster_dataset(raster_file_name)
 
     # get raster band count
     if raster_dataset:
         band_info = {}
         band_count = raster_dataset.RasterCount
+        band_numbers = range(1, band_count + 1)
+
+        def band_statistics(band_number):
+            # GDAL datasets can't be shared between threads
+            thread_dataset = _open_raster_dataset(raster_file_name)
+            return get_band_statistics(thread_dataset.GetRasterBand(band_number), accuracy)
+
+        if band_count > 1 and max_workers > 1:
+            pool = ThreadPool(min(band_count, max_workers))
+            try:
+                band_statistics_list = pool.map(band_statistics, band_numbers)
+            finally:
+                pool.close()
+        else:
+            band_statistics_list = [get_band_statistics(raster_dataset.GetRasterBand(i),
+                                                        accuracy) for i in band_numbers]
 
-        for i in range(0, band_count):
-            band = raster_dataset.GetRasterBand(i+1)
-            minimum, maximum, _, _ = band.ComputeStatistics(False)
-            no_data = band.GetNoDataValue()
-            new_no_data = None
-
-            if no_data and numpy.allclose(minimum, no_data):
-                new_no_data = minimum
-            elif no_data and numpy.allclose(maximum, no_data):
-                new_no_data = maximum
-
-            if new_no_data is not None:
-                band.SetNoDataValue(new_no_data)
-                minimum, maximum, _, _ = band.ComputeStatistics(False)
-
-            band_info[i+1] = {
-                'name': 'Band_'+str(i+1),
+        for i, (minimum, maximum, no_data) in zip(band_numbers, band_statistics_list):
+            band = raster_dataset.GetRasterBand(i)
+            band_info[i] = {
+                'name': 'Band_'+str(i),
                 'variableName': '',
                 'variableUnit': band.GetUnitType(),
-                'noDataValue': band.GetNoDataValue(),
+                'noDataValue': no_data,
                 'maximumValue': maximum,
                 'minimumValue': minimum,
                 }
@@ -321,5 +335,95 @@ def get_band_info(raster_file_name):
         }
 
     raster_dataset = None
-    os.chdir(ori_dir)
     return band_info
+
+
+def get_band_statistics(band, accuracy=1):
+    """
+    (object, number) --> (float, float, float)
+
+    Return: the minimum value, maximum value and nodata value of a raster band, read in one
+    pass over windows of whole block rows. NaN and nodata cells are skipped.
+
+    If the nodata value is close to (but not exactly) the minimum or maximum value of the band,
+    that value is taken as the nodata value and cells close to it are skipped as well.
+
+    With an accuracy below 1, approximate statistics are computed from the smallest overview
+    with at least that fraction of the cells of the band or, if there is no such overview, from
+    that fraction of the windows of the band.
+    """
+    no_data = band.GetNoDataValue()
+
+    source_band = band
+    window_step = 1
+    if accuracy < 1:
+        band_cells = float(band.XSize) * band.YSize
+        overviews = [band.GetOverview(i) for i in range(band.GetOverviewCount())]
+        overviews = [ovr for ovr in overviews
+                     if ovr is not None and ovr.XSize * ovr.YSize >= accuracy * band_cells]
+        if overviews:
+            source_band = min(overviews, key=lambda ovr: ovr.XSize * ovr.YSize)
+        else:
+            window_step = max(int(round(1 / accuracy)), 1)
+
+    columns = source_band.XSize
+    rows = source_band.YSize
+    block_rows = max(source_band.GetBlockSize()[1], 1)
+    window_rows = max(BAND_STATISTICS_WINDOW_SIZE // (columns * block_rows), 1) * block_rows
+
+    # minimum and maximum of values that are not nodata, and of values not close to nodata
+    exact_limits = [None, None]
+    close_limits = [None, None]
+    for window_index, y_offset in enumerate(range(0, rows, window_rows)):
+        if window_index % window_step:
+            continue
+        data = source_band.ReadAsArray(0, y_offset, columns, min(window_rows, rows - y_offset))
+        data = data.ravel()
+        if data.dtype.kind in 'fc':
+            data = data[~numpy.isnan(data)]
+        if no_data is not None:
+            data = data[data != no_data]
+            _update_limits(exact_limits, data)
+            data = data[~numpy.isclose(data, no_data)]
+        _update_limits(close_limits, data)
+
+    minimum, maximum = exact_limits if no_data is not None else close_limits
+    if no_data and minimum is not None and numpy.allclose(minimum, no_data):
+        no_data = minimum
+        minimum, maximum = close_limits
+    elif no_data and maximum is not None and numpy.allclose(maximum, no_data):
+        no_data = maximum
+        minimum, maximum = close_limits
+
+    return minimum, maximum, no_data
+
+
+def _update_limits(limits, data):
+    """ update the [minimum, maximum] list limits with the values in the array data """
+    if data.size:
+        data_min = float(data.min())
+        data_max = float(data.max())
+        limits[0] = data_min if limits[0] is None else min(limits[0], data_min)
+        limits[1] = data_max if limits[1] is None else max(limits[1], data_max)
+
+
+def _open_raster_dataset(raster_file_name):
+    """
+    (string) --> object
+
+    Return: the gdal dataset of a raster file. Raster files referenced by relative paths in a
+    vrt file are found in the folder of the vrt file whatever the working directory is.
+    """
+    if os.path.splitext(raster_file_name)[1].lower() == '.vrt':
+        try:
+            tree = ET.parse(raster_file_name)
+            vrt_folder = os.path.dirname(os.path.abspath(raster_file_name))
+            for element in tree.getroot().iter('SourceFilename'):
+                if element.text and not os.path.isabs(element.text):
+                    element.text = os.path.join(vrt_folder, element.text)
+                    element.attrib['relativeToVRT'] = '0'
+            # gdal opens a vrt dataset from its xml
+            return gdal.Open(ET.tostring(tree.getroot()), GA_ReadOnly)
+        except ET.ParseError:
+            pass
+    return gdal.Open(raster_file_name, GA_ReadOnly)
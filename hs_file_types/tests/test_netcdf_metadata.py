@@ -2,6 +2,9 @@ import os
 import tempfile
 import shutil
 
+import netCDF4
+import numpy
+
 from django.test import TransactionTestCase
 from django.contrib.auth.models import Group
 from django.core.files.uploadedfile import UploadedFile
@@ -17,6 +20,7 @@ from hs_core.views.utils import remove_folder, move_or_rename_file_or_folder
 
 from hs_app_netCDF.models import OriginalCoverage, Variable
 from hs_file_types.models import NetCDFLogicalFile, NetCDFFileMetaData, GenericLogicalFile
+from hs_file_types.nc_functions import nc_utils, nc_dump
 from utils import assert_netcdf_file_type_metadata
 
 
@@ -475,3 +479,57 @@ class NetCDFFileTypeMetaDataTest(MockIRODSTestCaseMixin, TransactionTestCase):
         self.assertEqual(Variable.objects.count(), 0)
 
         self.composite_resource.delete()
+
+    def test_coordinate_limits(self):
+        nc_dataset = netCDF4.Dataset(os.path.join(self.temp_dir, 'limits.nc'), 'w',
+                                     diskless=True)
+        nc_dataset.createDimension('x', 30)
+        nc_dataset.createDimension('y', 20)
+        x = nc_dataset.createVariable('x', 'f8', ('x',))
+        x[:] = numpy.arange(30, 0, -1)
+        lon = nc_dataset.createVariable('lon', 'f8', ('y', 'x'), fill_value=-9999.0)
+        lon[:] = numpy.random.uniform(-100, -80, (20, 30))
+        lon[3, 4] = -120
+        lon[17, 25] = -60
+        lon[5, :] = numpy.ma.masked
+
+        # chunked limits match those of the whole data
+        self.assertEqual(nc_utils.get_nc_variable_limits(lon, chunk_size=100), (-120, -60))
+        self.assertEqual(nc_utils.get_nc_variable_limits(lon, chunk_size=1), (-120, -60))
+        # limits of a monotonic coordinate variable come from its endpoints
+        self.assertEqual(nc_utils.get_nc_variable_endpoint_limits(x), (1, 30))
+
+        # within a dataset cache the coordinate type mapping is computed once
+        with nc_utils.nc_dataset_cache(nc_dataset):
+            mapping = nc_utils.get_nc_variables_coordinate_type_mapping(nc_dataset)
+            self.assertIs(nc_utils.get_nc_variables_coordinate_type_mapping(nc_dataset),
+                          mapping)
+        nc_dataset.close()
+
+    def test_cdl_header(self):
+        nc_dataset = netCDF4.Dataset(os.path.join(self.temp_dir, 'header.nc'), 'w',
+                                     diskless=True)
+        nc_dataset.createDimension('x', 3)
+        nc_dataset.createDimension('time', None)
+        lon = nc_dataset.createVariable('lon', 'f8', ('x',))
+        lon.units = 'degrees_east'
+        crs = nc_dataset.createVariable('crs', 'i4')
+        crs.grid_mapping_name = 'latitude_longitude'
+        nc_dataset.title = 'Test "header"'
+
+        lines = nc_dump.get_group_cdl_lines(nc_dataset)
+        nc_dataset.close()
+        self.assertEqual(lines, [
+            'dimensions:',
+            '\tx = 3 ;',
+            '\ttime = UNLIMITED ; // (0 currently)',
+            'variables:',
+            '\tdouble lon(x) ;',
+            '\t\tlon:units = "degrees_east" ;',
+            # scalar variables are rendered without parentheses, as by ncdump
+            '\tint crs ;',
+            '\t\tcrs:grid_mapping_name = "latitude_longitude" ;',
+            '',
+            '// global attributes:',
+            '\t\t:title = "Test \\"header\\"" ;',
+        ])
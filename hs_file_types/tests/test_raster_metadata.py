@@ -2,7 +2,11 @@ import os
 import tempfile
 import shutil
 
-from django.test import TransactionTestCase
+import gdal
+import numpy
+from mock import patch
+
+from django.test import TransactionTestCase, SimpleTestCase
 from django.db import IntegrityError
 from django.contrib.auth.models import Group
 from django.core.files.uploadedfile import UploadedFile
@@ -17,6 +21,7 @@ from hs_core.hydroshare.utils import resource_post_create_actions, \
     get_resource_file_name_and_extension
 from hs_core.views.utils import remove_folder, move_or_rename_file_or_folder
 
+from hs_file_types import raster_meta_extract
 from hs_file_types.models import GeoRasterLogicalFile, GeoRasterFileMetaData, GenericLogicalFile
 from utils import assert_raster_file_type_metadata
 from hs_geo_raster_resource.models import OriginalCoverage, CellInformation, BandInformation
@@ -736,3 +741,117 @@ class RasterFileTypeMetaData(MockIRODSTestCaseMixin, TransactionTestCase):
         # check that the resource file is not associated with generic logical file
         self.assertEqual(res_file.has_logical_file, True)
         self.assertEqual(res_file.logical_file_type_name, "GenericLogicalFile")
+
+
+class RasterBandStatisticsTest(SimpleTestCase):
+    """ band statistics are computed over windows of 4 block rows of 16 x 4 cells each """
+
+    def setUp(self):
+        super(RasterBandStatisticsTest, self).setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.raster_file = os.path.join(self.temp_dir, 'bands.tif')
+        # cells hold 1 to 1024, row by row, except for one nodata cell at the first cell
+        self.data = numpy.arange(1, 16 * 64 + 1, dtype=numpy.float64).reshape(64, 16)
+        self.data[0, 0] = -9999
+        doubled_data = self.data * 2
+        doubled_data[0, 0] = -9999
+        self.dataset = self._create_raster(self.raster_file, [self.data, doubled_data])
+
+        window_size_patcher = patch.object(raster_meta_extract, 'BAND_STATISTICS_WINDOW_SIZE',
+                                           16 * 4)
+        window_size_patcher.start()
+        self.addCleanup(window_size_patcher.stop)
+
+    def tearDown(self):
+        super(RasterBandStatisticsTest, self).tearDown()
+        self.dataset = None
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    @staticmethod
+    def _create_raster(file_name, bands_data, no_data=-9999):
+        rows, columns = bands_data[0].shape
+        dataset = gdal.GetDriverByName('GTiff').Create(file_name, columns, rows,
+                                                       len(bands_data), gdal.GDT_Float64,
+                                                       options=['BLOCKYSIZE=4'])
+        for i, data in enumerate(bands_data):
+            band = dataset.GetRasterBand(i + 1)
+            band.WriteArray(data)
+            band.SetNoDataValue(no_data)
+        dataset.FlushCache()
+        return dataset
+
+    def test_exact_statistics(self):
+        band = self.dataset.GetRasterBand(1)
+        self.assertEqual(band.GetBlockSize(), [16, 4])
+        self.assertEqual(raster_meta_extract.get_band_statistics(band), (2, 1024, -9999))
+
+    def test_nodata_close_to_minimum(self):
+        # cells meant as nodata that differ slightly from the nodata value are skipped too
+        data = self.data.copy()
+        data[0, 0] = -9999.000001
+        data[10, 3] = -9999.000001
+        dataset = self._create_raster(os.path.join(self.temp_dir, 'close.tif'), [data])
+        minimum, maximum, no_data = \
+            raster_meta_extract.get_band_statistics(dataset.GetRasterBand(1))
+        self.assertEqual((minimum, maximum), (2, 1024))
+        self.assertAlmostEqual(no_data, -9999.000001)
+
+    def test_approximate_statistics_by_window_stride(self):
+        # with no overviews every second window of 4 rows is read: rows 0-3, 8-11, ... 56-59
+        band = self.dataset.GetRasterBand(1)
+        self.assertEqual(band.GetOverviewCount(), 0)
+        self.assertEqual(raster_meta_extract.get_band_statistics(band, accuracy=0.5),
+                         (2, 60 * 16, -9999))
+
+    def test_approximate_statistics_from_overview(self):
+        self.dataset.BuildOverviews('NEAREST', [2, 4])
+        band = self.dataset.GetRasterBand(1)
+
+        # the 8 x 32 overview is the smallest with at least a fifth of the cells of the band
+        overview = band.GetOverview(0)
+        self.assertEqual((overview.XSize, overview.YSize), (8, 32))
+        data = overview.ReadAsArray()
+        data = data[data != -9999]
+        self.assertEqual(raster_meta_extract.get_band_statistics(band, accuracy=0.2),
+                         (data.min(), data.max(), -9999))
+
+        # exact statistics ignore the overviews
+        self.assertEqual(raster_meta_extract.get_band_statistics(band), (2, 1024, -9999))
+
+    def test_band_info_in_parallel(self):
+        self.dataset = None
+        parallel = raster_meta_extract.get_band_info(self.raster_file, max_workers=2)
+        serial = raster_meta_extract.get_band_info(self.raster_file, max_workers=1)
+        self.assertEqual(parallel, serial)
+        self.assertEqual((parallel[1]['minimumValue'], parallel[1]['maximumValue']), (2, 1024))
+        self.assertEqual((parallel[2]['minimumValue'], parallel[2]['maximumValue']), (4, 2048))
+
+    def test_vrt_with_relative_source(self):
+        self.dataset = None
+        vrt_file = os.path.join(self.temp_dir, 'bands.vrt')
+        with open(vrt_file, 'w') as f:
+            f.write('''<VRTDataset rasterXSize="16" rasterYSize="64">
+  <VRTRasterBand dataType="Float64" band="1">
+    <NoDataValue>-9999</NoDataValue>
+    <SimpleSource>
+      <SourceFilename relativeToVRT="1">bands.tif</SourceFilename>
+      <SourceBand>1</SourceBand>
+    </SimpleSource>
+  </VRTRasterBand>
+</VRTDataset>
+''')
+
+        # the source is found next to the vrt file from any working directory, which the
+        # band statistics leave unchanged
+        work_dir = tempfile.mkdtemp()
+        current_dir = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            band_info = raster_meta_extract.get_band_info(vrt_file)
+            self.assertEqual(os.path.realpath(os.getcwd()), os.path.realpath(work_dir))
+        finally:
+            os.chdir(current_dir)
+            shutil.rmtree(work_dir)
+        self.assertEqual((band_info[1]['minimumValue'], band_info[1]['maximumValue']),
+                         (2, 1024))
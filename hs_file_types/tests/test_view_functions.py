@@ -463,6 +463,8 @@ class TestFileTypeViewFunctions(MockIRODSTestCaseMixin, TestCase):
                 break
         self.assertNotEqual(nc_dump_res_file, None)
         self.assertIn('keywords = "Snow water equivalent"', nc_dump_res_file.resource_file.read())
+        # the header info is also kept with the metadata
+        self.assertIn('keywords = "Snow water equivalent"', logical_file.metadata.header_info)
         logical_file.metadata.keywords = ["keyword-1", 'keyword-2']
         logical_file.metadata.save()
         url_params = {'file_type_id': logical_file.id}
@@ -481,6 +483,8 @@ class TestFileTypeViewFunctions(MockIRODSTestCaseMixin, TestCase):
                 break
         self.assertNotEqual(nc_dump_res_file, None)
         self.assertIn('keywords = "keyword-1, keyword-2"', nc_dump_res_file.resource_file.read())
+        logical_file = NetCDFLogicalFile.objects.get(id=logical_file.id)
+        self.assertIn('keywords = "keyword-1, keyword-2"', logical_file.metadata.header_info)
         self.composite_resource.delete()
 
     def _add_delete_keywords_file_type(self, file_obj, file_type):
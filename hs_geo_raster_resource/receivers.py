@@ -1,11 +1,14 @@
 import os
 import logging
 import shutil
+from uuid import uuid4
 
+from django.conf import settings
 from django.core.files.uploadedfile import UploadedFile
 from django.dispatch import receiver
 
 from hs_core.hydroshare import utils
+from hs_core.hydroshare.file_cache import cached_irods_file
 from hs_core.hydroshare.resource import ResourceFile, \
     get_resource_file_name, delete_resource_file_only, delete_format_metadata_after_delete_file
 from hs_core.signals import pre_delete_file_from_resource, pre_metadata_element_create, \
@@ -108,46 +111,50 @@ def _process_uploaded_file(resource, validate_files_dict):
 
     res_file = resource.files.all().first()
     if res_file:
-        # get the file from irods to temp dir
-        temp_file = utils.get_file_from_irods(res_file)
-        # validate the file
-        error_info, files_to_add_to_resource = raster.raster_file_validation(raster_file=temp_file)
-        if not error_info:
-            log.info("Geo raster file validation successful.")
-            # extract metadata
-            temp_dir = os.path.dirname(temp_file)
-            temp_vrt_file_path = [os.path.join(temp_dir, f) for f in os.listdir(temp_dir) if
-                                  '.vrt' == os.path.splitext(f)[1]].pop()
-            metadata = raster.extract_metadata(temp_vrt_file_path)
-            # delete the original resource file
-            file_name = delete_resource_file_only(resource, res_file)
-            delete_format_metadata_after_delete_file(resource, file_name)
-            # add all extracted files (tif and vrt)
-            for f in files_to_add_to_resource:
-                uploaded_file = UploadedFile(file=open(f, 'rb'),
-                                             name=os.path.basename(f))
-                utils.add_file_to_resource(resource, uploaded_file)
-
-            # use the extracted metadata to populate resource metadata
-            for element in metadata:
-                # here k is the name of the element
-                # v is a dict of all element attributes/field names and field values
-                k, v = element.items()[0]
-                resource.metadata.create_element(k, **v)
-            log_msg = "Geo raster resource (ID:{}) - extracted metadata was saved to DB"
-            log_msg = log_msg.format(resource.short_id)
-            log.info(log_msg)
-        else:
-            # delete the invalid file just uploaded
-            delete_resource_file_only(resource, res_file)
-            validate_files_dict['are_files_valid'] = False
-            err_msg = "Uploaded file was not added to the resource. "
-            err_msg += ", ".join(msg for msg in error_info)
-            validate_files_dict['message'] = err_msg
-            log_msg = "File validation failed for raster resource (ID:{})."
-            log_msg = log_msg.format(resource.short_id)
-            log.error(log_msg)
+        # the raster file is only read, so the shared copy in the file cache is linked into
+        # a temp dir, where the files created from it are written
+        temp_dir = os.path.join(settings.TEMP_FILE_DIR, uuid4().hex)
+        os.makedirs(temp_dir)
+        with cached_irods_file(res_file) as cached_file:
+            temp_file = os.path.join(temp_dir, os.path.basename(cached_file))
+            os.symlink(cached_file, temp_file)
+            # validate the file
+            error_info, files_to_add_to_resource = raster.raster_file_validation(
+                raster_file=temp_file)
+            if not error_info:
+                log.info("Geo raster file validation successful.")
+                # extract metadata
+                temp_vrt_file_path = [os.path.join(temp_dir, f) for f in os.listdir(temp_dir) if
+                                      '.vrt' == os.path.splitext(f)[1]].pop()
+                metadata = raster.extract_metadata(temp_vrt_file_path)
+                # delete the original resource file
+                file_name = delete_resource_file_only(resource, res_file)
+                delete_format_metadata_after_delete_file(resource, file_name)
+                # add all extracted files (tif and vrt)
+                for f in files_to_add_to_resource:
+                    uploaded_file = UploadedFile(file=open(f, 'rb'),
+                                                 name=os.path.basename(f))
+                    utils.add_file_to_resource(resource, uploaded_file)
+
+                # use the extracted metadata to populate resource metadata
+                for element in metadata:
+                    # here k is the name of the element
+                    # v is a dict of all element attributes/field names and field values
+                    k, v = element.items()[0]
+                    resource.metadata.create_element(k, **v)
+                log_msg = "Geo raster resource (ID:{}) - extracted metadata was saved to DB"
+                log_msg = log_msg.format(resource.short_id)
+                log.info(log_msg)
+            else:
+                # delete the invalid file just uploaded
+                delete_resource_file_only(resource, res_file)
+                validate_files_dict['are_files_valid'] = False
+                err_msg = "Uploaded file was not added to the resource. "
+                err_msg += ", ".join(msg for msg in error_info)
+                validate_files_dict['message'] = err_msg
+                log_msg = "File validation failed for raster resource (ID:{})."
+                log_msg = log_msg.format(resource.short_id)
+                log.error(log_msg)
 
         # cleanup the temp file directory
-        if os.path.exists(temp_file):
-            shutil.rmtree(os.path.dirname(temp_file))
+        shutil.rmtree(temp_dir)
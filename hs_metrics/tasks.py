@@ -0,0 +1,12 @@
+from __future__ import absolute_import
+
+from celery.task import periodic_task
+from celery.schedules import crontab
+
+from hs_metrics.views import refresh_site_metrics
+
+
+@periodic_task(ignore_result=True, run_every=crontab(minute='*/30'))
+def refresh_site_metrics_cache():
+    """Recompute the site metrics ahead of their expiry, so that page views never wait."""
+    refresh_site_metrics()
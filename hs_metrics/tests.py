@@ -0,0 +1,98 @@
+import json
+from collections import Counter
+
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import Group
+from mezzanine.generic.models import Rating, ThreadedComment
+from mock import patch, Mock
+
+from hs_core import hydroshare
+from hs_core.testing import MockIRODSTestCaseMixin
+from theme.models import UserProfile
+from .views import compute_site_metrics, get_site_metrics, METRICS_CACHE_KEY
+
+
+class SiteMetricsTests(MockIRODSTestCaseMixin, TestCase):
+
+    def setUp(self):
+        super(SiteMetricsTests, self).setUp()
+        self.group, _ = Group.objects.get_or_create(name='Resource Author')
+        profiles = (('Professor', 'University Faculty', 'Hydrology, Ecology', 'USU'),
+                    ('Student', 'University Graduate Student', 'Hydrology', 'USU'),
+                    ('Student', 'University Graduate Student', '', 'RENCI'))
+        self.users = []
+        for i, (title, user_type, subject_areas, organization) in enumerate(profiles):
+            user = hydroshare.create_account(
+                'user{}@example.com'.format(i),
+                username='user{}'.format(i),
+                first_name='First{}'.format(i),
+                last_name='Last{}'.format(i),
+                superuser=False,
+                groups=[]
+            )
+            profile = user.userprofile
+            profile.title = title
+            profile.user_type = user_type
+            profile.subject_areas = subject_areas
+            profile.organization = organization
+            profile.save()
+            self.users.append(user)
+
+        for resource_type in ('GenericResource', 'GenericResource', 'CollectionResource'):
+            hydroshare.create_resource(resource_type, self.users[0],
+                                       'metrics {}'.format(resource_type))
+
+    def _per_object_metrics(self):
+        # the metrics as they were computed by loading every resource and profile
+        resource_type_counts = Counter()
+        for res_model in hydroshare.get_resource_types():
+            for resource in res_model.objects.all():
+                resource_type_counts[resource._meta.verbose_name] += 1
+        host_institutions = set()
+        user_titles = Counter()
+        user_professions = Counter()
+        user_subject_areas = Counter()
+        for profile in UserProfile.objects.all():
+            host_institutions.add(profile.organization)
+            user_professions[profile.user_type] += 1
+            user_titles[profile.title] += 1
+            if profile.subject_areas:
+                user_subject_areas.update(a.strip() for a in profile.subject_areas.split(','))
+        return {
+            'n_resources': sum(resource_type_counts.values()),
+            'resource_type_counts': resource_type_counts,
+            'n_ratings': Rating.objects.all().count(),
+            'n_comments': ThreadedComment.objects.all().count(),
+            'n_host_institutions': len(host_institutions),
+            'user_titles': user_titles,
+            'user_professions': user_professions,
+            'user_subject_areas': user_subject_areas,
+        }
+
+    def test_aggregate_metrics(self):
+        metrics = compute_site_metrics()
+        expected = self._per_object_metrics()
+        for key in ('n_resources', 'n_ratings', 'n_comments', 'n_host_institutions'):
+            self.assertEqual(metrics[key], expected[key])
+        for key in ('resource_type_counts', 'user_titles', 'user_professions',
+                    'user_subject_areas'):
+            self.assertEqual(dict(metrics[key]), dict(expected[key]))
+        self.assertEqual(metrics['n_resources'], 3)
+        self.assertEqual(dict(metrics['user_subject_areas']), {'Hydrology': 2, 'Ecology': 1})
+
+    def test_cached_metrics(self):
+        redis = Mock()
+        redis.get.return_value = json.dumps({'n_resources': 42})
+        with override_settings(REDIS_CONNECTION=redis), \
+                patch('hs_metrics.views.compute_site_metrics') as compute:
+            self.assertEqual(get_site_metrics(), {'n_resources': 42})
+        self.assertFalse(compute.called)
+        redis.get.assert_called_once_with(METRICS_CACHE_KEY)
+
+        # metrics are computed and stored when nothing is cached
+        redis.get.return_value = None
+        with override_settings(REDIS_CONNECTION=redis):
+            metrics = get_site_metrics()
+        self.assertEqual(metrics['n_resources'], 3)
+        self.assertEqual(redis.set.call_args[0][0], METRICS_CACHE_KEY)
+        self.assertEqual(json.loads(redis.set.call_args[0][1])['n_resources'], 3)
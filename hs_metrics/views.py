@@ -1,12 +1,89 @@
+import json
+import logging
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView
 from django.contrib.auth.models import User
+from django.db.models import Count
 from mezzanine.generic.models import Rating, ThreadedComment
 from theme.models import UserProfile # fixme switch to party model
 from hs_core import hydroshare
+from hs_core.models import BaseResource
 from collections import Counter
 
+logger = logging.getLogger(__name__)
+
+# Redis key of the computed metrics, and seconds after which they are computed again
+# if the periodic refresh (hs_metrics.tasks) has not replaced them
+METRICS_CACHE_KEY = 'hs_metrics:site_metrics'
+METRICS_CACHE_TIMEOUT = getattr(settings, 'HS_METRICS_CACHE_TIMEOUT', 60 * 60)
+
+
+def compute_site_metrics():
+    """Compute the resource and user metrics with aggregate queries.
+
+    :return: dict of metrics, with counters as lists of (name, count) pairs
+    """
+    # resource counts by type, labelled as the resource type models
+    type_names = {}
+    for res_model in hydroshare.get_resource_types():
+        type_names[res_model.__name__] = res_model._meta.verbose_name \
+            if hasattr(res_model._meta, 'verbose_name') else res_model._meta.model_name
+    resource_type_counts = Counter()
+    for resource_type, count in BaseResource.objects.values_list('resource_type')\
+            .annotate(count=Count('id')):
+        if resource_type in type_names:
+            resource_type_counts[type_names[resource_type]] += count
+
+    profiles = UserProfile.objects.all()
+    # profiles no longer record an organization type, so agencies can't be told apart from
+    # host institutions
+    host_institutions = set(profiles.values_list('organization', flat=True).distinct())
+    user_titles = Counter(dict(profiles.values_list('title').annotate(count=Count('id'))))
+    # user types replace the profession, which profiles no longer record
+    user_professions = Counter(dict(profiles.values_list('user_type')
+                                    .annotate(count=Count('id'))))
+    user_subject_areas = Counter()
+    for subject_areas, count in profiles.exclude(subject_areas__isnull=True)\
+            .exclude(subject_areas='').values_list('subject_areas').annotate(count=Count('id')):
+        for area in subject_areas.split(','):
+            user_subject_areas[area.strip()] += count
+
+    return {
+        'n_registered_users': User.objects.all().count(),
+        'n_resources': sum(resource_type_counts.values()),
+        'resource_type_counts': resource_type_counts.items(),
+        'n_ratings': Rating.objects.all().count(),
+        'n_comments': ThreadedComment.objects.all().count(),
+        'n_host_institutions': len(host_institutions),
+        'n_agencies': 0,
+        'user_titles': user_titles.items(),
+        'user_professions': user_professions.items(),
+        'user_subject_areas': user_subject_areas.items(),
+    }
+
+
+def refresh_site_metrics():
+    """Compute the metrics and store them in Redis for METRICS_CACHE_TIMEOUT seconds."""
+    metrics = compute_site_metrics()
+    redis = getattr(settings, 'REDIS_CONNECTION', None)
+    if redis is not None:
+        redis.set(METRICS_CACHE_KEY, json.dumps(metrics), ex=METRICS_CACHE_TIMEOUT)
+    return metrics
+
+
+def get_site_metrics():
+    """Return the metrics stored in Redis, computing them only if they are not stored."""
+    redis = getattr(settings, 'REDIS_CONNECTION', None)
+    if redis is not None:
+        cached = redis.get(METRICS_CACHE_KEY)
+        if cached is not None:
+            return json.loads(cached)
+    return refresh_site_metrics()
+
+
 class xDCIShareSiteMetrics(TemplateView):
     template_name = 'hs_metrics/hydrosharesitemetrics.html'
 
@@ -17,7 +94,7 @@ class xDCIShareSiteMetrics(TemplateView):
     def __init__(self, **kwargs):
         super(xDCIShareSiteMetrics, self).__init__(**kwargs)
 
-        self.n_registered_users = User.objects.all().count()
+        self.n_registered_users = 0
         self.n_host_institutions = 0
         self.host_institutions = set()
         self.n_users_logged_on = None # fixme need to track
@@ -66,46 +143,6 @@ class xDCIShareSiteMetrics(TemplateView):
         """
 
         ctx = super(xDCIShareSiteMetrics, self).get_context_data(**kwargs)
-        self.get_resource_stats()
-        self.get_user_stats()
-        self.user_professions = self.user_professions.items()
-        self.user_subject_areas = self.user_subject_areas.items()
-        self.resource_type_counts = self.resource_type_counts.items()
-        self.user_titles = self.user_titles.items()
+        self.__dict__.update(get_site_metrics())
         ctx['metrics'] = self
         return ctx
-
-    def get_all_resources(self):
-        """Yield all resources in the system as a single generator"""
-
-        resource_types = hydroshare.get_resource_types()
-        for qs in (res_model.objects.all() for res_model in resource_types):
-            for resource in qs:
-                yield resource
-
-    def get_resource_stats(self):
-        for resource in self.get_all_resources():
-            resource_type_name = resource._meta.verbose_name if hasattr(resource._meta, 'verbose_name') else resource._meta.model_name
-            self.resource_type_counts[resource_type_name] += 1
-            self.n_resources += 1
-
-        self.n_ratings = Rating.objects.all().count()
-        self.n_comments = ThreadedComment.objects.all().count()
-
-    def get_user_stats(self):
-        # FIXME revisit this with the hs_party application
-
-        for profile in UserProfile.objects.all():
-            if profile.organization_type in ('Government','Commercial'):
-                self.agencies.add(profile.organization)
-            else:
-                self.host_institutions.add(profile.organization)
-
-            self.user_professions[profile.profession] += 1
-            self.user_titles[profile.title] += 1
-
-            if profile.subject_areas:
-                self.user_subject_areas.update(a.strip() for a in profile.subject_areas.split(','))
-
-        self.n_host_institutions = len(self.host_institutions)
-        self.n_agencies = len(self.agencies)
@@ -1,9 +1,14 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 
+from hs_core.models import Title
 from hs_core.signals import pre_metadata_element_create, pre_metadata_element_update, \
                             pre_create_resource
 
-from hs_tools_resource.models import ToolResource
+from hs_tools_resource.models import ToolResource, ToolMetaData, SupportedResTypes, \
+    SupportedSharingStatus, RequestUrlBase, ToolIcon
+from hs_tools_resource.utils import invalidate_web_app_index
 from hs_tools_resource.forms import SupportedResTypesValidationForm,  VersionForm, \
                                     UrlValidationForm, \
                                     SupportedSharingStatusValidationForm
@@ -51,3 +56,20 @@ def validate_form(request, element_name):
         return {'is_valid': True, 'element_data_dict': element_form.cleaned_data}
     else:
         return {'is_valid': False, 'element_data_dict': None, "errors": element_form.errors}
+
+
+@receiver([post_save, post_delete], sender=ToolResource)
+@receiver([post_save, post_delete], sender=SupportedResTypes)
+@receiver([post_save, post_delete], sender=SupportedSharingStatus)
+@receiver([post_save, post_delete], sender=RequestUrlBase)
+@receiver([post_save, post_delete], sender=ToolIcon)
+@receiver(m2m_changed, sender=SupportedResTypes.supported_res_types.through)
+@receiver(m2m_changed, sender=SupportedSharingStatus.sharing_status.through)
+def web_app_changed_handler(sender, **kwargs):
+    invalidate_web_app_index()
+
+
+@receiver([post_save, post_delete], sender=Title)
+def web_app_title_changed_handler(sender, instance, **kwargs):
+    if instance.content_type_id == ContentType.objects.get_for_model(ToolMetaData).id:
+        invalidate_web_app_index()
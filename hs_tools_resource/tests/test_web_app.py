@@ -12,7 +12,7 @@ from hs_tools_resource.models import RequestUrlBase, ToolVersion, SupportedResTy
                                      ToolIcon, AppHomePageUrl, SupportedSharingStatus
 from hs_tools_resource.receivers import metadata_element_pre_create_handler, \
                                         metadata_element_pre_update_handler
-from hs_tools_resource.utils import parse_app_url_template
+from hs_tools_resource.utils import parse_app_url_template, get_web_apps_for_resource_type
 
 
 class TestWebAppFeature(TransactionTestCase):
@@ -331,3 +331,24 @@ class TestWebAppFeature(TransactionTestCase):
                                                 [self.resGeneric.get_hs_term_dict(),
                                                  term_dict_user])
         self.assertEqual(new_url_string, None)
+
+    def test_web_app_index(self):
+        resource.create_metadata_element(self.resWebApp.short_id, 'RequestUrlBase',
+                                         value='https://www.google.com/?id=${HS_RES_ID}')
+        resource.create_metadata_element(self.resWebApp.short_id, 'SupportedResTypes',
+                                         supported_res_types=['GenericResource'])
+
+        web_apps = get_web_apps_for_resource_type('genericresource')
+        self.assertEqual(len(web_apps), 1)
+        self.assertEqual(web_apps[0]['short_id'], self.resWebApp.short_id)
+        self.assertEqual(web_apps[0]['title'], 'Test Web App Resource')
+        self.assertEqual(web_apps[0]['url'], 'https://www.google.com/?id=${HS_RES_ID}')
+        self.assertIn('private', web_apps[0]['sharing_status'])
+        self.assertEqual(get_web_apps_for_resource_type('timeseriesresource'), [])
+
+        # changes to the web app discard the stored index
+        resource.update_metadata_element(self.resWebApp.short_id, 'SupportedResTypes',
+                                         element_id=SupportedResTypes.objects.first().id,
+                                         supported_res_types=['TimeSeriesResource'])
+        self.assertEqual(get_web_apps_for_resource_type('genericresource'), [])
+        self.assertEqual(len(get_web_apps_for_resource_type('timeseriesresource')), 1)
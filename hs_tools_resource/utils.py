@@ -1,9 +1,20 @@
 from string import Template
+import json
 import logging
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+
 from hs_core.hydroshare.utils import get_resource_types
 
 logger = logging.getLogger(__name__)
 
+# Redis key of the index of web apps by supported resource type
+WEB_APP_INDEX_KEY = 'hs_tools_resource:web_app_index'
+# seconds the index is stored; changes to web apps discard it at once, this only bounds the
+# life of an index computed while a web app was changing
+WEB_APP_INDEX_TIMEOUT = 3600
+
 
 def parse_app_url_template(url_template_string, term_dict_list=()):
     """
@@ -61,3 +72,72 @@ def get_SupportedResTypes_choices():
             if verbose_name not in xdci_excluded_types:
                 result_list.append([class_name, verbose_name])
     return result_list
+
+
+def compute_web_app_index():
+    """
+    Return the web apps that support each resource type, as
+    {resource type name in lower case: [web app dict, ...]}.
+
+    Each web app dict has the 'short_id' and 'title' of the web app resource, its request url
+    template as 'url', the data url of its icon as 'icon_url', and its supported sharing
+    status as 'sharing_status', a lower case string of comma separated values, or None if the
+    web app does not restrict sharing status.
+    """
+    from hs_core.models import Title
+    from .models import ToolResource, ToolMetaData, SupportedResTypes, \
+        SupportedSharingStatus, RequestUrlBase, ToolIcon
+
+    tool_res_ids = dict(ToolResource.objects.values_list('object_id', 'short_id'))
+    meta_type = ContentType.objects.get_for_model(ToolMetaData)
+
+    def values_by_metadata(model, field):
+        return dict(model.objects.filter(content_type=meta_type, object_id__in=tool_res_ids)
+                    .values_list('object_id', field))
+
+    titles = values_by_metadata(Title, 'value')
+    url_bases = values_by_metadata(RequestUrlBase, 'value')
+    icons = values_by_metadata(ToolIcon, 'data_url')
+    sharing_status = {}
+    for element in SupportedSharingStatus.objects.filter(
+            content_type=meta_type, object_id__in=tool_res_ids).prefetch_related('sharing_status'):
+        sharing_status.setdefault(element.object_id, element.get_sharing_status_str().lower())
+
+    index = {}
+    for element in SupportedResTypes.objects.filter(
+            content_type=meta_type, object_id__in=tool_res_ids).order_by('id')\
+            .prefetch_related('supported_res_types'):
+        web_app = {'short_id': tool_res_ids[element.object_id],
+                   'title': titles.get(element.object_id, ''),
+                   'url': url_bases.get(element.object_id),
+                   'icon_url': icons.get(element.object_id) or "raise-img-error",
+                   'sharing_status': sharing_status.get(element.object_id)}
+        for res_type in set(t.description.lower() for t in element.supported_res_types.all()):
+            index.setdefault(res_type, []).append(web_app)
+    return index
+
+
+def get_web_apps_for_resource_type(res_type):
+    """
+    Return the web apps that support a resource type, from the index stored in Redis, which
+    is computed only if it is not stored.
+
+    :param res_type: resource type name in lower case
+    :return: list of web app dicts as described in compute_web_app_index
+    """
+    redis = getattr(settings, 'REDIS_CONNECTION', None)
+    if redis is not None:
+        cached = redis.get(WEB_APP_INDEX_KEY)
+        if cached is not None:
+            return json.loads(cached).get(res_type, [])
+    index = compute_web_app_index()
+    if redis is not None:
+        redis.set(WEB_APP_INDEX_KEY, json.dumps(index), ex=WEB_APP_INDEX_TIMEOUT)
+    return index.get(res_type, [])
+
+
+def invalidate_web_app_index():
+    """ Discard the stored index of web apps, after any web app metadata changed """
+    redis = getattr(settings, 'REDIS_CONNECTION', None)
+    if redis is not None:
+        redis.delete(WEB_APP_INDEX_KEY)
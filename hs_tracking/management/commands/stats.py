@@ -6,10 +6,11 @@ from calendar import monthrange
 from optparse import make_option
 
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
 from django.core.management.base import BaseCommand
-from django.db.models import Q
+from django.db.models import Sum
 from django.utils import timezone
-from hs_core.models import BaseResource
+from hs_core.models import BaseResource, ResourceFile
 from theme.models import UserProfile
 
 from ... import models as hs_tracking
@@ -71,6 +72,12 @@ class Command(BaseCommand):
             action="store_true",
             help="user type stats by month",
         ),
+        make_option(
+            "--update-daily-stats",
+            dest="update_daily_stats",
+            action="store_true",
+            help="roll up statistics of the days since the last roll up",
+        ),
         make_option(
             "--yesterdays-variables",
             dest="yesterdays_variables",
@@ -100,17 +107,16 @@ class Command(BaseCommand):
         org_count = profiles.values('organization').distinct().count()
         self.print_var("monthly_orgs_counts", org_count, (start_date, end_date))
 
-    def monthly_users_by_type(self, start_date, end_date):
-        user_types = UserProfile.objects.values('user_type').distinct()
-        for ut in [_['user_type'] for _ in user_types]:
-            ut_users = User.objects.filter(userprofile__user_type=ut)
-            sessions = hs_tracking.Session.objects.filter(
-                Q(begin__gte=start_date) &
-                Q(begin__lte=end_date) &
-                Q(visitor__user__in=ut_users)
-            )
+    def monthly_users_by_type(self, start_date, end_date, user_types):
+        # sessions by user type are read from the daily statistics
+        sessions = hs_tracking.DailyStat.totals('sessions', start_date.date(), end_date.date())
+        for ut in user_types:
             self.print_var("active_{}".format(ut),
-                           sessions.count(), (end_date, start_date))
+                           sessions.get(ut or '', 0), (end_date, start_date))
+
+    def update_daily_stats(self):
+        days = hs_tracking.DailyStat.update()
+        self.print_var("update_daily_stats", days)
 
     def users_details(self):
         w = csv.writer(sys.stdout)
@@ -151,12 +157,18 @@ class Command(BaseCommand):
         ]
         w.writerow(fields)
 
-        for r in BaseResource.objects.all():
+        # sizes cached with the resource files, rather than requested from iRODS per file
+        sizes = dict(ResourceFile.objects.filter(
+            content_type=ContentType.objects.get_for_model(BaseResource), _size__gt=0)
+            .values_list('object_id').annotate(size=Sum('_size')))
+        resources = BaseResource.objects.select_related('raccess', 'user__userprofile')
+
+        for r in resources.iterator():
             values = [
-                r.metadata.dates.get(type="created").start_date.strftime("%m/%d/%Y"),
-                r.metadata.title.value,
+                r.created.strftime("%m/%d/%Y"),
+                r.title,
                 r.resource_type,
-                r.size,
+                sizes.get(r.id, 0),
                 r.raccess.sharing_status,
                 r.user.userprofile.user_type,
                 r.user_id
@@ -176,9 +188,9 @@ class Command(BaseCommand):
         variables = hs_tracking.Variable.objects.filter(
             timestamp__gte=yesterday_start,
             timestamp__lt=today_start
-        )
+        ).select_related('session__visitor')
         for v in variables:
-            uid = v.session.visitor.user.id if v.session.visitor.user else None
+            uid = v.session.visitor.user_id
 
             # encode variables as key value pairs (except for timestamp)
             values = [unicode(v.timestamp).encode('utf-8'),
@@ -204,10 +216,16 @@ class Command(BaseCommand):
                 self.monthly_orgs_counts(start_date, month_end)
         if options["users_details"]:
             self.users_details()
+        if options["update_daily_stats"]:
+            self.update_daily_stats()
         if options["monthly_users_by_type"]:
+            # include the days since the last nightly roll up
+            hs_tracking.DailyStat.update()
+            user_types = [_['user_type'] for _ in
+                          UserProfile.objects.values('user_type').distinct()]
             for month_end in month_year_iter(start_date, end_date):
                 month_start = month_end.replace(day=1)
-                self.monthly_users_by_type(month_start, month_end)
+                self.monthly_users_by_type(month_start, month_end, user_types)
         if options["resources_details"]:
             self.resources_details()
         if options["yesterdays_variables"]:
@@ -37,7 +37,7 @@ class Tracking(object):
                          'user_email_domain=%s' % emaildomain,
                          'request_url=%s' % request.path]])
 
-        # save the activity in the database
-        session.record('visit', msg)
+        # save the activity in the database, in bulk with other visits
+        session.record_buffered('visit', msg)
 
         return response
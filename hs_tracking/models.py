@@ -1,38 +1,75 @@
-from datetime import datetime, timedelta
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, time as dt_time
 
-from django.db import models
+from django.db import models, transaction, connection
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
 from django.core import signing
+from django.contrib.auth.models import User
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 
-from theme.models import UserProfile
 from utils import get_std_log_fields
 
 SESSION_TIMEOUT = settings.TRACKING_SESSION_TIMEOUT
 PROFILE_FIELDS = settings.TRACKING_PROFILE_FIELDS
 USER_FIELDS = settings.TRACKING_USER_FIELDS
 VISITOR_FIELDS = ["id"] + USER_FIELDS + PROFILE_FIELDS
+VISIT_BUFFER_SIZE = getattr(settings, 'TRACKING_VISIT_BUFFER_SIZE', 1)
+VISIT_BUFFER_INTERVAL = getattr(settings, 'TRACKING_VISIT_BUFFER_INTERVAL', 0)
+# maximum number of sessions remembered by SessionManager.for_request in each process
+SESSION_CACHE_SIZE = 10000
+
+logger = logging.getLogger(__name__)
 if set(PROFILE_FIELDS) & set(USER_FIELDS):
     raise ImproperlyConfigured("hs_tracking PROFILE_FIELDS and USER_FIELDS must not contain"
                                " overlapping field names")
 
 
 class SessionManager(models.Manager):
+    # ids of the sessions recently returned by for_request in this process, with the time they
+    # were returned, keyed by signed tracking id. Only ids are kept, since for_request changes
+    # and saves the sessions it returns, which must not be shared between threads.
+    _recent_sessions = OrderedDict()
+    _recent_sessions_lock = threading.Lock()
+
+    def _get_recent_session(self, signed_id, cut_off):
+        with self._recent_sessions_lock:
+            session_id, last_seen = self._recent_sessions.pop(signed_id, (None, None))
+            if session_id is None or last_seen < cut_off:
+                return None
+            self._recent_sessions[signed_id] = (session_id, last_seen)
+        return Session.objects.filter(id=session_id).select_related('visitor').first()
+
+    def _remember_session(self, signed_id, session):
+        with self._recent_sessions_lock:
+            self._recent_sessions.pop(signed_id, None)
+            self._recent_sessions[signed_id] = (session.id, datetime.now())
+            while len(self._recent_sessions) > SESSION_CACHE_SIZE:
+                self._recent_sessions.popitem(last=False)
+
     def for_request(self, request, user=None):
         if hasattr(request, 'user'):
             user = request.user
 
         signed_id = request.session.get('hs_tracking_id')
         if signed_id:
-            tracking_id = signing.loads(signed_id)
             cut_off = datetime.now() - timedelta(seconds=SESSION_TIMEOUT)
-            session = None
+            # a session returned within the timeout has been active since the cut off, which
+            # saves looking up its latest variable
+            session = self._get_recent_session(signed_id, cut_off)
 
-            try:
-                session = Session.objects.filter(
-                    variable__timestamp__gte=cut_off).filter(id=tracking_id['id']).first()
-            except Session.DoesNotExist:
-                pass
+            if session is None:
+                tracking_id = signing.loads(signed_id)
+                try:
+                    session = Session.objects.filter(
+                        variable__timestamp__gte=cut_off).filter(id=tracking_id['id']).first()
+                except Session.DoesNotExist:
+                    pass
 
             if session is not None and user is not None:
                 if session.visitor.user is None and user.is_authenticated():
@@ -42,6 +79,7 @@ class SessionManager(models.Manager):
                     except Visitor.DoesNotExist:
                         session.visitor.user = user
                         session.visitor.save()
+                self._remember_session(signed_id, session)
                 return session
 
         # No session found, create one
@@ -58,6 +96,7 @@ class SessionManager(models.Manager):
 
         session.record('begin_session', msg)
         request.session['hs_tracking_id'] = signing.dumps({'id': session.id})
+        self._remember_session(request.session['hs_tracking_id'], session)
         return session
 
 
@@ -71,7 +110,7 @@ class Visitor(models.Model):
             "id": self.id,
         }
         if self.user:
-            profile = UserProfile.objects.get(user=self.user)
+            profile = self.user.userprofile
             for field in PROFILE_FIELDS:
                 info[field] = getattr(profile, field)
             for field in USER_FIELDS:
@@ -101,6 +140,13 @@ class Session(models.Model):
         args = (self,) + args
         return Variable.record(*args, **kwargs)
 
+    def record_buffered(self, name, value=None):
+        """Records a variable through the visit buffer, which writes it to the database later
+        in bulk with other variables."""
+        variable = Variable.build(self, name, value)
+        visit_buffer.add(variable)
+        return variable
+
 
 class Variable(models.Model):
     TYPES = (
@@ -117,7 +163,9 @@ class Variable(models.Model):
     ]
 
     session = models.ForeignKey(Session)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # set when the variable is created rather than when it is saved, as buffered variables are
+    # saved later
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
     name = models.CharField(max_length=32)
     type = models.IntegerField(choices=TYPE_CHOICES)
     # change value to TextField to be less restrictive as max_length of CharField has been
@@ -147,6 +195,13 @@ class Variable(models.Model):
 
     @classmethod
     def record(cls, session, name, value=None):
+        variable = cls.build(session, name, value)
+        variable.save()
+        return variable
+
+    @classmethod
+    def build(cls, session, name, value=None):
+        """Returns an unsaved variable with the type code and encoded value of value."""
         for i, (label, coercer) in enumerate(cls.TYPES, 0):
             try:
                 if value == coercer(value):
@@ -157,8 +212,7 @@ class Variable(models.Model):
         else:
             raise TypeError("Unable to record variable of unrecognized type %s",
                             type(value).__name__)
-        return Variable.objects.create(session=session, name=name, type=type_code,
-                                       value=cls.encode(value))
+        return Variable(session=session, name=name, type=type_code, value=cls.encode(value))
 
     @classmethod
     def encode(cls, value):
@@ -171,3 +225,182 @@ class Variable(models.Model):
         else:
             raise ValueError("Unknown type (%s) for tracking variable: %r",
                              type(value).__name__, value)
+
+
+class DailyStat(models.Model):
+    """A daily rollup of tracking and resource data, keyed by a category within each statistic.
+
+    Statistics, by key:
+    * sessions: sessions begun, by user type of the visitor ('' for anonymous visitors)
+    * actions: variables recorded (visits, logins, downloads, ...), by variable name
+    * new_users: users joined, by user type
+    * new_resources: resources created, by resource type
+    * new_resources_size: total size in bytes of the files of resources created, by resource type
+
+    Days are in UTC. update() adds the days since the last day rolled up, so that reports read a
+    few rows per day instead of scanning the raw data.
+    """
+    date = models.DateField(db_index=True)
+    name = models.CharField(max_length=32)
+    key = models.CharField(max_length=255, blank=True, default='')
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'name', 'key')
+
+    @classmethod
+    def compute(cls, day):
+        """Returns the statistics of a day as a dict of values keyed by (name, key)."""
+        from hs_core.models import BaseResource, ResourceFile
+
+        start = datetime.combine(day, dt_time.min).replace(tzinfo=timezone.utc)
+        end = start + timedelta(days=1)
+        stats = {}
+
+        sessions = Session.objects.filter(begin__gte=start, begin__lt=end)\
+            .values('visitor__user__userprofile__user_type').annotate(count=Count('id'))
+        for row in sessions:
+            stats[('sessions', row['visitor__user__userprofile__user_type'] or '')] = \
+                row['count']
+
+        actions = Variable.objects.filter(timestamp__gte=start, timestamp__lt=end)\
+            .values('name').annotate(count=Count('id'))
+        for row in actions:
+            stats[('actions', row['name'])] = row['count']
+
+        users = User.objects.filter(date_joined__gte=start, date_joined__lt=end)\
+            .values('userprofile__user_type').annotate(count=Count('id'))
+        for row in users:
+            stats[('new_users', row['userprofile__user_type'] or '')] = row['count']
+
+        resource_types = dict(BaseResource.objects.filter(created__gte=start, created__lt=end)
+                              .values_list('id', 'resource_type'))
+        for resource_type in resource_types.values():
+            key = ('new_resources', resource_type)
+            stats[key] = stats.get(key, 0) + 1
+        # sizes cached with the resource files; uncached sizes are left out rather than
+        # requested from iRODS
+        sizes = ResourceFile.objects.filter(object_id__in=resource_types.keys(), _size__gt=0)\
+            .values('object_id').annotate(size=Sum('_size'))
+        for row in sizes:
+            key = ('new_resources_size', resource_types[row['object_id']])
+            stats[key] = stats.get(key, 0) + row['size']
+        return stats
+
+    @classmethod
+    def update(cls, until=None):
+        """Rolls up the days after the last day rolled up, through the day before until.
+
+        :param until: date of the first day not to roll up, by default today (UTC).
+        :return: number of days rolled up
+        """
+        from hs_core.models import BaseResource
+
+        until = until or timezone.now().date()
+        last_day = cls.objects.aggregate(last_day=Max('date'))['last_day']
+        if last_day is not None:
+            day = last_day + timedelta(days=1)
+        else:
+            # start at the earliest data
+            firsts = [Session.objects.aggregate(first=Min('begin'))['first'],
+                      User.objects.aggregate(first=Min('date_joined'))['first'],
+                      BaseResource.objects.aggregate(first=Min('created'))['first']]
+            firsts = [first.astimezone(timezone.utc).date() for first in firsts if first]
+            if not firsts:
+                return 0
+            day = min(firsts)
+
+        days = 0
+        while day < until:
+            stats = cls.compute(day)
+            with transaction.atomic():
+                cls.objects.filter(date=day).delete()
+                cls.objects.bulk_create(
+                    [cls(date=day, name=name, key=key, value=value)
+                     for (name, key), value in stats.items()] or
+                    # marks the day as rolled up
+                    [cls(date=day, name='sessions', key='', value=0)])
+            day += timedelta(days=1)
+            days += 1
+        return days
+
+    @classmethod
+    def totals(cls, name, start=None, end=None):
+        """Returns the sum of a statistic from the date start through the date end, by key."""
+        stats = cls.objects.filter(name=name)
+        if start is not None:
+            stats = stats.filter(date__gte=start)
+        if end is not None:
+            stats = stats.filter(date__lte=end)
+        return dict(stats.values_list('key').annotate(total=Sum('value')))
+
+
+class VariableBuffer(object):
+    """Collects variables in memory and writes them to the database with bulk_create, once
+    `size` variables are buffered or the oldest buffered variable is `interval` seconds old.
+
+    The interval is kept by a timer, so that variables are written in time when no further
+    variables arrive; other processes look up sessions by their latest variables.
+
+    At most `max_size` variables are held; if writing to the database keeps failing, the oldest
+    variables are dropped.
+    """
+
+    def __init__(self, size, interval, max_size=None):
+        self.size = size
+        self.interval = interval
+        self.max_size = max_size or 10 * size
+        self._variables = []
+        self._oldest = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._variables)
+
+    def add(self, variable):
+        with self._lock:
+            self._variables.append(variable)
+            if self._oldest is None:
+                self._oldest = time.time()
+            if len(self._variables) < self.size and time.time() - self._oldest < self.interval:
+                self._start_timer()
+                return
+        self.flush()
+
+    def _start_timer(self):
+        """Starts the timer flushing the buffer after the interval, unless it is running."""
+        if self._timer is None and self.interval > 0:
+            self._timer = threading.Timer(self.interval, self._flush_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            # the timer thread has its own database connection
+            connection.close()
+
+    def flush(self):
+        """Writes all buffered variables to the database."""
+        with self._lock:
+            variables, self._variables, self._oldest = self._variables, [], None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not variables:
+            return
+        try:
+            Variable.objects.bulk_create(variables)
+        except Exception:
+            logger.exception("Failed to write %d tracking variables", len(variables))
+            with self._lock:
+                # keep the variables for the next flush, within max_size
+                self._variables = (variables + self._variables)[-self.max_size:]
+                self._oldest = self._oldest or time.time()
+                self._start_timer()
+
+
+visit_buffer = VariableBuffer(VISIT_BUFFER_SIZE, VISIT_BUFFER_INTERVAL)
+atexit.register(visit_buffer.flush)
@@ -0,0 +1,20 @@
+from __future__ import absolute_import
+
+import logging
+
+from celery.task import periodic_task
+from celery.schedules import crontab
+
+from .models import DailyStat
+
+
+# Pass 'django' into getLogger instead of __name__
+# for celery tasks (see hs_core.tasks)
+logger = logging.getLogger('django')
+
+
+@periodic_task(ignore_result=True, run_every=crontab(minute=30, hour=0))
+def update_daily_stats():
+    """Roll up tracking and resource statistics of the days since the last run."""
+    days = DailyStat.update()
+    logger.info("Rolled up statistics of {} days".format(days))
@@ -1,14 +1,17 @@
 from datetime import datetime, timedelta
 import csv
+import json
 from cStringIO import StringIO
 
 from django.test import TestCase
 from django.contrib.auth.models import User
 from django.test import Client
 from django.http import HttpRequest
+from django.utils import timezone
 from mock import patch, Mock
 
-from .models import Variable, Session, Visitor, SESSION_TIMEOUT, VISITOR_FIELDS
+from .models import Variable, VariableBuffer, DailyStat, Session, Visitor, SESSION_TIMEOUT, \
+    VISITOR_FIELDS
 import utils
 
 
@@ -81,6 +84,44 @@ class TrackingTests(TestCase):
         session2 = Session.objects.for_request(request)
         self.assertEqual(session1.id, session2.id)
 
+    def test_for_request_remembered(self):
+        request = self.createRequest(user=self.user)
+        request.session = {}
+        session1 = Session.objects.for_request(request)
+        # the session is found by its id, without querying its variables again
+        with self.assertNumQueries(1):
+            session2 = Session.objects.for_request(request)
+        self.assertEqual(session1.id, session2.id)
+        # threads never share a session instance
+        self.assertIsNot(session1, session2)
+
+    def test_visit_buffer(self):
+        buffer = VariableBuffer(size=3, interval=60)
+        buffer.add(Variable.build(self.session, 'visit', 'one'))
+        buffer.add(Variable.build(self.session, 'visit', 'two'))
+        self.assertEqual(self.session.variable_set.filter(name='visit').count(), 0)
+        buffer.add(Variable.build(self.session, 'visit', 'three'))
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(set(self.session.getlist('visit')), {'one', 'two', 'three'})
+
+        buffer.add(Variable.build(self.session, 'visit', 'four'))
+        buffer.flush()
+        self.assertEqual(self.session.variable_set.filter(name='visit').count(), 4)
+
+    def test_visit_buffer_timer(self):
+        buffer = VariableBuffer(size=3, interval=10)
+        with patch('hs_tracking.models.threading.Timer') as timer_mock:
+            buffer.add(Variable.build(self.session, 'visit', 'one'))
+            buffer.add(Variable.build(self.session, 'visit', 'two'))
+        # one timer writes the variables after the interval, even if no more arrive
+        timer_mock.assert_called_once_with(10, buffer._flush_on_timer)
+        timer_mock.return_value.start.assert_called_once_with()
+        with patch('hs_tracking.models.connection') as connection_mock:
+            buffer._flush_on_timer()
+        connection_mock.close.assert_called_once_with()
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(set(self.session.getlist('visit')), {'one', 'two'})
+
     def test_for_request_expired(self):
         request = self.createRequest(user=self.user)
         request.session = {}
@@ -120,7 +161,7 @@ class TrackingTests(TestCase):
         client.login(username=self.user.username, password='password')
 
         response = client.get('/tracking/reports/profiles/')
-        reader = csv.reader(StringIO(response.content))
+        reader = csv.reader(StringIO(''.join(response.streaming_content)))
         rows = list(reader)
 
         self.assertEqual(response.status_code, 200)
@@ -137,7 +178,7 @@ class TrackingTests(TestCase):
         client = Client()
         response = client.get('/tracking/reports/history/')
         self.assertEqual(response.status_code, 200)
-        reader = csv.reader(StringIO(response.content))
+        reader = csv.reader(StringIO(''.join(response.streaming_content)))
         rows = list(reader)
         count = Variable.objects.all().count()
         self.assertEqual(len(rows), count + 1)  # +1 to account for the session header
@@ -152,7 +193,7 @@ class TrackingTests(TestCase):
 
         response = client.get('/tracking/reports/history/')
         self.assertEqual(response.status_code, 200)
-        reader = csv.DictReader(StringIO(response.content))
+        reader = csv.DictReader(StringIO(''.join(response.streaming_content)))
         rows = list(reader)
         data = rows[-1]
 
@@ -161,6 +202,49 @@ class TrackingTests(TestCase):
         self.assertEqual(data['variable'], "testvar")
         self.assertEqual(data['value'], "abcdef")
 
+    def test_history_filters(self):
+        self.session.record('testvar', "abcdef")
+        self.session.record('othervar', "ghijkl")
+        today = datetime.now().strftime('%Y-%m-%d')
+        client = Client()
+
+        response = client.get('/tracking/reports/history/',
+                              {'start': today, 'end': today, 'variable': 'testvar'})
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(StringIO(''.join(response.streaming_content))))
+        self.assertEqual([row['variable'] for row in rows], ['testvar'])
+
+        response = client.get('/tracking/reports/history/', {'end': '2000-01-01'})
+        rows = list(csv.DictReader(StringIO(''.join(response.streaming_content))))
+        self.assertEqual(rows, [])
+
+        response = client.get('/tracking/reports/history/', {'start': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_daily_stats(self):
+        self.session.record('visit', "request_url=/")
+        self.session.record('visit', "request_url=/my-resources/")
+        self.session.record('download', "filename=data.csv")
+        tomorrow = timezone.now().date() + timedelta(days=1)
+
+        self.assertGreater(DailyStat.update(until=tomorrow), 0)
+        self.assertEqual(DailyStat.totals('actions'), {'visit': 2, 'download': 1})
+        self.assertEqual(DailyStat.totals('sessions'), {'': 1})
+        self.assertEqual(DailyStat.totals('new_users'), {'Unspecified': 1})
+        # days already rolled up are not rolled up again
+        self.assertEqual(DailyStat.update(until=tomorrow), 0)
+
+        self.user.is_staff = True
+        self.user.save()
+        client = Client()
+        client.login(username=self.user.username, password='password')
+        response = client.get('/tracking/reports/daily/', {'name': 'actions'})
+        self.assertEqual(response.status_code, 200)
+        report = json.loads(response.content)
+        self.assertEqual(report.keys(), ['actions'])
+        today = timezone.now().date().isoformat()
+        self.assertEqual(report['actions'][today], {'visit': 2, 'download': 1})
+
     def test_capture_logins_and_logouts(self):
         self.assertEqual(Variable.objects.count(), 0)
 
@@ -1,13 +1,58 @@
 import csv
-from cStringIO import StringIO
+from datetime import datetime, timedelta
 
+from django.utils import timezone
 from django.views.generic import TemplateView
 from django.utils.decorators import method_decorator
 from django.contrib.auth.decorators import user_passes_test
-from django.http import HttpResponse
+from django.db.models import Q
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 
 from . import models as hs_tracking
 
+# number of rows read from the database at a time for a CSV report
+REPORT_CHUNK_SIZE = 5000
+
+
+class Echo(object):
+    """A file-like object whose write returns the value written, so that csv.writer returns
+    each row as a string to be streamed."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    """Returns a streaming CSV response for a header row and an iterable of rows."""
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    return StreamingHttpResponse(lines(), content_type="text/csv")
+
+
+def iterate_in_chunks(queryset, fields, chunk_size=REPORT_CHUNK_SIZE):
+    """Iterates over a queryset ordered by fields, reading chunk_size rows at a time.
+
+    Each chunk continues after the values of fields in the last row of the previous chunk, so
+    that no chunk needs an offset. The last of fields must be unique.
+    """
+    queryset = queryset.order_by(*fields)
+    chunk = list(queryset[:chunk_size])
+    while chunk:
+        for obj in chunk:
+            yield obj
+        last = chunk[-1]
+        # rows after last in the order of fields
+        after = Q()
+        for i, field in enumerate(reversed(fields)):
+            equal = {f: getattr(last, f) for f in fields[:len(fields) - i - 1]}
+            after |= Q(**dict(equal, **{field + '__gt': getattr(last, field)}))
+        chunk = list(queryset.filter(after)[:chunk_size])
+
 
 class UseTrackingView(TemplateView):
     template_name = 'hs_tracking/tracking.html'
@@ -29,17 +74,11 @@ class VisitorProfileReport(TemplateView):
     def get(self, request, **kwargs):
         """Download a CSV report of use tracking data."""
 
-        f = StringIO()
-        w = csv.writer(f)
-        w.writerow(hs_tracking.VISITOR_FIELDS)
-        visitors = hs_tracking.Visitor.objects.all()
-
-        for v in visitors:
-            info = v.export_visitor_information()
-            row = [info[field] for field in hs_tracking.VISITOR_FIELDS]
-            w.writerow(row)
-        f.seek(0)
-        return HttpResponse(f.read(), content_type="text/csv")
+        visitors = hs_tracking.Visitor.objects.select_related('user', 'user__userprofile')
+        rows = ([info[field] for field in hs_tracking.VISITOR_FIELDS]
+                for info in (v.export_visitor_information()
+                             for v in iterate_in_chunks(visitors, ['id'])))
+        return stream_csv(hs_tracking.VISITOR_FIELDS, rows)
 
 
 class HistoryReport(TemplateView):
@@ -49,17 +88,62 @@ class HistoryReport(TemplateView):
         return super(HistoryReport, self).dispatch(*args, **kwargs)
 
     def get(self, request, **kwargs):
-        """Download a CSV report of use tracking data."""
+        """Download a CSV report of use tracking data.
+
+        Optional query parameters limit the report to variables recorded from the date 'start'
+        through the date 'end' (as YYYY-MM-DD) and to the variable names given as 'variable'.
+        """
+
+        variables = hs_tracking.Variable.objects.select_related('session')
+        tz = timezone.get_current_timezone()
+        try:
+            if request.GET.get('start'):
+                start = datetime.strptime(request.GET['start'], '%Y-%m-%d')
+                variables = variables.filter(timestamp__gte=timezone.make_aware(start, tz))
+            if request.GET.get('end'):
+                end = datetime.strptime(request.GET['end'], '%Y-%m-%d') + timedelta(days=1)
+                variables = variables.filter(timestamp__lt=timezone.make_aware(end, tz))
+        except ValueError:
+            return HttpResponseBadRequest("start and end must be dates as YYYY-MM-DD")
+        if request.GET.getlist('variable'):
+            variables = variables.filter(name__in=request.GET.getlist('variable'))
+
+        rows = ([v.session.visitor_id, v.session.id, v.session.begin, v.timestamp,
+                 v.name, v.get_type_display(), v.value]
+                for v in iterate_in_chunks(variables, ['timestamp', 'id']))
+        return stream_csv(
+            ['visitor', 'session', 'session start', 'timestamp', 'variable', 'type', 'value'],
+            rows)
+
+
+class DailyStatsReport(TemplateView):
 
-        f = StringIO()
-        w = csv.writer(f)
-        w.writerow(
-            ['visitor', 'session', 'session start', 'timestamp', 'variable', 'type', 'value'])
-        variables = hs_tracking.Variable.objects.all().order_by('timestamp')
-
-        for v in variables:
-            row = [v.session.visitor.id, v.session.id, v.session.begin, v.timestamp,
-                   v.name, v.get_type_display(), v.value]
-            w.writerow(row)
-        f.seek(0)
-        return HttpResponse(f.read(), content_type="text/csv")
+    @method_decorator(user_passes_test(lambda u: u.is_staff))
+    def dispatch(self, *args, **kwargs):
+        return super(DailyStatsReport, self).dispatch(*args, **kwargs)
+
+    def get(self, request, **kwargs):
+        """Return daily statistics as JSON, as {name: {date: {key: value}}}.
+
+        Optional query parameters limit the report to the days from the date 'start' through
+        the date 'end' (as YYYY-MM-DD) and to the statistics given as 'name'.
+        """
+
+        stats = hs_tracking.DailyStat.objects.all()
+        try:
+            if request.GET.get('start'):
+                start = datetime.strptime(request.GET['start'], '%Y-%m-%d').date()
+                stats = stats.filter(date__gte=start)
+            if request.GET.get('end'):
+                end = datetime.strptime(request.GET['end'], '%Y-%m-%d').date()
+                stats = stats.filter(date__lte=end)
+        except ValueError:
+            return HttpResponseBadRequest("start and end must be dates as YYYY-MM-DD")
+        if request.GET.getlist('name'):
+            stats = stats.filter(name__in=request.GET.getlist('name'))
+
+        report = {}
+        for date, name, key, value in stats.order_by('date').values_list('date', 'name', 'key',
+                                                                         'value'):
+            report.setdefault(name, {}).setdefault(date.isoformat(), {})[key] = value
+        return JsonResponse(report)
@@ -521,6 +521,27 @@ RESOURCE_LOCK_TIMEOUT_SECONDS = 300 # in seconds
 # customized temporary file path for large files retrieved from iRODS user zone for metadata extraction
 TEMP_FILE_DIR = '/hs_tmp'
 
+# stream bag downloads through hs_core instead of waiting for iRODS to zip the bag
+HS_STREAM_BAG_DOWNLOAD = False
+
+# number of resources per page of My Resources; None lists all resources on one page
+HS_MY_RESOURCES_PER_PAGE = None
+
+# seconds to wait for further saves of a resource before reindexing it in a Celery task;
+# 0 reindexes synchronously on every save
+HS_INDEX_UPDATE_DELAY = 0
+
+# fraction of the cells of raster bands read to compute their minimum and maximum values;
+# below 1 the values are approximate but are computed faster
+HS_RASTER_STATISTICS_ACCURACY = 1
+
+# bytes of local copies of iRODS files kept in TEMP_FILE_DIR for reuse; 0 disables the cache
+HS_FILE_CACHE_SIZE = 20 * 1024 ** 3
+
+# seconds the number of resources in a REST resource list requested by an anonymous user is
+# cached; 0 counts the resources on every request
+HS_RESOURCE_COUNT_CACHE_TIMEOUT = 60
+
 ####################
 # OAUTH TOKEN SETTINGS #
 ####################
@@ -597,6 +618,10 @@ LOGGING = {
 TRACKING_SESSION_TIMEOUT = 60 * 15
 TRACKING_PROFILE_FIELDS = ["title", "user_type", "subject_areas", "public", "state", "country"]
 TRACKING_USER_FIELDS = ["username", "email", "first_name", "last_name"]
+# visits are written to the database in batches of TRACKING_VISIT_BUFFER_SIZE, or once the
+# oldest buffered visit is TRACKING_VISIT_BUFFER_INTERVAL seconds old
+TRACKING_VISIT_BUFFER_SIZE = 50
+TRACKING_VISIT_BUFFER_INTERVAL = 10
 
 # info django that a reverse proxy sever (nginx) is handling ssl/https for it
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
@@ -37,6 +37,8 @@ urlpatterns = i18n_patterns("",
         name='tracking-report-profiles'),
     url(r'^tracking/reports/history/$', tracking.HistoryReport.as_view(),
         name='tracking-report-history'),
+    url(r'^tracking/reports/daily/$', tracking.DailyStatsReport.as_view(),
+        name='tracking-report-daily'),
     url(r'^tracking/$', tracking.UseTrackingView.as_view(), name='tracking'),
     url(r'^user/$', theme.UserProfileView.as_view()),
     url(r'^user/(?P<user>.*)/', theme.UserProfileView.as_view()),
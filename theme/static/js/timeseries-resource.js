@@ -63,8 +63,42 @@ $(document).ready(function(){
     $("#series_id").change(function() {
         this.form.submit()
     });
+
+    var sqlite_update_task_id = $("#sqlite-update-task-id").val();
+    if (sqlite_update_task_id) {
+        $("#btn-update-sqlite-file").attr("disabled", "disabled").text("Updating SQLite File...");
+        updateSQLiteFileStatus(sqlite_update_task_id);
+    }
 });
 
+function updateSQLiteFileStatus(task_id) {
+    // reload the page once the celery task updating the sqlite file is complete
+    $.ajax({
+        dataType: "json",
+        cache: false,
+        timeout: 60000,
+        type: "POST",
+        url: '/django_irods/check_task_status/',
+        data: {
+            task_id: task_id
+        },
+        success: function (data) {
+            if (data.status) {
+                location.reload();
+            }
+            else {
+                setTimeout(function () {
+                    updateSQLiteFileStatus(task_id);
+                }, 3000);
+            }
+        },
+        error: function (xhr, errmsg, err) {
+            $("#btn-update-sqlite-file").removeAttr("disabled").text("Update SQLite File");
+            console.log(errmsg);
+        }
+    });
+}
+
 function processSiteMetadataElement(){
     var sites_text = $('#id_available_sites').val();
     var sites_json = $.parseJSON(sites_text);